@@ -1,20 +1,20 @@
 from models.actividadesModel import ActividadInsert, Salida, ActividadesSalida, ActividadSelectID, ActividadesSalidaID, TutorInfo, TutorAsignacion
 from fastapi.encoders import jsonable_encoder
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 class ActividadDAO:
     def __init__(self, db):
         self.db = db
 
-    def _obtener_tutor_info(self, tutor_id: str) -> TutorInfo:
+    async def _obtener_tutor_info(self, tutor_id: ObjectId | str) -> TutorInfo:
         """
         Obtiene la información del tutor por su ID desde la colección de usuarios
         """
         try:
-            _id_obj = ObjectId(tutor_id) if ObjectId.is_valid(tutor_id) else tutor_id
             # Buscar en la colección de usuarios, filtrando por tipo "tutor"
-            usuario_tutor = self.db.usuarios.find_one({
-                "_id": _id_obj,
+            usuario_tutor = await self.db.usuarios.find_one({
+                "_id": ObjectId(tutor_id),
                 "tipo": "tutor"
             })
             if usuario_tutor:
@@ -27,11 +27,11 @@ class ActividadDAO:
         except Exception:
             return TutorInfo(id=str(tutor_id), nombre="Error al obtener tutor")
     
-    def agregar(self, actividad: ActividadInsert):
+    async def agregar(self, actividad: ActividadInsert):
         salida = Salida(estatus="", mensaje="")
         try:
             # Verificar si ya existe una actividad con el mismo nombre
-            actividad_existente = self.db.actividades.find_one({"nombre": actividad.nombre})
+            actividad_existente = await self.db.actividades.find_one({"nombre": actividad.nombre})
             if actividad_existente:
                 salida.estatus = "ERROR"
                 salida.mensaje = "Ya existe una actividad con este nombre."
@@ -39,7 +39,7 @@ class ActividadDAO:
 
             # Si se proporciona un tutor_id, verificar que existe y es de tipo tutor
             if hasattr(actividad, 'tutor_id') and actividad.tutor_id:
-                tutor_valido = self.db.usuarios.find_one({
+                tutor_valido = await self.db.usuarios.find_one({
                     "_id": ObjectId(actividad.tutor_id),
                     "tipo": "tutor",
                     "status": "activo"
@@ -50,15 +50,17 @@ class ActividadDAO:
                     return salida
 
             nueva_actividad = jsonable_encoder(actividad)
-            resultado = self.db.actividades.insert_one(nueva_actividad)
+            if nueva_actividad.get("tutor_id"):
+                nueva_actividad["tutor_id"] = ObjectId(nueva_actividad["tutor_id"])
+            resultado = await self.db.actividades.insert_one(nueva_actividad)
             
             if resultado.inserted_id:
-                actividad_creada = self.db.actividades.find_one({"_id": resultado.inserted_id})
+                actividad_creada = await self.db.actividades.find_one({"_id": resultado.inserted_id})
                 
                 # Obtener información del tutor si existe
                 tutor_info = None
                 if actividad_creada.get("tutor_id"):
-                    tutor_info = self._obtener_tutor_info(actividad_creada["tutor_id"])
+                    tutor_info = await self._obtener_tutor_info(actividad_creada["tutor_id"])
                 
                 actividad_select = ActividadSelectID(
                     id=str(actividad_creada["_id"]),
@@ -77,12 +79,17 @@ class ActividadDAO:
                 salida.estatus = "ERROR"
                 salida.mensaje = "Error al crear la actividad"
                 return salida
+        except DuplicateKeyError:
+            # El índice único de nombre cubre las altas concurrentes que pasan la verificación previa
+            salida.estatus = "ERROR"
+            salida.mensaje = "Ya existe una actividad con este nombre."
+            return salida
         except Exception as e:
             salida.mensaje = f"Error al crear la actividad: {str(e)}"
             salida.estatus = "ERROR"
             return salida
 
-    def consultaGeneral(self) -> ActividadesSalida:
+    async def consultaGeneral(self) -> ActividadesSalida:
         salida = ActividadesSalida(estatus="", mensaje="", actividades=[])
         try:
             actividades_list = self.db.actividades.find()
@@ -92,11 +99,11 @@ class ActividadDAO:
                 return salida
             
             actividades = []
-            for actividad in actividades_list:
+            async for actividad in actividades_list:
                 # Obtener información del tutor si existe
                 tutor_info = None
                 if actividad.get("tutor_id"):
-                    tutor_info = self._obtener_tutor_info(actividad["tutor_id"])
+                    tutor_info = await self._obtener_tutor_info(actividad["tutor_id"])
                 
                 actividades.append(
                     ActividadSelectID(
@@ -118,10 +125,10 @@ class ActividadDAO:
             salida.mensaje = "Error al consultar las actividades, consulte al administrador."
         return salida
 
-    def consultarActividadPorID(self, actividad_id: str) -> ActividadesSalidaID:
+    async def consultarActividadPorID(self, actividad_id: str) -> ActividadesSalidaID:
         salida = ActividadesSalidaID(estatus="", mensaje="", actividad=None)
         try:
-            actividad = self.db.actividades.find_one({"_id": ObjectId(actividad_id)})
+            actividad = await self.db.actividades.find_one({"_id": ObjectId(actividad_id)})
             if not actividad:
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Actividad con ID {actividad_id} no encontrada."
@@ -130,7 +137,7 @@ class ActividadDAO:
             # Obtener información del tutor si existe
             tutor_info = None
             if actividad.get("tutor_id"):
-                tutor_info = self._obtener_tutor_info(actividad["tutor_id"])
+                tutor_info = await self._obtener_tutor_info(actividad["tutor_id"])
             
             actividad_select = ActividadSelectID(
                 id=str(actividad["_id"]),
@@ -150,13 +157,17 @@ class ActividadDAO:
             salida.mensaje = "Error al consultar la actividad, consulte al administrador."
         return salida
 
-    def actualizar(self, actividad_id: str, actividad_update: ActividadInsert) -> ActividadesSalidaID:
+    async def actualizar(self, actividad_id: str, actividad_update: ActividadInsert) -> ActividadesSalidaID:
         salida = ActividadesSalidaID(estatus="", mensaje="", actividad=None)
         try:
-            _id_obj = ObjectId(actividad_id) if ObjectId.is_valid(actividad_id) else actividad_id
+            if not ObjectId.is_valid(actividad_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Actividad con ID {actividad_id} no encontrada."
+                return salida
+            _id_obj = ObjectId(actividad_id)
             
             # Verificar nombres duplicados
-            actividad_existente_mismo_nombre = self.db.actividades.find_one({
+            actividad_existente_mismo_nombre = await self.db.actividades.find_one({
                 "nombre": actividad_update.nombre,
                 "_id": {"$ne": _id_obj}
             })
@@ -166,7 +177,7 @@ class ActividadDAO:
                 return salida
 
             # Verificar que la actividad existe
-            actividad_existente = self.db.actividades.find_one({"_id": _id_obj})
+            actividad_existente = await self.db.actividades.find_one({"_id": _id_obj})
             if not actividad_existente:
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Actividad con ID {actividad_id} no encontrada."
@@ -174,7 +185,7 @@ class ActividadDAO:
 
             # Si se proporciona un tutor_id, verificar que es válido
             if hasattr(actividad_update, 'tutor_id') and actividad_update.tutor_id:
-                tutor_valido = self.db.usuarios.find_one({
+                tutor_valido = await self.db.usuarios.find_one({
                     "_id": ObjectId(actividad_update.tutor_id),
                     "tipo": "tutor",
                     "status": "activo"
@@ -194,20 +205,20 @@ class ActividadDAO:
             
             # Solo agregar tutor_id si está presente
             if actividad_dict.get("tutor_id"):
-                update_data["tutor_id"] = actividad_dict["tutor_id"]
+                update_data["tutor_id"] = ObjectId(actividad_dict["tutor_id"])
 
-            resultado = self.db.actividades.update_one(
+            resultado = await self.db.actividades.update_one(
                 {"_id": _id_obj},
                 {"$set": update_data}
             )
             
             if resultado.modified_count > 0:
-                actividad_actualizada = self.db.actividades.find_one({"_id": _id_obj})
+                actividad_actualizada = await self.db.actividades.find_one({"_id": _id_obj})
                 
                 # Obtener información del tutor si existe
                 tutor_info = None
                 if actividad_actualizada.get("tutor_id"):
-                    tutor_info = self._obtener_tutor_info(actividad_actualizada["tutor_id"])
+                    tutor_info = await self._obtener_tutor_info(actividad_actualizada["tutor_id"])
                 
                 actividad_select = ActividadSelectID(
                     id=str(actividad_actualizada["_id"]),
@@ -223,11 +234,11 @@ class ActividadDAO:
             else:
                 salida.estatus = "OK"
                 salida.mensaje = "No se realizaron cambios en la actividad (posiblemente los datos ya eran los mismos)."
-                actividad_actual = self.db.actividades.find_one({"_id": _id_obj})
+                actividad_actual = await self.db.actividades.find_one({"_id": _id_obj})
                 if actividad_actual:
                     tutor_info = None
                     if actividad_actual.get("tutor_id"):
-                        tutor_info = self._obtener_tutor_info(actividad_actual["tutor_id"])
+                        tutor_info = await self._obtener_tutor_info(actividad_actual["tutor_id"])
                     
                     salida.actividad = ActividadSelectID(
                         id=str(actividad_actual["_id"]),
@@ -237,22 +248,29 @@ class ActividadDAO:
                         obligatoria=actividad_actual["obligatoria"],
                         tutor=tutor_info
                     )
+        except DuplicateKeyError:
+            salida.estatus = "ERROR"
+            salida.mensaje = f"Ya existe otra actividad con el nombre '{actividad_update.nombre}'."
         except Exception as ex:
             print(f"Error al actualizar actividad {actividad_id}: {ex}")
             salida.estatus = "ERROR"
             salida.mensaje = "Error interno al actualizar la actividad."
         return salida
     
-    def asignar_tutor(self, actividad_id: str, tutor_asignacion: TutorAsignacion) -> ActividadesSalidaID:
+    async def asignar_tutor(self, actividad_id: str, tutor_asignacion: TutorAsignacion) -> ActividadesSalidaID:
         """
         Asigna un tutor a una actividad específica
         """
         salida = ActividadesSalidaID(estatus="", mensaje="", actividad=None)
         try:
-            _id_obj = ObjectId(actividad_id) if ObjectId.is_valid(actividad_id) else actividad_id
+            if not ObjectId.is_valid(actividad_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Actividad con ID {actividad_id} no encontrada."
+                return salida
+            _id_obj = ObjectId(actividad_id)
             
             # Verificar que la actividad existe
-            actividad_existente = self.db.actividades.find_one({"_id": _id_obj})
+            actividad_existente = await self.db.actividades.find_one({"_id": _id_obj})
             if not actividad_existente:
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Actividad con ID {actividad_id} no encontrada."
@@ -265,8 +283,12 @@ class ActividadDAO:
                 return salida
 
             # Verificar que el usuario existe, es de tipo tutor y está activo
-            tutor_id_obj = ObjectId(tutor_asignacion.tutor_id) if ObjectId.is_valid(tutor_asignacion.tutor_id) else tutor_asignacion.tutor_id
-            usuario_tutor = self.db.usuarios.find_one({
+            if not ObjectId.is_valid(tutor_asignacion.tutor_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = f"El usuario con ID {tutor_asignacion.tutor_id} no es un tutor válido o no está activo."
+                return salida
+            tutor_id_obj = ObjectId(tutor_asignacion.tutor_id)
+            usuario_tutor = await self.db.usuarios.find_one({
                 "_id": tutor_id_obj,
                 "tipo": "tutor",
                 "status": "activo"
@@ -279,10 +301,10 @@ class ActividadDAO:
 
             # Verificar si ya tiene el mismo tutor asignado
             tutor_actual = actividad_existente.get("tutor_id")
-            if tutor_actual == tutor_asignacion.tutor_id:
+            if tutor_actual == tutor_id_obj:
                 salida.estatus = "OK"
                 salida.mensaje = "El tutor ya está asignado a esta actividad."
-                tutor_info = self._obtener_tutor_info(tutor_asignacion.tutor_id)
+                tutor_info = await self._obtener_tutor_info(tutor_id_obj)
                 salida.actividad = ActividadSelectID(
                     id=str(actividad_existente["_id"]),
                     nombre=actividad_existente["nombre"],
@@ -294,15 +316,15 @@ class ActividadDAO:
                 return salida
 
             # Asignar el nuevo tutor
-            resultado = self.db.actividades.update_one(
+            resultado = await self.db.actividades.update_one(
                 {"_id": _id_obj},
-                {"$set": {"tutor_id": tutor_asignacion.tutor_id}}
+                {"$set": {"tutor_id": tutor_id_obj}}
             )
 
             if resultado.modified_count > 0:
                 # Obtener la actividad actualizada
-                actividad_actualizada = self.db.actividades.find_one({"_id": _id_obj})
-                tutor_info = self._obtener_tutor_info(actividad_actualizada["tutor_id"])
+                actividad_actualizada = await self.db.actividades.find_one({"_id": _id_obj})
+                tutor_info = await self._obtener_tutor_info(actividad_actualizada["tutor_id"])
                 
                 actividad_select = ActividadSelectID(
                     id=str(actividad_actualizada["_id"]),
@@ -328,11 +350,15 @@ class ActividadDAO:
             
         return salida
 
-    def cancelar(self, actividad_id: str) -> Salida:
+    async def cancelar(self, actividad_id: str) -> Salida:
         salida = Salida(estatus="", mensaje="")
         try:
-            _id_obj = ObjectId(actividad_id) if ObjectId.is_valid(actividad_id) else actividad_id
-            actividad_existente = self.db.actividades.find_one({"_id": _id_obj})
+            if not ObjectId.is_valid(actividad_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Actividad con ID {actividad_id} no encontrada."
+                return salida
+            _id_obj = ObjectId(actividad_id)
+            actividad_existente = await self.db.actividades.find_one({"_id": _id_obj})
 
             if not actividad_existente:
                 salida.estatus = "ERROR"
@@ -344,7 +370,7 @@ class ActividadDAO:
                 salida.mensaje = f"La actividad con ID {actividad_id} ya se encuentra cancelada."
                 return salida
 
-            resultado = self.db.actividades.update_one(
+            resultado = await self.db.actividades.update_one(
                 {"_id": _id_obj},
                 {"$set": {"estatus": "Cancelada"}}
             )
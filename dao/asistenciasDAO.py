@@ -1,45 +1,67 @@
-from typing import List
-from models.asistenciasModel import AsistenciaInsert, Salida, AsistenciaSelect, AsistenciaSalida, AsistenciasSalida
+from typing import AsyncIterator, List, Optional
+from dao.contadoresDAO import ContadorDAO
+from models.asistenciasModel import (AsistenciaInsert, AsistenciaUpdate, Salida, AsistenciaSelect, AsistenciaSalida, AsistenciasSalida, AsistenciaFiltros,
+                                     AsistenciaLoteResultado, AsistenciasLoteSalida, AlumnoLoteResultado, AsistenciaAlumnosLoteSalida,
+                                     AsistenciaDetallada, AsistenciaDetalladaSalida, ResumenAsistencia, ResumenAsistenciaSalida)
 from fastapi.encoders import jsonable_encoder
 from bson import ObjectId
-from datetime import datetime, time, timedelta
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from datetime import datetime, time, timedelta, timezone
+import asyncio
+import os
+
+# Máximo de asistencias aceptadas por POST /asistencias/bulk
+ASISTENCIAS_BULK_MAX = int(os.getenv("ASISTENCIAS_BULK_MAX", "500"))
+# Documentos por lote del cursor de GET /asistencias/export
+ASISTENCIAS_EXPORT_BATCH = int(os.getenv("ASISTENCIAS_EXPORT_BATCH", "500"))
+
+# Lo rechaza el índice único actividad_grupo_dia_unico al insertar o actualizar
+_MENSAJE_DUPLICADA = "Ya existe una asistencia registrada para esta actividad, grupo y fecha"
+
+# Campos necesarios para validar y proyectar las asistencias en el modelo de lectura
+_PROYECCION_ACTIVIDAD = {"nombre": 1, "descripcion": 1, "estatus": 1, "obligatoria": 1}
+_PROYECCION_UBICACION = {"nombre": 1, "interno": 1, "latitud": 1, "longitud": 1, "estatus": 1}
+_PROYECCION_GRUPO = {"nombre": 1, "semestre": 1, "estatus": 1, "alumnos": 1, "ciclo": 1}
+_PROYECCION_ALUMNO = {"nombre": 1, "apellidos": 1, "email": 1, "alumno.noControl": 1, "alumno.semestre": 1}
 
 class AsistenciaDAO:
     def __init__(self, db):
         self.db = db
+        self.contadores = ContadorDAO(db)
 
-    def verificar_actividad_existente(self, actividad_id: str) -> bool:
+    async def verificar_actividad_existente(self, actividad_id: str) -> bool:
         """Verifica si existe la actividad especificada"""
         try:
-            return self.db.actividades.find_one({"_id": ObjectId(actividad_id)}) is not None
+            return await self.db.actividades.find_one({"_id": ObjectId(actividad_id)}) is not None
         except:
             return False
 
-    def verificar_ubicacion_existente(self, ubicacion_id: str) -> bool:
+    async def verificar_ubicacion_existente(self, ubicacion_id: str) -> bool:
         """Verifica si existe la ubicación especificada"""
         try:
-            return self.db.ubicaciones.find_one({"_id": ObjectId(ubicacion_id)}) is not None
+            return await self.db.ubicaciones.find_one({"_id": ObjectId(ubicacion_id)}) is not None
         except:
             return False
 
-    def verificar_grupo_existente(self, grupo_id: str) -> bool:
+    async def verificar_grupo_existente(self, grupo_id: str) -> bool:
         """Verifica si existe el grupo especificado"""
         try:
-            return self.db.grupos.find_one({"_id": ObjectId(grupo_id)}) is not None
+            return await self.db.grupos.find_one({"_id": ObjectId(grupo_id)}) is not None
         except:
             return False
 
-    def verificar_alumnos_en_grupo(self, grupo_id: str, numeros_control: List[str]) -> bool:
+    async def verificar_alumnos_en_grupo(self, grupo_id: str, numeros_control: List[str]) -> bool:
         """Verifica que todos los números de control pertenezcan al grupo"""
         try:
             # Obtener alumnos del grupo
-            grupo = self.db.grupos.find_one({"_id": ObjectId(grupo_id)})
+            grupo = await self.db.grupos.find_one({"_id": ObjectId(grupo_id)})
             if not grupo:
                 return False
             
             alumnos_grupo_ids = grupo.get("alumnos", [])
             # Verificar que todos los números de control pertenecen a alumnos del grupo
-            alumnos_validos = self.db.usuarios.count_documents({
+            alumnos_validos = await self.db.usuarios.count_documents({
                 "_id": {"$in": [ObjectId(alumno_id) for alumno_id in numeros_control if ObjectId(alumno_id) in alumnos_grupo_ids]},
                 "tipo": "alumno"
             })
@@ -49,59 +71,26 @@ class AsistenciaDAO:
             print(f"Error verificando alumnos en grupo: {ex}")
             return False
 
-    def verificar_asistencia_existente(self, actividad_id: str, grupo_id: str, fecha_inicio: datetime) -> bool:
-        """Verifica si ya existe una asistencia para la misma actividad, grupo y fecha"""
-        try:
-            # Convertir a ObjectId para la consulta
-            # actividad_obj_id = 
-            # grupo_obj_id = 
-            
-            # Extraer solo la fecha (sin hora) para comparación
-            fecha_solo = fecha_inicio.date() # Sumar un día para incluir todo el día
-            
-            # Crear el rango de fechas para el día completo
-            inicio_dia = datetime.combine(fecha_solo, time.min)
-            fin_dia = datetime.combine(fecha_solo + timedelta(days=1), time.min)
-            
-            print(f"fecha: {fecha_solo}, inicio_dia: {inicio_dia}, fin_dia: {fin_dia}, actividad_id: {actividad_id}, grupo_id: {grupo_id}")
-            
-            # Buscar asistencias existentes para el mismo día, actividad y grupo
-            asistencia_existente = self.db.asistencias.find_one({
-                "actividad": ObjectId(actividad_id),
-                "grupo": ObjectId(grupo_id),
-                "fechaRegistro": {
-                    "$gte": inicio_dia,
-                    "$lt": fin_dia
-                }
-            })
-            
-            print(f"Asistencia existente: {asistencia_existente}")
-            
-            return asistencia_existente is not None
-        except Exception as ex:
-            print(f"Error verificando asistencia existente: {ex}")
-            return False
-
-    def verificar_asistencia_existente_por_id(self, asistencia_id: str) -> bool:
+    async def verificar_asistencia_existente_por_id(self, asistencia_id: str) -> bool:
         """Verifica si existe la asistencia especificada por ID"""
         try:
-            return self.db.asistencias.find_one({"_id": ObjectId(asistencia_id)}) is not None
+            return await self.db.asistencias.find_one({"_id": ObjectId(asistencia_id)}) is not None
         except:
             return False
 
-    def verificar_alumno_existente(self, alumno_id: str) -> bool:
+    async def verificar_alumno_existente(self, alumno_id: str) -> bool:
         """Verifica si existe el alumno especificado"""
         try:
-            alumno = self.db.usuarios.find_one({"_id": ObjectId(alumno_id), "tipo": "alumno"})
+            alumno = await self.db.usuarios.find_one({"_id": ObjectId(alumno_id), "tipo": "alumno"})
             return alumno is not None
         except:
             return False
 
-    def verificar_alumno_en_grupo_asistencia(self, asistencia_id: str, alumno_id: str) -> bool:
+    async def verificar_alumno_en_grupo_asistencia(self, asistencia_id: str, alumno_id: str) -> bool:
         """Verifica si el alumno pertenece al grupo de la asistencia"""
         try:
             # Obtener la asistencia
-            asistencia = self.db.asistencias.find_one({"_id": ObjectId(asistencia_id)})
+            asistencia = await self.db.asistencias.find_one({"_id": ObjectId(asistencia_id)})
             if not asistencia:
                 return False
             
@@ -111,7 +100,7 @@ class AsistenciaDAO:
                 return False
             
             # Verificar si el alumno está en el grupo
-            grupo = self.db.grupos.find_one({"_id": grupo_id})
+            grupo = await self.db.grupos.find_one({"_id": grupo_id})
             if not grupo:
                 return False
             
@@ -122,95 +111,298 @@ class AsistenciaDAO:
             print(f"Error verificando alumno en grupo de asistencia: {ex}")
             return False
 
-    def agregar(self, asistencia: AsistenciaInsert) -> AsistenciaSalida:
-        """Agregar una nueva asistencia"""
-        salida = AsistenciaSalida(estatus="", mensaje="", asistencia=None)
-        
+    @staticmethod
+    def _object_id(valor: str):
+        """ObjectId del valor o None si no es un id válido"""
+        return ObjectId(valor) if ObjectId.is_valid(valor) else None
+
+    async def _alumnos_por_id(self, alumnos_ids: List[ObjectId]) -> dict:
+        """Alumnos indexados por su id en una sola consulta"""
+        if not alumnos_ids:
+            return {}
+        documentos = await self.db.usuarios.find(
+            {"_id": {"$in": alumnos_ids}, "tipo": "alumno"}, _PROYECCION_ALUMNO
+        ).to_list()
+        return {documento["_id"]: documento for documento in documentos}
+
+    @staticmethod
+    def _registro_alumno(registro: dict, alumno: dict) -> dict:
+        """Entrada de listaAsistencia en la respuesta a partir del registro base y del usuario alumno"""
+        datos_alumno = alumno.get("alumno", {})
+        return {
+            "id": str(registro["_id"]),
+            "fechaHoraRegistro": registro["fechaHoraRegistro"],
+            "alumno": {
+                "nombre": alumno["nombre"],
+                "apellidos": alumno["apellidos"],
+                "email": alumno["email"],
+                "noControl": datos_alumno.get("noControl"),
+                "semestre": datos_alumno.get("semestre"),
+            },
+        }
+
+    @staticmethod
+    def _construir_select(documento: dict, actividad: dict, ubicacion: dict, grupo: dict, alumnos: dict) -> AsistenciaSelect:
+        """Arma la respuesta a partir de los documentos ya leídos, sin volver a consultar la vista"""
+        lista = [
+            AsistenciaDAO._registro_alumno(registro, alumnos[registro["_id"]])
+            for registro in documento.get("listaAsistencia", []) if registro["_id"] in alumnos
+        ]
+        return AsistenciaSelect(
+            id=str(documento["_id"]),
+            actividad={
+                "id": str(actividad["_id"]),
+                "nombre": actividad["nombre"],
+                "descripcion": actividad["descripcion"],
+                "estatus": actividad["estatus"],
+                "obligatoria": actividad["obligatoria"],
+            },
+            fechaRegistro=documento["fechaRegistro"],
+            fechaInicio=documento["fechaInicio"],
+            fechaFin=documento["fechaFin"],
+            horaInicio=AsistenciaDAO._hora(documento["horaInicio"]),
+            horaFin=AsistenciaDAO._hora(documento["horaFin"]),
+            estatus=documento["estatus"],
+            ubicacion={
+                "id": str(ubicacion["_id"]),
+                "nombre": ubicacion["nombre"],
+                "interno": ubicacion["interno"],
+                "latitud": ubicacion["latitud"],
+                "longitud": ubicacion["longitud"],
+                "estatus": ubicacion.get("estatus", "Activa"),
+            },
+            grupo={
+                "id": str(grupo["_id"]),
+                "nombre": grupo["nombre"],
+                "semestre": grupo["semestre"],
+                "estatus": grupo.get("estatus", "activo"),
+            },
+            listaAsistencia=lista,
+        )
+
+    @staticmethod
+    def _documento_lectura(asistencia: AsistenciaSelect, version: int) -> dict:
+        """Documento de asistencias_read: la respuesta ya resuelta, con el mismo _id y la versión del documento base"""
+        documento = asistencia.model_dump(exclude={"id"})
+        documento["_id"] = ObjectId(asistencia.id)
+        documento["version"] = version
+        documento["actualizadoEn"] = datetime.now()
+        return documento
+
+    @staticmethod
+    def _filtro_version(asistencia_id: ObjectId, version: int) -> dict:
+        """Una proyección sólo se reemplaza si no refleja ya una versión más nueva de la asistencia"""
+        return {"_id": asistencia_id, "$or": [{"version": {"$lte": version}}, {"version": {"$exists": False}}]}
+
+    @staticmethod
+    def _select_desde_lectura(documento: dict) -> AsistenciaSelect:
+        return AsistenciaSelect.model_validate({**documento, "id": str(documento["_id"])})
+
+    # asistencias_read se mantiene con una sola regla: cada escritura en asistencias incrementa "version" y la
+    # proyección sólo avanza a una versión igual o posterior a la que ya tiene. Los cambios puntuales ($push/$pull/$set)
+    # se aplican sobre la versión inmediata anterior; si la proyección falta o va desfasada se reconstruye completa.
+    async def _guardar_lectura(self, asistencia: AsistenciaSelect, version: int):
+        """Reemplaza la proyección; si falla, la escritura principal sigue siendo válida y se corrige al reconstruir"""
         try:
-            # Validar que la actividad existe
-            if not self.verificar_actividad_existente(asistencia.actividad):
-                salida.estatus = "ERROR"
-                salida.mensaje = "La actividad especificada no existe"
-                return salida
+            documento = self._documento_lectura(asistencia, version)
+            await self.db.asistencias_read.replace_one(self._filtro_version(documento["_id"], version), documento, upsert=True)
+        except DuplicateKeyError:
+            pass  # Ya hay una proyección de una versión posterior
+        except Exception as ex:
+            print(f"Error al actualizar asistencias_read {asistencia.id}: {ex}")
 
-            # Validar que la ubicación existe
-            if not self.verificar_ubicacion_existente(asistencia.ubicacion):
-                salida.estatus = "ERROR"
-                salida.mensaje = "La ubicación especificada no existe"
-                return salida
+    async def _actualizar_lectura(self, documento: dict, cambios: dict) -> Optional[AsistenciaSelect]:
+        """Aplica cambios puntuales a la proyección de la versión anterior de documento (el devuelto por la escritura,
+        con _id y version); si no la encuentra, reconstruye la proyección desde la colección base"""
+        version = documento["version"]
+        try:
+            lectura = await self.db.asistencias_read.find_one_and_update(
+                {"_id": documento["_id"], "version": version - 1},
+                {**cambios, "$set": {**cambios.get("$set", {}), "version": version, "actualizadoEn": datetime.now()}},
+                return_document=ReturnDocument.AFTER
+            )
+            if lectura is not None:
+                return self._select_desde_lectura(lectura)
+        except Exception as ex:
+            print(f"Error al actualizar asistencias_read {documento['_id']}: {ex}")
+        return await self._proyectar(documento["_id"])
 
-            # Validar que el grupo existe
-            if not self.verificar_grupo_existente(asistencia.grupo):
-                salida.estatus = "ERROR"
-                salida.mensaje = "El grupo especificado no existe"
-                return salida
+    async def _proyectar(self, asistencia_id: ObjectId) -> Optional[AsistenciaSelect]:
+        """Recalcula la proyección de una asistencia a partir de la colección base"""
+        documento = await self.db.asistencias.find_one({"_id": asistencia_id})
+        if documento is None:
+            await self.db.asistencias_read.delete_one({"_id": asistencia_id})
+            return None
+        return await self._proyectar_documento(documento)
 
-            # Validar que los alumnos pertenecen al grupo
-            if not self.verificar_alumnos_en_grupo(asistencia.grupo, asistencia.listaAsistencia):
-                salida.estatus = "ERROR"
-                salida.mensaje = "Uno o más números de control no pertenecen al grupo especificado"
-                return salida
+    async def _proyectar_documento(self, documento: dict) -> Optional[AsistenciaSelect]:
+        """Proyecta un documento base completo ya leído (p. ej. el devuelto por find_one_and_update)"""
+        asistencias = await self._hidratar([documento])
+        if not asistencias:
+            return None
+        await self._guardar_lectura(asistencias[0], documento.get("version", 0))
+        return asistencias[0]
 
-            # Validar que no existe asistencia duplicada
-            if self.verificar_asistencia_existente(asistencia.actividad, asistencia.grupo, asistencia.fechaInicio):
-                salida.estatus = "ERROR"
-                salida.mensaje = "Ya existe una asistencia registrada para esta actividad, grupo y fecha"
-                return salida
+    async def _guardar_lecturas(self, asistencias: List[AsistenciaSelect], versiones: dict) -> int:
+        """Reemplaza varias proyecciones con un solo bulk_write (versiones: _id -> versión del documento base)"""
+        if not asistencias:
+            return 0
+        operaciones = []
+        for asistencia in asistencias:
+            version = versiones.get(ObjectId(asistencia.id), 0)
+            documento = self._documento_lectura(asistencia, version)
+            operaciones.append(ReplaceOne(self._filtro_version(documento["_id"], version), documento, upsert=True))
+        try:
+            await self.db.asistencias_read.bulk_write(operaciones, ordered=False)
+        except BulkWriteError as ex:
+            # Las claves duplicadas son proyecciones que ya van en una versión posterior
+            if any(error.get("code") != 11000 for error in ex.details.get("writeErrors", [])):
+                raise
+        return len(operaciones)
 
-            # Validar que la fecha de fin sea posterior a la de inicio
-            if asistencia.fechaFin <= asistencia.fechaInicio:
-                salida.estatus = "ERROR"
-                salida.mensaje = "La fecha de fin debe ser posterior a la fecha de inicio"
-                return salida
+    async def proyectar_lote(self, documentos: List[dict]) -> int:
+        """Proyecta un lote de asistencias base en asistencias_read"""
+        versiones = {documento["_id"]: documento.get("version", 0) for documento in documentos}
+        return await self._guardar_lecturas(await self._hidratar(documentos), versiones)
 
-            # Validar que la hora de fin sea posterior a la de inicio
-            if asistencia.horaFin <= asistencia.horaInicio:
+    async def _consultar_lectura(self, asistencia_id: ObjectId) -> Optional[AsistenciaSelect]:
+        documento = await self.db.asistencias_read.find_one({"_id": asistencia_id})
+        if documento is not None:
+            return self._select_desde_lectura(documento)
+        # Asistencias anteriores al modelo de lectura: se proyectan al primer acceso
+        return await self._proyectar(asistencia_id)
+
+    @staticmethod
+    def _error_insert(asistencia: AsistenciaInsert, actividad: Optional[dict], ubicacion: Optional[dict],
+                      grupo: Optional[dict], alumnos: Optional[dict], alumnos_ids: list, duplicada: bool = False) -> Optional[str]:
+        """Mensaje de la primera validación que falla para una alta, o None si es válida"""
+        # Validar que la actividad existe
+        if actividad is None:
+            return "La actividad especificada no existe"
+
+        # Validar que la ubicación existe
+        if ubicacion is None:
+            return "La ubicación especificada no existe"
+
+        # Validar que el grupo existe
+        if grupo is None:
+            return "El grupo especificado no existe"
+
+        # Validar que los alumnos pertenecen al grupo (un alumno repetido se rechaza, como al comparar conteos)
+        alumnos_grupo = {str(alumno_id) for alumno_id in grupo.get("alumnos", [])}
+        if alumnos is None or len(set(alumnos_ids)) != len(alumnos_ids) or any(
+            alumno_id not in alumnos or str(alumno_id) not in alumnos_grupo for alumno_id in alumnos_ids
+        ):
+            return "Uno o más números de control no pertenecen al grupo especificado"
+
+        # Validar que no existe asistencia duplicada
+        if duplicada:
+            return _MENSAJE_DUPLICADA
+
+        # Validar que la fecha de fin sea posterior a la de inicio
+        if asistencia.fechaFin <= asistencia.fechaInicio:
+            return "La fecha de fin debe ser posterior a la fecha de inicio"
+
+        # Validar que la hora de fin sea posterior a la de inicio
+        if AsistenciaDAO._minutos(asistencia.horaFin) <= AsistenciaDAO._minutos(asistencia.horaInicio):
+            return "La hora de fin debe ser posterior a la hora de inicio"
+
+        return None
+
+    @staticmethod
+    def _minutos(hora) -> int:
+        """Minuto del día de una hora "HH:mm" (los documentos ya migrados la guardan como entero)"""
+        if isinstance(hora, int):
+            return hora
+        horas, minutos = hora.split(":")
+        return int(horas) * 60 + int(minutos)
+
+    @staticmethod
+    def _hora(minutos) -> str:
+        """Formato "HH:mm" de la API para un minuto del día (o una hora guardada como texto antes de migrar)"""
+        if isinstance(minutos, str):
+            return minutos
+        return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+    @staticmethod
+    def _dia(fecha_inicio: datetime) -> datetime:
+        """Llave de unicidad: el día de fechaInicio a las 00:00"""
+        return datetime.combine(fecha_inicio.date(), time.min)
+
+    @staticmethod
+    def _documento_insert(asistencia: AsistenciaInsert, actividad_id: ObjectId, ubicacion_id: ObjectId,
+                          grupo_id: ObjectId, alumnos_ids: List[ObjectId], ahora: datetime) -> dict:
+        asistencia_dict = jsonable_encoder(asistencia)
+        
+        # Convertir IDs a ObjectId
+        asistencia_dict["actividad"] = actividad_id
+        asistencia_dict["ubicacion"] = ubicacion_id
+        asistencia_dict["grupo"] = grupo_id
+        # Fechas nativas para que los filtros por rango usen el índice de fechaInicio
+        asistencia_dict["fechaInicio"] = asistencia.fechaInicio
+        asistencia_dict["fechaFin"] = asistencia.fechaFin
+        asistencia_dict["fechaRegistro"] = ahora
+        asistencia_dict["dia"] = AsistenciaDAO._dia(asistencia.fechaInicio)
+        asistencia_dict["version"] = 1
+        # Horas como minuto del día: se comparan y filtran como números, no como texto
+        asistencia_dict["horaInicio"] = AsistenciaDAO._minutos(asistencia.horaInicio)
+        asistencia_dict["horaFin"] = AsistenciaDAO._minutos(asistencia.horaFin)
+        asistencia_dict["listaAsistencia"] = [
+            {
+                "_id": alumno_id,
+                "fechaHoraRegistro": ahora
+            } for alumno_id in alumnos_ids
+        ]
+        return asistencia_dict
+
+    async def _ninguno(self):
+        return None
+
+    async def agregar(self, asistencia: AsistenciaInsert) -> AsistenciaSalida:
+        """Agregar una nueva asistencia"""
+        salida = AsistenciaSalida(estatus="", mensaje="", asistencia=None)
+        
+        try:
+            actividad_id = self._object_id(asistencia.actividad)
+            ubicacion_id = self._object_id(asistencia.ubicacion)
+            grupo_id = self._object_id(asistencia.grupo)
+            alumnos_ids = [self._object_id(alumno) for alumno in asistencia.listaAsistencia]
+            alumnos_validos = None not in alumnos_ids
+
+            # Todas las referencias se resuelven en paralelo: una sola espera en lugar de una consulta tras otra
+            actividad, ubicacion, grupo, alumnos = await asyncio.gather(
+                self.db.actividades.find_one({"_id": actividad_id}, _PROYECCION_ACTIVIDAD) if actividad_id else self._ninguno(),
+                self.db.ubicaciones.find_one({"_id": ubicacion_id}, _PROYECCION_UBICACION) if ubicacion_id else self._ninguno(),
+                self.db.grupos.find_one({"_id": grupo_id}, _PROYECCION_GRUPO) if grupo_id else self._ninguno(),
+                self._alumnos_por_id(list(set(alumnos_ids))) if alumnos_validos else self._ninguno(),
+            )
+
+            error = self._error_insert(asistencia, actividad, ubicacion, grupo, alumnos, alumnos_ids)
+            if error:
                 salida.estatus = "ERROR"
-                salida.mensaje = "La hora de fin debe ser posterior a la hora de inicio"
+                salida.mensaje = error
                 return salida
 
             # Crear la asistencia
-            asistencia_dict = jsonable_encoder(asistencia)
+            asistencia_dict = self._documento_insert(asistencia, actividad_id, ubicacion_id, grupo_id, alumnos_ids, datetime.now())
             
-            # Convertir IDs a ObjectId
-            asistencia_dict["actividad"] = ObjectId(asistencia.actividad)
-            asistencia_dict["ubicacion"] = ObjectId(asistencia.ubicacion)
-            asistencia_dict["grupo"] = ObjectId(asistencia.grupo)
-            asistencia_dict["fechaRegistro"] = datetime.now()
-            asistencia_dict["listaAsistencia"] = [
-                {
-                    "_id": ObjectId(alumno),
-                    "fechaHoraRegistro": datetime.now()
-                } for alumno in asistencia.listaAsistencia
-            ]
-            
-            resultado = self.db.asistencias.insert_one(asistencia_dict)
+            # El índice único sobre (actividad, grupo, dia) rechaza el duplicado sin una consulta previa
+            try:
+                resultado = await self.db.asistencias.insert_one(asistencia_dict)
+            except DuplicateKeyError:
+                salida.estatus = "ERROR"
+                salida.mensaje = _MENSAJE_DUPLICADA
+                return salida
             
             if resultado.inserted_id:
-                # Obtener la asistencia creada desde la vista
-                asistencia_creada = self.db.viewAsistenciasGeneral.find_one({"_id": resultado.inserted_id})
-                
-                if asistencia_creada:
-                    asistencia_select = AsistenciaSelect(
-                        id=str(asistencia_creada["_id"]),
-                        actividad=asistencia_creada["actividad"],
-                        fechaRegistro=asistencia_creada["fechaRegistro"],
-                        fechaInicio=asistencia_creada["fechaInicio"],
-                        fechaFin=asistencia_creada["fechaFin"],
-                        horaInicio=asistencia_creada["horaInicio"],
-                        horaFin=asistencia_creada["horaFin"],
-                        estatus=asistencia_creada["estatus"],
-                        ubicacion=asistencia_creada["ubicacion"],
-                        grupo=asistencia_creada["grupo"],
-                        listaAsistencia=asistencia_creada["listaAsistencia"]
-                    )
-                    
-                    salida.estatus = "OK"
-                    salida.mensaje = f"Asistencia registrada con ID: {resultado.inserted_id}"
-                    salida.asistencia = asistencia_select
-                else:
-                    salida.estatus = "ERROR"
-                    salida.mensaje = "Error al obtener la asistencia creada"
+                # La respuesta se arma con los documentos ya leídos en la validación
+                salida.estatus = "OK"
+                salida.mensaje = f"Asistencia registrada con ID: {resultado.inserted_id}"
+                salida.asistencia = self._construir_select(asistencia_dict, actividad, ubicacion, grupo, alumnos)
+                await asyncio.gather(
+                    self._guardar_lectura(salida.asistencia, asistencia_dict["version"]),
+                    self.contadores.registrar_asistencia(asistencia_dict, grupo),
+                )
             else:
                 salida.estatus = "ERROR"
                 salida.mensaje = "Error al registrar la asistencia"
@@ -222,30 +414,185 @@ class AsistenciaDAO:
             
         return salida
 
-    def consultaGeneral(self) -> AsistenciasSalida:
-        """Consultar todas las asistencias"""
+    @staticmethod
+    def _filtro_consulta(filtros: AsistenciaFiltros) -> dict:
+        """Traduce AsistenciaFiltros a un filtro sobre asistencias_read; ValueError si algún id es inválido"""
+        filtro = {}
+        for campo, valor in (("actividad", filtros.actividad_id), ("grupo", filtros.grupo_id), ("ubicacion", filtros.ubicacion_id)):
+            if valor is not None:
+                if not ObjectId.is_valid(valor):
+                    raise ValueError(f"El id de {campo} no es válido")
+                filtro[f"{campo}.id"] = valor
+        if filtros.estatus is not None:
+            filtro["estatus"] = filtros.estatus
+        rango = {}
+        if filtros.fecha_desde is not None:
+            rango["$gte"] = filtros.fecha_desde
+        if filtros.fecha_hasta is not None:
+            rango["$lte"] = filtros.fecha_hasta
+        if rango:
+            filtro["fechaInicio"] = rango
+        return filtro
+
+    async def _por_id(self, coleccion, ids: set, proyeccion: dict) -> dict:
+        if not ids:
+            return {}
+        documentos = await self.db[coleccion].find({"_id": {"$in": list(ids)}}, proyeccion).to_list()
+        return {documento["_id"]: documento for documento in documentos}
+
+    async def agregarLote(self, asistencias: List[AsistenciaInsert]) -> AsistenciasLoteSalida:
+        """Registrar varias asistencias validando por conjuntos y con un solo insert_many"""
+        salida = AsistenciasLoteSalida(estatus="", mensaje="")
+
+        if len(asistencias) > ASISTENCIAS_BULK_MAX:
+            salida.estatus = "ERROR"
+            salida.mensaje = f"Se aceptan como máximo {ASISTENCIAS_BULK_MAX} asistencias por solicitud"
+            return salida
+
+        try:
+            elementos = []
+            for asistencia in asistencias:
+                alumnos_ids = [self._object_id(alumno) for alumno in asistencia.listaAsistencia]
+                elementos.append({
+                    "actividad": self._object_id(asistencia.actividad),
+                    "ubicacion": self._object_id(asistencia.ubicacion),
+                    "grupo": self._object_id(asistencia.grupo),
+                    "alumnos": alumnos_ids if None not in alumnos_ids else None,
+                })
+
+            # Una consulta $in por colección para todo el lote, en paralelo
+            actividades, ubicaciones, grupos, alumnos = await asyncio.gather(
+                self._por_id("actividades", {e["actividad"] for e in elementos if e["actividad"]}, _PROYECCION_ACTIVIDAD),
+                self._por_id("ubicaciones", {e["ubicacion"] for e in elementos if e["ubicacion"]}, _PROYECCION_UBICACION),
+                self._por_id("grupos", {e["grupo"] for e in elementos if e["grupo"]}, _PROYECCION_GRUPO),
+                self._alumnos_por_id(list({a for e in elementos if e["alumnos"] for a in e["alumnos"]})),
+            )
+
+            resultados = [AsistenciaLoteResultado(indice=i, estatus="", mensaje="") for i in range(len(asistencias))]
+            ahora = datetime.now()
+            nuevos = []  # (indice, documento)
+            vistas = set()  # duplicados dentro del propio lote; contra lo ya guardado decide el índice único
+            for i, (elemento, asistencia) in enumerate(zip(elementos, asistencias)):
+                clave = (elemento["actividad"], elemento["grupo"], self._dia(asistencia.fechaInicio))
+                error = self._error_insert(
+                    asistencia,
+                    actividades.get(elemento["actividad"]),
+                    ubicaciones.get(elemento["ubicacion"]),
+                    grupos.get(elemento["grupo"]),
+                    alumnos if elemento["alumnos"] is not None else None,
+                    elemento["alumnos"] or [],
+                    clave in vistas,
+                )
+                if error:
+                    resultados[i].estatus = "ERROR"
+                    resultados[i].mensaje = error
+                    continue
+                vistas.add(clave)
+                nuevos.append((i, self._documento_insert(
+                    asistencia, elemento["actividad"], elemento["ubicacion"], elemento["grupo"], elemento["alumnos"], ahora
+                )))
+
+            # insert_many asigna los _id en el cliente; los errores se reportan por posición dentro de 'nuevos'
+            fallidos = {}
+            if nuevos:
+                try:
+                    await self.db.asistencias.insert_many([documento for _, documento in nuevos], ordered=False)
+                except BulkWriteError as ex:
+                    for error in ex.details.get("writeErrors", []):
+                        fallidos[error["index"]] = error
+
+            registradas = []
+            cambios = self.contadores.cambios()
+            for posicion, (i, documento) in enumerate(nuevos):
+                if posicion in fallidos:
+                    resultados[i].estatus = "ERROR"
+                    if fallidos[posicion].get("code") == 11000:
+                        resultados[i].mensaje = _MENSAJE_DUPLICADA
+                    else:
+                        print(f"Error al registrar asistencia {i} del lote: {fallidos[posicion].get('errmsg')}")
+                        resultados[i].mensaje = "Error al registrar la asistencia"
+                    continue
+                resultados[i].estatus = "OK"
+                resultados[i].mensaje = f"Asistencia registrada con ID: {documento['_id']}"
+                resultados[i].id = str(documento["_id"])
+                registradas.append(self._construir_select(
+                    documento, actividades[documento["actividad"]], ubicaciones[documento["ubicacion"]],
+                    grupos[documento["grupo"]], alumnos
+                ))
+                self.contadores.sumar_asistencia(cambios, documento, grupos[documento["grupo"]])
+
+            try:
+                await self._guardar_lecturas(registradas, {documento["_id"]: documento["version"] for _, documento in nuevos})
+            except Exception as ex:
+                print(f"Error al actualizar asistencias_read del lote: {ex}")
+            await self.contadores.aplicar(cambios)
+
+            salida.registradas = len(registradas)
+            salida.resultados = resultados
+            salida.estatus = "OK" if registradas else "ERROR"
+            salida.mensaje = f"Se registraron {len(registradas)} de {len(asistencias)} asistencias"
+
+        except Exception as ex:
+            print(f"Error al registrar asistencias en lote: {ex}")
+            salida.estatus = "ERROR"
+            salida.mensaje = "Error interno al registrar las asistencias"
+
+        return salida
+
+    async def _hidratar(self, documentos: List[dict]) -> List[AsistenciaSelect]:
+        """Resuelve las referencias de una página con una consulta $in por colección"""
+        actividades_ids = list({documento["actividad"] for documento in documentos})
+        ubicaciones_ids = list({documento["ubicacion"] for documento in documentos})
+        grupos_ids = list({documento["grupo"] for documento in documentos})
+        alumnos_ids = list({registro["_id"] for documento in documentos for registro in documento.get("listaAsistencia", [])})
+
+        actividades, ubicaciones, grupos, alumnos = await asyncio.gather(
+            self.db.actividades.find({"_id": {"$in": actividades_ids}}, _PROYECCION_ACTIVIDAD).to_list(),
+            self.db.ubicaciones.find({"_id": {"$in": ubicaciones_ids}}, _PROYECCION_UBICACION).to_list(),
+            self.db.grupos.find({"_id": {"$in": grupos_ids}}, {"alumnos": 0}).to_list(),
+            self._alumnos_por_id(alumnos_ids),
+        )
+        actividades = {actividad["_id"]: actividad for actividad in actividades}
+        ubicaciones = {ubicacion["_id"]: ubicacion for ubicacion in ubicaciones}
+        grupos = {grupo["_id"]: grupo for grupo in grupos}
+
+        asistencias = []
+        for documento in documentos:
+            actividad = actividades.get(documento["actividad"])
+            ubicacion = ubicaciones.get(documento["ubicacion"])
+            grupo = grupos.get(documento["grupo"])
+            # Igual que en la vista, se omiten las asistencias con referencias que ya no existen
+            if actividad is None or ubicacion is None or grupo is None:
+                continue
+            asistencias.append(self._construir_select(documento, actividad, ubicacion, grupo, alumnos))
+        return asistencias
+
+    async def consultaGeneral(self, filtros: Optional[AsistenciaFiltros] = None, after: Optional[str] = None,
+                              limit: int = 50) -> AsistenciasSalida:
+        """Consultar asistencias paginadas por _id (after = último id de la página anterior)"""
         salida = AsistenciasSalida(estatus="", mensaje="", asistencias=[])
         
         try:
-            asistencias_list = self.db.viewAsistenciasGeneral.find()
-            
-            asistencias = []
-            for asistencia in asistencias_list:
-                asistencias.append(
-                    AsistenciaSelect(
-                        id=str(asistencia["_id"]),
-                        actividad=asistencia["actividad"],
-                        fechaRegistro=asistencia["fechaRegistro"],
-                        fechaInicio=asistencia["fechaInicio"],
-                        fechaFin=asistencia["fechaFin"],
-                        horaInicio=asistencia["horaInicio"],
-                        horaFin=asistencia["horaFin"],
-                        estatus=asistencia["estatus"],
-                        ubicacion=asistencia["ubicacion"],
-                        grupo=asistencia["grupo"],
-                        listaAsistencia=asistencia["listaAsistencia"]
-                    )
-                )
+            try:
+                filtro = self._filtro_consulta(filtros or AsistenciaFiltros())
+            except ValueError as ex:
+                salida.estatus = "ERROR"
+                salida.mensaje = str(ex)
+                return salida
+
+            if after is not None:
+                if not ObjectId.is_valid(after):
+                    salida.estatus = "ERROR"
+                    salida.mensaje = "El cursor de paginación no es válido"
+                    return salida
+                filtro["_id"] = {"$gt": ObjectId(after)}
+
+            # Se pide un documento extra para saber si hay página siguiente
+            documentos = await self.db.asistencias_read.find(filtro).sort("_id", 1).limit(limit + 1).to_list()
+            hay_siguiente = len(documentos) > limit
+            documentos = documentos[:limit]
+
+            asistencias = [self._select_desde_lectura(documento) for documento in documentos]
                 
             if not asistencias:
                 salida.estatus = "ERROR"
@@ -254,6 +601,8 @@ class AsistenciaDAO:
                 salida.estatus = "OK"
                 salida.mensaje = "Listado de asistencias."
                 salida.asistencias = asistencias
+                if hay_siguiente:
+                    salida.siguiente = str(documentos[-1]["_id"])
                 
         except Exception as ex:
             print(f"Error al consultar asistencias: {ex}")
@@ -262,79 +611,135 @@ class AsistenciaDAO:
             
         return salida
 
-    def agregarAlumnoAsistencia(self, asistencia_id: str, alumno_id: str) -> AsistenciaSalida:
+    async def es_alumno_de_tutor(self, tutor_id: ObjectId, alumno_id: str) -> bool:
+        """El alumno tiene asignado al tutor o pertenece a uno de sus grupos"""
+        if not ObjectId.is_valid(alumno_id):
+            return False
+        alumno_oid = ObjectId(alumno_id)
+        asignado, en_grupo = await asyncio.gather(
+            self.db.usuarios.find_one({"_id": alumno_oid, "tipo": "alumno", "tutorId": tutor_id}, {"_id": 1}),
+            self.db.grupos.find_one(
+                {"tutor": tutor_id, "alumnos": alumno_oid}, {"_id": 1}
+            ),
+        )
+        return asignado is not None or en_grupo is not None
+
+    async def consultarPorAlumno(self, alumno_id: str, after: Optional[str] = None, limit: int = 50) -> AsistenciasSalida:
+        """Asistencias en las que está registrado un alumno, con sólo su propio registro en listaAsistencia"""
+        salida = AsistenciasSalida(estatus="", mensaje="", asistencias=[])
+
+        try:
+            if not ObjectId.is_valid(alumno_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = "El id del alumno no es válido"
+                return salida
+
+            filtro = {"listaAsistencia.id": alumno_id}
+            if after is not None:
+                if not ObjectId.is_valid(after):
+                    salida.estatus = "ERROR"
+                    salida.mensaje = "El cursor de paginación no es válido"
+                    return salida
+                filtro["_id"] = {"$gt": ObjectId(after)}
+
+            # $elemMatch en la proyección deja fuera a los demás alumnos de cada sesión
+            documentos = await self.db.asistencias_read.find(
+                filtro, {"actualizadoEn": 0, "listaAsistencia": {"$elemMatch": {"id": alumno_id}}}
+            ).sort("_id", 1).limit(limit + 1).to_list()
+            hay_siguiente = len(documentos) > limit
+            documentos = documentos[:limit]
+
+            if not documentos:
+                salida.estatus = "ERROR"
+                salida.mensaje = "No se encontraron asistencias registradas para el alumno."
+            else:
+                salida.estatus = "OK"
+                salida.mensaje = "Historial de asistencias del alumno."
+                salida.asistencias = [self._select_desde_lectura(documento) for documento in documentos]
+                if hay_siguiente:
+                    salida.siguiente = str(documentos[-1]["_id"])
+
+        except Exception as ex:
+            print(f"Error al consultar asistencias del alumno {alumno_id}: {ex}")
+            salida.estatus = "ERROR"
+            salida.mensaje = "Error al consultar las asistencias del alumno, consulte al administrador."
+
+        return salida
+
+    def exportar(self, filtros: Optional[AsistenciaFiltros] = None) -> AsyncIterator[bytes]:
+        """Líneas NDJSON de las asistencias filtradas; ValueError si los filtros son inválidos (antes de empezar a enviar)"""
+        filtro = self._filtro_consulta(filtros or AsistenciaFiltros())
+        return self._lineas_exportacion(filtro)
+
+    async def _lineas_exportacion(self, filtro: dict) -> AsyncIterator[bytes]:
+        # Cada documento se serializa y se entrega al cliente en cuanto llega; sólo un lote vive en memoria.
+        # Un error a la mitad se propaga: corta la respuesta chunked en lugar de entregar un archivo truncado como completo
+        cursor = self.db.asistencias_read.find(filtro).sort("_id", 1).batch_size(ASISTENCIAS_EXPORT_BATCH)
+        try:
+            async for documento in cursor:
+                yield self._select_desde_lectura(documento).model_dump_json().encode("utf-8") + b"\n"
+        finally:
+            await cursor.close()
+
+    async def agregarAlumnoAsistencia(self, asistencia_id: str, alumno_id: str) -> AsistenciaSalida:
         """Agregar un alumno a la lista de asistencia"""
         salida = AsistenciaSalida(estatus="", mensaje="", asistencia=None)
         
         try:
-            # Validar que la asistencia existe
-            if not self.verificar_asistencia_existente_por_id(asistencia_id):
+            if not ObjectId.is_valid(asistencia_id):
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
                 return salida
+            _id_obj = ObjectId(asistencia_id)
+            alumno_oid = self._object_id(alumno_id)
 
-            # Validar que el alumno existe
-            if not self.verificar_alumno_existente(alumno_id):
-                salida.estatus = "ERROR"
-                salida.mensaje = "El alumno especificado no existe o no es de tipo alumno"
-                return salida
+            # El alumno y sus grupos (en paralelo): la pertenencia al grupo de la asistencia se valida en el filtro de la
+            # actualización, porque el grupo sólo se conoce dentro de la asistencia
+            alumno, grupos = await asyncio.gather(
+                self.db.usuarios.find_one({"_id": alumno_oid, "tipo": "alumno"}, _PROYECCION_ALUMNO) if alumno_oid else self._ninguno(),
+                self.db.grupos.find({"alumnos": alumno_oid}, {"ciclo": 1}).to_list() if alumno_oid else self._ninguno(),
+            )
+            grupos = {grupo["_id"]: grupo for grupo in grupos or []}
+
+            # Existencia, grupo y "no registrado" van en el filtro: dos registros simultáneos no pueden duplicar al alumno
+            registro = {"_id": alumno_oid, "fechaHoraRegistro": datetime.now()}
+            asistencia_actualizada = await self.db.asistencias.find_one_and_update(
+                {"_id": _id_obj, "grupo": {"$in": list(grupos)}, "listaAsistencia._id": {"$ne": alumno_oid}},
+                {"$push": {"listaAsistencia": registro}, "$inc": {"version": 1}},
+                projection={"actividad": 1, "grupo": 1, "estatus": 1, "version": 1},
+                return_document=ReturnDocument.AFTER
+            ) if alumno else None
 
-            # Verificar que el alumno pertenece al grupo de la asistencia
-            if not self.verificar_alumno_en_grupo_asistencia(asistencia_id, alumno_id):
+            if asistencia_actualizada is None:
+                # Sin cambios: una lectura en el camino de error distingue el motivo, que el filtro no reporta
+                asistencia = await self.db.asistencias.find_one({"_id": _id_obj}, {"grupo": 1})
                 salida.estatus = "ERROR"
-                salida.mensaje = "El alumno no pertenece al grupo de esta asistencia"
+                if asistencia is None:
+                    salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
+                elif alumno is None:
+                    salida.mensaje = "El alumno especificado no existe o no es de tipo alumno"
+                elif asistencia.get("grupo") not in grupos:
+                    salida.mensaje = "El alumno no pertenece al grupo de esta asistencia"
+                else:
+                    salida.mensaje = "El alumno ya está registrado en esta asistencia"
                 return salida
 
-            # Verificar si el alumno ya está en la lista de asistencia
-            asistencia_actual = self.db.asistencias.find_one({"_id": ObjectId(asistencia_id)})
-            alumnos_en_asistencia = [str(alumno["_id"]) for alumno in asistencia_actual.get("listaAsistencia", [])]
-            
-            if alumno_id in alumnos_en_asistencia:
-                salida.estatus = "ERROR"
-                salida.mensaje = "El alumno ya está registrado en esta asistencia"
-                return salida
-
-            # Agregar el alumno a la lista de asistencia
-            resultado = self.db.asistencias.update_one(
-                {"_id": ObjectId(asistencia_id)},
-                {
-                    "$addToSet": {
-                        "listaAsistencia": {
-                            "_id": ObjectId(alumno_id),
-                            "fechaHoraRegistro": datetime.now()
-                        }
-                    }
-                }
+            # Modelo de lectura con un $push del registro ya resuelto y contadores con el grupo ya leído
+            asistencia_select, _ = await asyncio.gather(
+                self._actualizar_lectura(
+                    asistencia_actualizada, {"$push": {"listaAsistencia": self._registro_alumno(registro, alumno)}}
+                ),
+                self.contadores.registrar_alumnos(asistencia_actualizada, agregados=[alumno_oid],
+                                                  grupo=grupos[asistencia_actualizada["grupo"]]),
             )
-
-            if resultado.modified_count > 0:
-                # Obtener la asistencia actualizada desde la vista
-                asistencia_actualizada = self.db.viewAsistenciasGeneral.find_one({"_id": ObjectId(asistencia_id)})
-                
-                if asistencia_actualizada:
-                    asistencia_select = AsistenciaSelect(
-                        id=str(asistencia_actualizada["_id"]),
-                        actividad=asistencia_actualizada["actividad"],
-                        fechaRegistro=asistencia_actualizada["fechaRegistro"],
-                        fechaInicio=asistencia_actualizada["fechaInicio"],
-                        fechaFin=asistencia_actualizada["fechaFin"],
-                        horaInicio=asistencia_actualizada["horaInicio"],
-                        horaFin=asistencia_actualizada["horaFin"],
-                        estatus=asistencia_actualizada["estatus"],
-                        ubicacion=asistencia_actualizada["ubicacion"],
-                        grupo=asistencia_actualizada["grupo"],
-                        listaAsistencia=asistencia_actualizada["listaAsistencia"]
-                    )
-                    
-                    salida.estatus = "OK"
-                    salida.mensaje = "Alumno agregado a la asistencia exitosamente"
-                    salida.asistencia = asistencia_select
-                else:
-                    salida.estatus = "ERROR"
-                    salida.mensaje = "Error al obtener la asistencia actualizada"
+            
+            if asistencia_select:
+                salida.estatus = "OK"
+                salida.mensaje = "Alumno agregado a la asistencia exitosamente"
+                salida.asistencia = asistencia_select
             else:
                 salida.estatus = "ERROR"
-                salida.mensaje = "No se pudo agregar el alumno a la asistencia"
+                salida.mensaje = "Error al obtener la asistencia actualizada"
                 
         except Exception as ex:
             print(f"Error al agregar alumno a asistencia: {ex}")
@@ -343,72 +748,185 @@ class AsistenciaDAO:
             
         return salida
 
-    def eliminarAlumnoAsistencia(self, asistencia_id: str, alumno_id: str) -> AsistenciaSalida:
+    async def actualizarAlumnosLote(self, asistencia_id: str, agregar: List[str], eliminar: List[str]) -> AsistenciaAlumnosLoteSalida:
+        """Agregar y quitar varios alumnos con un $pull y un $push $each; cada resultado sale de la propia escritura"""
+        salida = AsistenciaAlumnosLoteSalida(estatus="", mensaje="", asistencia=None)
+
+        try:
+            if not ObjectId.is_valid(asistencia_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
+                return salida
+            _id_obj = ObjectId(asistencia_id)
+
+            repetidos = set(agregar) & set(eliminar)
+            if repetidos:
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Un alumno no puede agregarse y eliminarse en la misma solicitud: {', '.join(sorted(repetidos))}"
+                return salida
+
+            asistencia = await self.db.asistencias.find_one({"_id": _id_obj}, {"grupo": 1})
+            if not asistencia:
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
+                return salida
+            grupo_id = asistencia.get("grupo")
+
+            ids_agregar = {alumno_id: self._object_id(alumno_id) for alumno_id in dict.fromkeys(agregar)}
+            grupo, alumnos = await asyncio.gather(
+                self.db.grupos.find_one({"_id": grupo_id}, {"alumnos": 1, "ciclo": 1}),
+                self._alumnos_por_id([oid for oid in ids_agregar.values() if oid is not None]),
+            )
+            alumnos_grupo = set((grupo or {}).get("alumnos", []))
+
+            mensajes = {}  # (operacion, alumno_id) -> mensaje de error
+            candidatos = []
+            for alumno_id, oid in ids_agregar.items():
+                if oid is None or oid not in alumnos:
+                    mensajes[("agregar", alumno_id)] = "El alumno especificado no existe o no es de tipo alumno"
+                elif oid not in alumnos_grupo:
+                    mensajes[("agregar", alumno_id)] = "El alumno no pertenece al grupo de esta asistencia"
+                else:
+                    candidatos.append(oid)
+            ids_eliminar = {alumno_id: self._object_id(alumno_id) for alumno_id in dict.fromkeys(eliminar)}
+            a_quitar = [oid for oid in ids_eliminar.values() if oid is not None]
+
+            # Las condiciones van en el filtro (mismo grupo, alumnos presentes o ausentes): los resultados y los
+            # contadores salen de lo que devuelve cada escritura, no de una lectura previa
+            escrituras = []  # (documento devuelto con version, cambios para la proyección) en orden de escritura
+            contadores = []  # (documento devuelto, agregados, quitados)
+            quitados = []
+            if a_quitar:
+                anterior = await self.db.asistencias.find_one_and_update(
+                    {"_id": _id_obj, "grupo": grupo_id, "listaAsistencia._id": {"$in": a_quitar}},
+                    {"$pull": {"listaAsistencia": {"_id": {"$in": a_quitar}}}, "$inc": {"version": 1}},
+                    projection={"listaAsistencia._id": 1, "version": 1, "actividad": 1, "grupo": 1, "estatus": 1},
+                    return_document=ReturnDocument.BEFORE
+                )
+                if anterior is not None:
+                    presentes = {registro["_id"] for registro in anterior.get("listaAsistencia", [])}
+                    quitados = [oid for oid in a_quitar if oid in presentes]
+                    escrituras.append(({**anterior, "version": anterior.get("version", 0) + 1},
+                                       {"$pull": {"listaAsistencia": {"id": {"$in": [str(oid) for oid in quitados]}}}}))
+                    contadores.append((anterior, [], quitados))
+
+            agregados = []
+            ahora = datetime.now()
+            for _ in range(3):
+                if not candidatos:
+                    break
+                registros = [{"_id": oid, "fechaHoraRegistro": ahora} for oid in candidatos]
+                actualizada = await self.db.asistencias.find_one_and_update(
+                    {"_id": _id_obj, "grupo": grupo_id, "listaAsistencia._id": {"$nin": candidatos}},
+                    {"$push": {"listaAsistencia": {"$each": registros}}, "$inc": {"version": 1}},
+                    projection={"version": 1, "actividad": 1, "grupo": 1, "estatus": 1},
+                    return_document=ReturnDocument.AFTER
+                )
+                if actualizada is not None:
+                    agregados = candidatos
+                    contadores.append((actualizada, agregados, []))
+                    escrituras.append((actualizada, {"$push": {"listaAsistencia": {"$each": [
+                        self._registro_alumno(registro, alumnos[registro["_id"]]) for registro in registros
+                    ]}}}))
+                    break
+                # Alguno ya estaba (p. ej. un registro simultáneo): se descartan los presentes y se reintenta
+                actual = await self.db.asistencias.find_one({"_id": _id_obj}, {"grupo": 1, "listaAsistencia._id": 1})
+                if actual is None or actual.get("grupo") != grupo_id:
+                    break
+                presentes = {registro["_id"] for registro in actual.get("listaAsistencia", [])}
+                for oid in candidatos:
+                    if oid in presentes:
+                        mensajes[("agregar", str(oid))] = "El alumno ya está registrado en esta asistencia"
+                candidatos = [oid for oid in candidatos if oid not in presentes]
+            for oid in candidatos:
+                if oid not in agregados:
+                    mensajes.setdefault(("agregar", str(oid)), "La asistencia cambió mientras se registraba al alumno; intente de nuevo")
+
+            resultados = []
+            for alumno_id in ids_agregar:
+                mensaje = mensajes.get(("agregar", alumno_id))
+                resultados.append(AlumnoLoteResultado(id=alumno_id, operacion="agregar", estatus="ERROR" if mensaje else "OK",
+                                                      mensaje=mensaje or "Alumno agregado a la asistencia"))
+            for alumno_id, oid in ids_eliminar.items():
+                quitado = oid in quitados
+                resultados.append(AlumnoLoteResultado(
+                    id=alumno_id, operacion="eliminar", estatus="OK" if quitado else "ERROR",
+                    mensaje="Alumno eliminado de la asistencia" if quitado else "El alumno no está registrado en esta asistencia"
+                ))
+
+            if escrituras:
+                # Proyección con los mismos cambios, en orden de versión; contadores sólo con lo que cambió
+                for escrito, cambios in escrituras:
+                    salida.asistencia = await self._actualizar_lectura(escrito, cambios)
+                await asyncio.gather(*(self.contadores.registrar_alumnos(escrito, altas, bajas, grupo=grupo)
+                                       for escrito, altas, bajas in contadores))
+            else:
+                salida.asistencia = await self._consultar_lectura(_id_obj)
+
+            aplicados = len(agregados) + len(quitados)
+            salida.resultados = resultados
+            salida.estatus = "OK" if aplicados else "ERROR"
+            salida.mensaje = f"Se aplicaron {aplicados} de {len(resultados)} cambios en la lista de asistencia"
+
+        except Exception as ex:
+            print(f"Error al actualizar alumnos de la asistencia {asistencia_id}: {ex}")
+            salida.estatus = "ERROR"
+            salida.mensaje = "Error interno al actualizar los alumnos de la asistencia"
+
+        return salida
+
+    async def eliminarAlumnoAsistencia(self, asistencia_id: str, alumno_id: str) -> AsistenciaSalida:
         """Eliminar un alumno de la lista de asistencia"""
         salida = AsistenciaSalida(estatus="", mensaje="", asistencia=None)
         
         try:
-            # Validar que la asistencia existe
-            if not self.verificar_asistencia_existente_por_id(asistencia_id):
+            # Validar que la asistencia y el alumno existen (en paralelo)
+            if not ObjectId.is_valid(asistencia_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
+                return salida
+            _id_obj = ObjectId(asistencia_id)
+            asistencia_existe, alumno_existe = await asyncio.gather(
+                self.db.asistencias.find_one({"_id": _id_obj}, {"_id": 1}),
+                self.verificar_alumno_existente(alumno_id),
+            )
+            if not asistencia_existe:
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
                 return salida
 
-            # Validar que el alumno existe
-            if not self.verificar_alumno_existente(alumno_id):
+            if not alumno_existe:
                 salida.estatus = "ERROR"
                 salida.mensaje = "El alumno especificado no existe o no es de tipo alumno"
                 return salida
 
-            # Verificar si el alumno está en la lista de asistencia
-            asistencia_actual = self.db.asistencias.find_one({"_id": ObjectId(asistencia_id)})
-            alumnos_en_asistencia = [str(alumno["_id"]) for alumno in asistencia_actual.get("listaAsistencia", [])]
-            
-            if alumno_id not in alumnos_en_asistencia:
+            # Sólo coincide si el alumno está en la lista; si no, no hay nada que quitar
+            alumno_oid = ObjectId(alumno_id)
+            asistencia_actualizada = await self.db.asistencias.find_one_and_update(
+                {"_id": _id_obj, "listaAsistencia._id": alumno_oid},
+                {"$pull": {"listaAsistencia": {"_id": alumno_oid}}, "$inc": {"version": 1}},
+                projection={"actividad": 1, "grupo": 1, "estatus": 1, "version": 1},
+                return_document=ReturnDocument.AFTER
+            )
+
+            if asistencia_actualizada is None:
                 salida.estatus = "ERROR"
                 salida.mensaje = "El alumno no está registrado en esta asistencia"
                 return salida
 
-            # Eliminar el alumno de la lista de asistencia
-            resultado = self.db.asistencias.update_one(
-                {"_id": ObjectId(asistencia_id)},
-                {
-                    "$pull": {
-                        "listaAsistencia": {
-                            "_id": ObjectId(alumno_id)
-                        }
-                    }
-                }
+            # Actualizar el modelo de lectura y los contadores con el documento devuelto por la actualización
+            asistencia_select, _ = await asyncio.gather(
+                self._actualizar_lectura(asistencia_actualizada, {"$pull": {"listaAsistencia": {"id": alumno_id}}}),
+                self.contadores.registrar_alumnos(asistencia_actualizada, quitados=[alumno_oid]),
             )
-
-            if resultado.modified_count > 0:
-                # Obtener la asistencia actualizada desde la vista
-                asistencia_actualizada = self.db.viewAsistenciasGeneral.find_one({"_id": ObjectId(asistencia_id)})
-                
-                if asistencia_actualizada:
-                    asistencia_select = AsistenciaSelect(
-                        id=str(asistencia_actualizada["_id"]),
-                        actividad=asistencia_actualizada["actividad"],
-                        fechaRegistro=asistencia_actualizada["fechaRegistro"],
-                        fechaInicio=asistencia_actualizada["fechaInicio"],
-                        fechaFin=asistencia_actualizada["fechaFin"],
-                        horaInicio=asistencia_actualizada["horaInicio"],
-                        horaFin=asistencia_actualizada["horaFin"],
-                        estatus=asistencia_actualizada["estatus"],
-                        ubicacion=asistencia_actualizada["ubicacion"],
-                        grupo=asistencia_actualizada["grupo"],
-                        listaAsistencia=asistencia_actualizada["listaAsistencia"]
-                    )
-                    
-                    salida.estatus = "OK"
-                    salida.mensaje = "Alumno eliminado de la asistencia exitosamente"
-                    salida.asistencia = asistencia_select
-                else:
-                    salida.estatus = "ERROR"
-                    salida.mensaje = "Error al obtener la asistencia actualizada"
+            
+            if asistencia_select:
+                salida.estatus = "OK"
+                salida.mensaje = "Alumno eliminado de la asistencia exitosamente"
+                salida.asistencia = asistencia_select
             else:
                 salida.estatus = "ERROR"
-                salida.mensaje = "No se pudo eliminar el alumno de la asistencia"
+                salida.mensaje = "Error al obtener la asistencia actualizada"
                 
         except Exception as ex:
             print(f"Error al eliminar alumno de asistencia: {ex}")
@@ -417,35 +935,25 @@ class AsistenciaDAO:
             
         return salida
     
-    def consultarAsistenciaPorID(self, asistencia_id: str) -> AsistenciaSalida:
+    async def consultarAsistenciaPorID(self, asistencia_id: str) -> AsistenciaSalida:
         """Consultar una asistencia específica por ID"""
         salida = AsistenciaSalida(estatus="", mensaje="", asistencia=None)
     
         try:
             # Validar que la asistencia existe
-            if not self.verificar_asistencia_existente_por_id(asistencia_id):
+            if not ObjectId.is_valid(asistencia_id):
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
                 return salida
 
-            # Obtener la asistencia desde la vista
-            asistencia = self.db.viewAsistenciasGeneral.find_one({"_id": ObjectId(asistencia_id)})
+            # Una sola lectura por _id en el modelo de lectura
+            asistencia_select = await self._consultar_lectura(ObjectId(asistencia_id))
+            if asistencia_select is None and not await self.verificar_asistencia_existente_por_id(asistencia_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
+                return salida
             
-            if asistencia:
-                asistencia_select = AsistenciaSelect(
-                    id=str(asistencia["_id"]),
-                    actividad=asistencia["actividad"],
-                    fechaRegistro=asistencia["fechaRegistro"],
-                    fechaInicio=asistencia["fechaInicio"],
-                    fechaFin=asistencia["fechaFin"],
-                    horaInicio=asistencia["horaInicio"],
-                    horaFin=asistencia["horaFin"],
-                    estatus=asistencia["estatus"],
-                    ubicacion=asistencia["ubicacion"],
-                    grupo=asistencia["grupo"],
-                    listaAsistencia=asistencia["listaAsistencia"]
-                )
-                
+            if asistencia_select:
                 salida.estatus = "OK"
                 salida.mensaje = "Asistencia encontrada exitosamente"
                 salida.asistencia = asistencia_select
@@ -460,37 +968,137 @@ class AsistenciaDAO:
             
         return salida
 
-    def actualizar(self, asistencia_id: str, asistencia_update: AsistenciaInsert) -> AsistenciaSalida:
+    @staticmethod
+    def _etapas_conteo() -> list:
+        """Etapas que cuentan presentes (tamaño de listaAsistencia) contra esperados (tamaño de la lista del grupo)"""
+        return [
+            {"$lookup": {"from": "grupos", "localField": "grupo", "foreignField": "_id", "as": "grupoDoc"}},
+            {"$project": {
+                "presentes": {"$size": {"$ifNull": ["$listaAsistencia", []]}},
+                "esperados": {"$size": {"$ifNull": [{"$arrayElemAt": ["$grupoDoc.alumnos", 0]}, []]}},
+            }},
+        ]
+
+    @staticmethod
+    def _porcentaje(presentes: int, esperados: int) -> float:
+        return round(presentes * 100 / esperados, 2) if esperados else 0.0
+
+    async def consultarDetalle(self, asistencia_id: str) -> AsistenciaDetalladaSalida:
+        """Asistencia con totales calculados en el servidor"""
+        salida = AsistenciaDetalladaSalida(estatus="", mensaje="", asistencia=None)
+
+        try:
+            if not ObjectId.is_valid(asistencia_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
+                return salida
+            _id_obj = ObjectId(asistencia_id)
+
+            # La proyección y el conteo se piden a la vez; el conteo sólo devuelve dos enteros
+            asistencia_select, conteos = await asyncio.gather(
+                self._consultar_lectura(_id_obj),
+                self._agregar_conteo([{"$match": {"_id": _id_obj}}, *self._etapas_conteo()]),
+            )
+            if asistencia_select is None or not conteos:
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
+                return salida
+
+            conteo = conteos[0]
+            salida.asistencia = AsistenciaDetallada(
+                **asistencia_select.model_dump(),
+                totalAlumnos=conteo["esperados"],
+                alumnosPresentes=conteo["presentes"],
+                porcentajeAsistencia=self._porcentaje(conteo["presentes"], conteo["esperados"]),
+            )
+            salida.estatus = "OK"
+            salida.mensaje = "Detalle de la asistencia"
+
+        except Exception as ex:
+            print(f"Error al consultar el detalle de la asistencia {asistencia_id}: {ex}")
+            salida.estatus = "ERROR"
+            salida.mensaje = "Error interno al consultar el detalle de la asistencia"
+
+        return salida
+
+    async def _agregar_conteo(self, etapas: list) -> list:
+        cursor = await self.db.asistencias.aggregate(etapas)
+        return await cursor.to_list()
+
+    async def consultarResumen(self, campo: str, valor_id: str) -> ResumenAsistenciaSalida:
+        """Totales de un grupo o actividad (campo = "grupo" | "actividad") agrupados en el servidor"""
+        salida = ResumenAsistenciaSalida(estatus="", mensaje="", resumen=None)
+
+        try:
+            if not ObjectId.is_valid(valor_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = f"El id de {campo} no es válido"
+                return salida
+
+            conteos = await self._agregar_conteo([
+                {"$match": {campo: ObjectId(valor_id), "estatus": {"$ne": "Cancelada"}}},
+                *self._etapas_conteo(),
+                {"$group": {
+                    "_id": None,
+                    "totalAsistencias": {"$sum": 1},
+                    "totalPresentes": {"$sum": "$presentes"},
+                    "totalEsperados": {"$sum": "$esperados"},
+                }},
+            ])
+            if not conteos:
+                salida.estatus = "ERROR"
+                salida.mensaje = f"No hay asistencias registradas para este {campo}"
+                return salida
+
+            conteo = conteos[0]
+            salida.resumen = ResumenAsistencia(
+                id=valor_id,
+                totalAsistencias=conteo["totalAsistencias"],
+                totalEsperados=conteo["totalEsperados"],
+                totalPresentes=conteo["totalPresentes"],
+                porcentajeAsistencia=self._porcentaje(conteo["totalPresentes"], conteo["totalEsperados"]),
+            )
+            salida.estatus = "OK"
+            salida.mensaje = f"Resumen de asistencia por {campo}"
+
+        except Exception as ex:
+            print(f"Error al consultar el resumen por {campo} {valor_id}: {ex}")
+            salida.estatus = "ERROR"
+            salida.mensaje = "Error interno al consultar el resumen de asistencia"
+
+        return salida
+
+    async def actualizar(self, asistencia_id: str, asistencia_update: AsistenciaInsert) -> AsistenciaSalida:
         """Actualizar una asistencia existente"""
         salida = AsistenciaSalida(estatus="", mensaje="", asistencia=None)
         
         try:
             # Validar que la asistencia existe
-            if not self.verificar_asistencia_existente_por_id(asistencia_id):
+            if not await self.verificar_asistencia_existente_por_id(asistencia_id):
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
                 return salida
 
             # Validar que la actividad existe
-            if not self.verificar_actividad_existente(asistencia_update.actividad):
+            if not await self.verificar_actividad_existente(asistencia_update.actividad):
                 salida.estatus = "ERROR"
                 salida.mensaje = "La actividad especificada no existe"
                 return salida
 
             # Validar que la ubicación existe
-            if not self.verificar_ubicacion_existente(asistencia_update.ubicacion):
+            if not await self.verificar_ubicacion_existente(asistencia_update.ubicacion):
                 salida.estatus = "ERROR"
                 salida.mensaje = "La ubicación especificada no existe"
                 return salida
 
             # Validar que el grupo existe
-            if not self.verificar_grupo_existente(asistencia_update.grupo):
+            if not await self.verificar_grupo_existente(asistencia_update.grupo):
                 salida.estatus = "ERROR"
                 salida.mensaje = "El grupo especificado no existe"
                 return salida
 
             # Validar que los alumnos pertenecen al grupo
-            if not self.verificar_alumnos_en_grupo(asistencia_update.grupo, asistencia_update.listaAsistencia):
+            if not await self.verificar_alumnos_en_grupo(asistencia_update.grupo, asistencia_update.listaAsistencia):
                 salida.estatus = "ERROR"
                 salida.mensaje = "Uno o más números de control no pertenecen al grupo especificado"
                 return salida
@@ -502,29 +1110,19 @@ class AsistenciaDAO:
                 return salida
 
             # Validar que la hora de fin sea posterior a la de inicio
-            if asistencia_update.horaFin <= asistencia_update.horaInicio:
+            if self._minutos(asistencia_update.horaFin) <= self._minutos(asistencia_update.horaInicio):
                 salida.estatus = "ERROR"
                 salida.mensaje = "La hora de fin debe ser posterior a la hora de inicio"
                 return salida
 
-            # Verificar duplicados (excluyendo la asistencia actual)
-            asistencia_actual = self.db.asistencias.find_one({"_id": ObjectId(asistencia_id)})
-            if (str(asistencia_actual.get("actividad")) != asistencia_update.actividad or 
-                str(asistencia_actual.get("grupo")) != asistencia_update.grupo or 
-                asistencia_actual.get("fechaInicio").date() != asistencia_update.fechaInicio.date()):
-                
-                if self.verificar_asistencia_existente(asistencia_update.actividad, asistencia_update.grupo, asistencia_update.fechaInicio):
-                    salida.estatus = "ERROR"
-                    salida.mensaje = "Ya existe una asistencia registrada para esta actividad, grupo y fecha"
-                    return salida
-
             # Preparar datos para actualización
             update_data = {
                 "actividad": ObjectId(asistencia_update.actividad),
                 "fechaInicio": asistencia_update.fechaInicio,
                 "fechaFin": asistencia_update.fechaFin,
-                "horaInicio": asistencia_update.horaInicio,
-                "horaFin": asistencia_update.horaFin,
+                "dia": self._dia(asistencia_update.fechaInicio),
+                "horaInicio": self._minutos(asistencia_update.horaInicio),
+                "horaFin": self._minutos(asistencia_update.horaFin),
                 "estatus": asistencia_update.estatus,
                 "ubicacion": ObjectId(asistencia_update.ubicacion),
                 "grupo": ObjectId(asistencia_update.grupo),
@@ -536,31 +1134,35 @@ class AsistenciaDAO:
                 ]
             }
             
-            # Actualizar asistencia
-            resultado = self.db.asistencias.update_one(
-                {"_id": ObjectId(asistencia_id)},
-                {"$set": update_data}
-            )
+            # Actualizar asistencia; el documento anterior que devuelve la escritura alimenta los contadores
+            # (los duplicados los rechaza el índice único)
+            try:
+                asistencia_actual = await self.db.asistencias.find_one_and_update(
+                    {"_id": ObjectId(asistencia_id)},
+                    {"$set": update_data, "$inc": {"version": 1}},
+                    return_document=ReturnDocument.BEFORE
+                )
+            except DuplicateKeyError:
+                salida.estatus = "ERROR"
+                salida.mensaje = _MENSAJE_DUPLICADA
+                return salida
             
-            if resultado.modified_count > 0:
-                # Obtener la asistencia actualizada desde la vista
-                asistencia_actualizada = self.db.viewAsistenciasGeneral.find_one({"_id": ObjectId(asistencia_id)})
+            if asistencia_actual is not None:
+                # Contadores: se resta lo que aportaba la versión anterior y se suma la nueva (sólo viaja la diferencia)
+                grupos = await self._por_id("grupos", {asistencia_actual.get("grupo"), update_data["grupo"]}, {"alumnos": 1, "ciclo": 1})
+                cambios = self.contadores.sumar_asistencia(
+                    self.contadores.cambios(), asistencia_actual, grupos.get(asistencia_actual.get("grupo")), -1
+                )
+                self.contadores.sumar_asistencia(cambios, update_data, grupos.get(update_data["grupo"]))
+
+                # Actualizar el modelo de lectura y responder con la proyección
+                actualizada = {**asistencia_actual, **update_data, "version": asistencia_actual.get("version", 0) + 1}
+                asistencia_select, _ = await asyncio.gather(
+                    self._proyectar_documento(actualizada),
+                    self.contadores.aplicar(cambios),
+                )
                 
-                if asistencia_actualizada:
-                    asistencia_select = AsistenciaSelect(
-                        id=str(asistencia_actualizada["_id"]),
-                        actividad=asistencia_actualizada["actividad"],
-                        fechaRegistro=asistencia_actualizada["fechaRegistro"],
-                        fechaInicio=asistencia_actualizada["fechaInicio"],
-                        fechaFin=asistencia_actualizada["fechaFin"],
-                        horaInicio=asistencia_actualizada["horaInicio"],
-                        horaFin=asistencia_actualizada["horaFin"],
-                        estatus=asistencia_actualizada["estatus"],
-                        ubicacion=asistencia_actualizada["ubicacion"],
-                        grupo=asistencia_actualizada["grupo"],
-                        listaAsistencia=asistencia_actualizada["listaAsistencia"]
-                    )
-                    
+                if asistencia_select:
                     salida.estatus = "OK"
                     salida.mensaje = "Asistencia actualizada exitosamente"
                     salida.asistencia = asistencia_select
@@ -568,24 +1170,8 @@ class AsistenciaDAO:
                     salida.estatus = "ERROR"
                     salida.mensaje = "Error al obtener la asistencia actualizada"
             else:
-                salida.estatus = "OK"
-                salida.mensaje = "No se realizaron cambios en la asistencia (posiblemente los datos ya eran los mismos)"
-                # Devolver la asistencia actual
-                asistencia_actual = self.db.viewAsistenciasGeneral.find_one({"_id": ObjectId(asistencia_id)})
-                if asistencia_actual:
-                    salida.asistencia = AsistenciaSelect(
-                        id=str(asistencia_actual["_id"]),
-                        actividad=asistencia_actual["actividad"],
-                        fechaRegistro=asistencia_actual["fechaRegistro"],
-                        fechaInicio=asistencia_actual["fechaInicio"],
-                        fechaFin=asistencia_actual["fechaFin"],
-                        horaInicio=asistencia_actual["horaInicio"],
-                        horaFin=asistencia_actual["horaFin"],
-                        estatus=asistencia_actual["estatus"],
-                        ubicacion=asistencia_actual["ubicacion"],
-                        grupo=asistencia_actual["grupo"],
-                        listaAsistencia=asistencia_actual["listaAsistencia"]
-                    )
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
                 
         except Exception as ex:
             print(f"Error al actualizar asistencia {asistencia_id}: {ex}")
@@ -594,32 +1180,194 @@ class AsistenciaDAO:
             
         return salida
 
-    def cancelar(self, asistencia_id: str) -> Salida:
+    @staticmethod
+    def _como_fecha(valor):
+        """Fechas guardadas como texto ISO en documentos anteriores a las fechas nativas"""
+        return datetime.fromisoformat(valor.replace("Z", "+00:00")) if isinstance(valor, str) else valor
+
+    @staticmethod
+    def _utc(fecha: datetime) -> datetime:
+        """Fecha naive en UTC, como la guarda y devuelve pymongo; así se comparan fechas con y sin zona"""
+        if fecha is not None and fecha.tzinfo is not None:
+            return fecha.astimezone(timezone.utc).replace(tzinfo=None)
+        return fecha
+
+    async def actualizarParcial(self, asistencia_id: str, cambios: AsistenciaUpdate) -> AsistenciaSalida:
+        """Actualizar sólo los campos enviados, validando únicamente lo que cambia"""
+        salida = AsistenciaSalida(estatus="", mensaje="", asistencia=None)
+
+        try:
+            datos = cambios.model_dump(exclude_unset=True, exclude_none=True)
+            if not datos:
+                salida.estatus = "ERROR"
+                salida.mensaje = "No se especificó ningún campo para actualizar"
+                return salida
+
+            _id_obj = self._object_id(asistencia_id)
+            actual = await self.db.asistencias.find_one({"_id": _id_obj}) if _id_obj else None
+            if not actual:
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
+                return salida
+
+            # Referencias enviadas, resueltas en paralelo; lo que no se envía conserva el valor guardado
+            ids = {campo: self._object_id(datos[campo]) for campo in ("actividad", "ubicacion", "grupo") if campo in datos}
+            for campo, valor in ids.items():
+                if valor is None:
+                    salida.estatus = "ERROR"
+                    salida.mensaje = f"El id de {campo} no es válido"
+                    return salida
+            alumnos_ids = None
+            if "listaAsistencia" in datos:
+                alumnos_ids = list(dict.fromkeys(self._object_id(alumno) for alumno in datos["listaAsistencia"]))
+                if None in alumnos_ids:
+                    salida.estatus = "ERROR"
+                    salida.mensaje = "Uno o más números de control no pertenecen al grupo especificado"
+                    return salida
+
+            grupo_id = ids.get("grupo", actual.get("grupo"))
+            revisar_alumnos = "grupo" in ids or alumnos_ids is not None
+            actividad, ubicacion, grupo, alumnos = await asyncio.gather(
+                self.db.actividades.find_one({"_id": ids["actividad"]}, {"_id": 1}) if "actividad" in ids else self._ninguno(),
+                self.db.ubicaciones.find_one({"_id": ids["ubicacion"]}, {"_id": 1}) if "ubicacion" in ids else self._ninguno(),
+                self.db.grupos.find_one({"_id": grupo_id}, {"alumnos": 1}) if revisar_alumnos else self._ninguno(),
+                self._alumnos_por_id(alumnos_ids) if alumnos_ids else self._ninguno(),
+            )
+            if "actividad" in ids and actividad is None:
+                salida.estatus = "ERROR"
+                salida.mensaje = "La actividad especificada no existe"
+                return salida
+            if "ubicacion" in ids and ubicacion is None:
+                salida.estatus = "ERROR"
+                salida.mensaje = "La ubicación especificada no existe"
+                return salida
+            if "grupo" in ids and grupo is None:
+                salida.estatus = "ERROR"
+                salida.mensaje = "El grupo especificado no existe"
+                return salida
+
+            # Los alumnos (nuevos o los ya registrados, si cambia el grupo) deben pertenecer al grupo resultante
+            if revisar_alumnos:
+                alumnos_grupo = {str(alumno_id) for alumno_id in (grupo or {}).get("alumnos", [])}
+                lista = alumnos_ids if alumnos_ids is not None else [registro["_id"] for registro in actual.get("listaAsistencia", [])]
+                if (alumnos_ids and any(alumno_id not in alumnos for alumno_id in alumnos_ids)) or \
+                        any(str(alumno_id) not in alumnos_grupo for alumno_id in lista):
+                    salida.estatus = "ERROR"
+                    salida.mensaje = "Uno o más números de control no pertenecen al grupo especificado"
+                    return salida
+
+            fecha_inicio = datos.get("fechaInicio", self._como_fecha(actual.get("fechaInicio")))
+            fecha_fin = datos.get("fechaFin", self._como_fecha(actual.get("fechaFin")))
+            if ("fechaInicio" in datos or "fechaFin" in datos) and self._utc(fecha_fin) <= self._utc(fecha_inicio):
+                salida.estatus = "ERROR"
+                salida.mensaje = "La fecha de fin debe ser posterior a la fecha de inicio"
+                return salida
+            for campo in ("horaInicio", "horaFin"):
+                if campo in datos:
+                    datos[campo] = self._minutos(datos[campo])
+            if ("horaInicio" in datos or "horaFin" in datos) and self._minutos(datos.get("horaFin", actual.get("horaFin"))) <= \
+                    self._minutos(datos.get("horaInicio", actual.get("horaInicio"))):
+                salida.estatus = "ERROR"
+                salida.mensaje = "La hora de fin debe ser posterior a la hora de inicio"
+                return salida
+
+            # $set sólo con lo que realmente cambia
+            nuevos = {**datos, **ids}
+            if "fechaInicio" in datos:
+                nuevos["dia"] = self._dia(fecha_inicio)
+            filtro = {"_id": _id_obj}
+            if alumnos_ids is not None:
+                # Los alumnos que siguen en la lista conservan su hora de registro original
+                registros = {registro["_id"]: registro for registro in actual.get("listaAsistencia", [])}
+                ahora = datetime.now()
+                nuevos["listaAsistencia"] = [
+                    registros.get(alumno_id, {"_id": alumno_id, "fechaHoraRegistro": ahora}) for alumno_id in alumnos_ids
+                ]
+                # Si otro registro cambió la lista desde la lectura, no se sobrescribe
+                filtro["listaAsistencia"] = actual.get("listaAsistencia", [])
+            campos = {campo: valor for campo, valor in nuevos.items() if actual.get(campo) != valor}
+            if "listaAsistencia" not in campos:
+                filtro.pop("listaAsistencia", None)
+
+            if not campos:
+                salida.estatus = "OK"
+                salida.mensaje = "No se realizaron cambios en la asistencia (los datos ya eran los mismos)"
+                salida.asistencia = await self._consultar_lectura(_id_obj)
+                return salida
+
+            try:
+                actualizada = await self.db.asistencias.find_one_and_update(
+                    filtro, {"$set": campos, "$inc": {"version": 1}}, return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                salida.estatus = "ERROR"
+                salida.mensaje = _MENSAJE_DUPLICADA
+                return salida
+            if actualizada is None:
+                salida.estatus = "ERROR"
+                salida.mensaje = "La lista de asistencia cambió mientras se actualizaba; intente de nuevo"
+                return salida
+
+            # Contadores: sólo si cambia algo que los afecta
+            cambios_contador = self.contadores.cambios()
+            if {"actividad", "grupo", "estatus", "listaAsistencia"} & campos.keys():
+                grupos = await self._por_id("grupos", {actual.get("grupo"), actualizada.get("grupo")}, {"alumnos": 1, "ciclo": 1})
+                self.contadores.sumar_asistencia(cambios_contador, actual, grupos.get(actual.get("grupo")), -1)
+                self.contadores.sumar_asistencia(cambios_contador, actualizada, grupos.get(actualizada.get("grupo")))
+
+            asistencia_select, _ = await asyncio.gather(
+                self._proyectar_documento(actualizada),
+                self.contadores.aplicar(cambios_contador),
+            )
+            if asistencia_select:
+                salida.estatus = "OK"
+                salida.mensaje = "Asistencia actualizada exitosamente"
+                salida.asistencia = asistencia_select
+            else:
+                salida.estatus = "ERROR"
+                salida.mensaje = "Error al obtener la asistencia actualizada"
+
+        except Exception as ex:
+            print(f"Error al actualizar parcialmente la asistencia {asistencia_id}: {ex}")
+            salida.estatus = "ERROR"
+            salida.mensaje = "Error interno al actualizar la asistencia"
+
+        return salida
+
+    async def cancelar(self, asistencia_id: str) -> Salida:
         """Cancelar/eliminar una asistencia (eliminación lógica)"""
         salida = Salida(estatus="", mensaje="")
         
         try:
             # Validar que la asistencia existe
-            if not self.verificar_asistencia_existente_por_id(asistencia_id):
+            if not await self.verificar_asistencia_existente_por_id(asistencia_id):
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Asistencia con ID {asistencia_id} no encontrada"
                 return salida
 
             # Verificar el estado actual de la asistencia
-            asistencia_actual = self.db.asistencias.find_one({"_id": ObjectId(asistencia_id)})
+            asistencia_actual = await self.db.asistencias.find_one({"_id": ObjectId(asistencia_id)})
             
             if asistencia_actual.get("estatus") == "Cancelada":
                 salida.estatus = "OK"
                 salida.mensaje = f"La asistencia con ID {asistencia_id} ya se encuentra cancelada"
                 return salida
 
-            # Cancelar la asistencia (cambio de estatus)
-            resultado = self.db.asistencias.update_one(
-                {"_id": ObjectId(asistencia_id)},
-                {"$set": {"estatus": "Cancelada"}}
+            # Cancelar la asistencia (cambio de estatus); sólo una de dos cancelaciones simultáneas descuenta, y lo
+            # hace con el documento que devuelve la propia escritura
+            anterior = await self.db.asistencias.find_one_and_update(
+                {"_id": ObjectId(asistencia_id), "estatus": {"$ne": "Cancelada"}},
+                {"$set": {"estatus": "Cancelada"}, "$inc": {"version": 1}},
+                return_document=ReturnDocument.BEFORE
             )
 
-            if resultado.modified_count > 0:
+            if anterior is not None:
+                grupo = await self.db.grupos.find_one({"_id": anterior.get("grupo")}, {"alumnos": 1, "ciclo": 1})
+                cancelada = {"_id": anterior["_id"], "version": anterior.get("version", 0) + 1}
+                await asyncio.gather(
+                    self._actualizar_lectura(cancelada, {"$set": {"estatus": "Cancelada"}}),
+                    self.contadores.registrar_asistencia(anterior, grupo, -1),
+                )
                 salida.estatus = "OK"
                 salida.mensaje = f"Asistencia con ID {asistencia_id} cancelada exitosamente"
             else:
@@ -4,56 +4,113 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from bson import ObjectId
-from dao.dependencies import get_usuario_dao
+from dao.dependencies import get_usuario_dao, get_db
 from dao.usuariosDAO import UsuarioDAO
+from dao.cache import cache_usuarios
+from dao.revocacion import lista_revocacion
 
-from dao.database import Conexion
-import bcrypt
 import os
+import uuid
 
 # Configuración secreta
-SECRET_KEY = "asistencias_secret_jwt"
+SECRET_KEY = os.getenv("SECRET_KEY", "asistencias_secret_jwt")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 3600
+# Con AUTH_STATELESS=true los roles se validan sólo con los claims firmados del token (sin consultar MongoDB)
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() == "true"
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15" if AUTH_STATELESS else "3600"))
+REFRESH_TOKEN_EXPIRE_MINUTES = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES", "10080"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/usuarios/login")
 
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Token inválido o expirado",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+# Claims que viajan en el token de acceso
+def claims_de_usuario(user: dict) -> dict:
+    return {
+        "user_id": str(user["_id"]),
+        "tipo": user["tipo"],
+        "nombre": user.get("nombre"),
+        "apellidos": user.get("apellidos"),
+    }
+
 
 # Generar token
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    ahora = datetime.utcnow()
+    expire = ahora + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire, "iat": ahora, "jti": uuid.uuid4().hex, "type": "access"})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-# Obtener usuario desde token
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    from dao.database import Conexion
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Token inválido o expirado",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+def create_refresh_token(user_id: str):
+    ahora = datetime.utcnow()
+    to_encode = {
+        "user_id": user_id,
+        "exp": ahora + timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES),
+        "iat": ahora,
+        "jti": uuid.uuid4().hex,
+        "type": "refresh",
+    }
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decodificar_token(token: str, tipo: str = "access") -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        if user_id is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
-
-    conexion = Conexion()
-    user = conexion.getDB()["usuarios"].find_one({"_id": ObjectId(user_id), "status": "activo"})
-    if not user:
+    # Los tokens emitidos antes de existir el refresh no traen "type" y se tratan como de acceso
+    if payload.get("user_id") is None or payload.get("type", "access") != tipo:
+        raise credentials_exception
+    if lista_revocacion.esta_revocado(payload["user_id"], payload.get("jti"), payload.get("iat")):
         raise credentials_exception
+    return payload
+
+
+# Obtener usuario desde token
+async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_db)):
+    user_id = decodificar_token(token)["user_id"]
+
+    user = cache_usuarios.obtener(user_id)
+    if user is None:
+        user = await db["usuarios"].find_one({"_id": ObjectId(user_id), "status": "activo"}, {"password": 0})
+        if not user:
+            raise credentials_exception
+        cache_usuarios.guardar(user_id, user)
     return user
 
 
+# Usuario reconstruido sólo a partir de los claims verificados del token
+def get_usuario_desde_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    payload = decodificar_token(token)
+    if payload.get("tipo") is None:
+        raise credentials_exception
+    return {
+        "_id": ObjectId(payload["user_id"]),
+        "tipo": payload["tipo"],
+        "nombre": payload.get("nombre", ""),
+        "apellidos": payload.get("apellidos", ""),
+        "jti": payload.get("jti"),
+    }
+
+
+# Usuario para las validaciones de rol: claims del token (AUTH_STATELESS) o documento de MongoDB
+async def get_usuario_autorizado(token: str = Depends(oauth2_scheme), db=Depends(get_db)):
+    if AUTH_STATELESS:
+        return get_usuario_desde_claims(token)
+    return await get_current_user(token, db)
+
+
 # Validación de acceso a rutas explícitas de registro de usuarios Alumno-Tutor-Coordinador (útil para varios roles)
 
 def require_roles(roles_permitidos: list[str]):
-    def _verifica_roles(current_user: dict = Depends(get_current_user)):
+    def _verifica_roles(current_user: dict = Depends(get_usuario_autorizado)):
         if current_user["tipo"] not in roles_permitidos:
             raise HTTPException(
                 status_code=403,
@@ -66,7 +123,7 @@ def require_roles(roles_permitidos: list[str]):
 
 # Exclusivo al coordinador
 def require_rol(rol_requerido: str):
-    def _verifica_rol(current_user: dict = Depends(get_current_user)):
+    def _verifica_rol(current_user: dict = Depends(get_usuario_autorizado)):
         if current_user["tipo"] != rol_requerido:
             raise HTTPException(status_code=403, detail=f"Acceso solo permitido a usuarios tipo '{rol_requerido}'")
         return current_user
@@ -134,7 +191,7 @@ def validar_acceso_actualizacion(current_user: dict, tipo_objetivo: str, id_obje
 #     return current_user
 
 # Verificar si es coordinador para la operación de eliminación
-def require_coordinador(current_user: dict = Depends(get_current_user)):
+def require_coordinador(current_user: dict = Depends(get_usuario_autorizado)):
     if current_user["tipo"] != "coordinador":
         raise HTTPException(status_code=403, detail="Acceso solo permitido a coordinadores")
     return current_user
@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+
+class CacheTTL:
+    """Caché LRU en memoria con expiración por entrada y contadores de aciertos"""
+
+    def __init__(self, max_entradas: int, ttl_segundos: float):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.misses += 1
+                return None
+            valor, expira = entrada
+            if expira <= time.monotonic():
+                del self._datos[clave]
+                self.misses += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.hits += 1
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl_segundos)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, clave):
+        with self._lock:
+            if self._datos.pop(clave, None) is not None:
+                self.invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def metricas(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "entradas": len(self._datos),
+                "maxEntradas": self.max_entradas,
+                "ttlSegundos": self.ttl_segundos,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidaciones": self.invalidaciones,
+                "hitRate": round(self.hits / consultas, 4) if consultas else 0.0,
+            }
+
+
+# Usuarios autenticados resueltos por get_current_user, indexados por user_id
+cache_usuarios = CacheTTL(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
@@ -6,17 +6,17 @@ class CarreraDAO:
     def __init__(self, db):
         self.db = db
 
-    def verificar_carrera_existente(self, carrera_id: int) -> bool:
-        return self.db.carreras.find_one({"_id": carrera_id}) is not None
+    async def verificar_carrera_existente(self, carrera_id: int) -> bool:
+        return await self.db.carreras.find_one({"_id": carrera_id}) is not None
 
     async def agregar_carrera(self, carrera: CarreraInsert) -> CarreraSalida:
         salida = CarreraSalida(estatus="", mensaje="", carrera=None)
         try:
             carrera_dict = jsonable_encoder(carrera)
             carrera_dict["_id"] = carrera_dict.pop("id")
-            resultado = self.db.carreras.insert_one(carrera_dict)
+            resultado = await self.db.carreras.insert_one(carrera_dict)
             if resultado.inserted_id:
-                carrera_creada = self.db.carreras.find_one({"_id": resultado.inserted_id})
+                carrera_creada = await self.db.carreras.find_one({"_id": resultado.inserted_id})
                 carrera_select = CarreraSelect(
                     id=carrera_creada["_id"],
                     carrera=carrera_creada["carrera"],
@@ -43,7 +43,7 @@ class CarreraDAO:
                 salida.mensaje = "No se encontró ninguna carrera registrada."
                 return salida
             carreras = []
-            for carrera in carreras_list:
+            async for carrera in carreras_list:
                 carreras.append(
                     CarreraSelect(
                         id=carrera["_id"],
@@ -63,7 +63,7 @@ class CarreraDAO:
     async def consultar_carrera_por_id(self, carrera_id: int) -> CarreraSalida:
         salida = CarreraSalida(estatus="", mensaje="", carrera=None)
         try:
-            carrera = self.db.carreras.find_one({"_id": carrera_id})
+            carrera = await self.db.carreras.find_one({"_id": carrera_id})
             if not carrera:
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Carrera con ID {carrera_id} no encontrada."
@@ -85,7 +85,7 @@ class CarreraDAO:
     async def actualizar_carrera(self, carrera_id: int, carrera_update: CarreraUpdate) -> CarreraSalida:
         salida = CarreraSalida(estatus="", mensaje="", carrera=None)
         try:
-            if not self.verificar_carrera_existente(carrera_id):
+            if not await self.verificar_carrera_existente(carrera_id):
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Carrera con ID {carrera_id} no encontrada."
                 return salida
@@ -100,13 +100,13 @@ class CarreraDAO:
                 salida.mensaje = "No se especificaron campos para actualizar."
                 return salida
 
-            resultado = self.db.carreras.update_one(
+            resultado = await self.db.carreras.update_one(
                 {"_id": carrera_id},
                 {"$set": update_data}
             )
 
             if resultado.modified_count > 0:
-                carrera_actualizada = self.db.carreras.find_one({"_id": carrera_id})
+                carrera_actualizada = await self.db.carreras.find_one({"_id": carrera_id})
                 carrera_select = CarreraSelect(
                     id=carrera_actualizada["_id"],
                     carrera=carrera_actualizada["carrera"],
@@ -127,12 +127,12 @@ class CarreraDAO:
     async def eliminar_carrera(self, carrera_id: int) -> CarreraSalida:
         salida = CarreraSalida(estatus="", mensaje="", carrera=None)
         try:
-            if not self.verificar_carrera_existente(carrera_id):
+            if not await self.verificar_carrera_existente(carrera_id):
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Carrera con ID {carrera_id} no encontrada."
                 return salida
 
-            resultado = self.db.carreras.delete_one({"_id": carrera_id})
+            resultado = await self.db.carreras.delete_one({"_id": carrera_id})
 
             if resultado.deleted_count > 0:
                 salida.estatus = "OK"
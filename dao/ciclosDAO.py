@@ -8,16 +8,16 @@ class CicloDAO:
     def __init__(self, db):
         self.db = db
 
-    def verificar_ciclo_existente(self, ciclo_id: str) -> bool:
-        return self.db.ciclos.find_one({"_id": ObjectId(ciclo_id)}) is not None
+    async def verificar_ciclo_existente(self, ciclo_id: str) -> bool:
+        return await self.db.ciclos.find_one({"_id": ObjectId(ciclo_id)}) is not None
 
     async def agregar(self, ciclo: CicloInsert) -> CicloSalida:
         salida = Salida(estatus="", mensaje="")
         try:
             ciclo_dict = jsonable_encoder(ciclo)
-            result = self.db.ciclos.insert_one(ciclo_dict)
+            result = await self.db.ciclos.insert_one(ciclo_dict)
             if result.inserted_id:
-                ciclo_creado = self.db.ciclos.find_one({"_id": result.inserted_id})
+                ciclo_creado = await self.db.ciclos.find_one({"_id": result.inserted_id})
                 ciclo_select = CicloSelect(
                     id=str(ciclo_creado["_id"]),
                     ciclo=ciclo_creado["ciclo"],
@@ -41,7 +41,7 @@ class CicloDAO:
         try:
             ciclos_list = self.db.ciclos.find()
             ciclos = []
-            for ciclo in ciclos_list:
+            async for ciclo in ciclos_list:
                 ciclos.append(
                     CicloSelect(
                         id=str(ciclo["_id"]),
@@ -61,7 +61,7 @@ class CicloDAO:
     async def consultarPorID(self, ciclo_id: str) -> CicloSalida:
         salida = CicloSalida(estatus="", mensaje="", ciclo=None)
         try:
-            ciclo = self.db.ciclos.find_one({"_id": ObjectId(ciclo_id)})
+            ciclo = await self.db.ciclos.find_one({"_id": ObjectId(ciclo_id)})
             if ciclo:
                 ciclo_select = CicloSelect(
                     id=str(ciclo["_id"]),
@@ -83,7 +83,7 @@ class CicloDAO:
     async def actualizar(self, ciclo_id: str, ciclo_update: CicloUpdate) -> CicloSalida:
         salida = CicloSalida(estatus="", mensaje="", ciclo=None)
         try:
-            if not self.verificar_ciclo_existente(ciclo_id):
+            if not await self.verificar_ciclo_existente(ciclo_id):
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Ciclo con ID {ciclo_id} no encontrado."
                 return salida
@@ -100,12 +100,12 @@ class CicloDAO:
                 salida.mensaje = "No se especificaron campos para actualizar."
                 return salida
 
-            result = self.db.ciclos.update_one(
+            result = await self.db.ciclos.update_one(
                 {"_id": ObjectId(ciclo_id)},
                 {"$set": update_data}
             )
             if result.modified_count > 0:
-                ciclo_actualizado = self.db.ciclos.find_one({"_id": ObjectId(ciclo_id)})
+                ciclo_actualizado = await self.db.ciclos.find_one({"_id": ObjectId(ciclo_id)})
                 ciclo_select = CicloSelect(
                     id=str(ciclo_actualizado["_id"]),
                     ciclo=ciclo_actualizado["ciclo"],
@@ -126,12 +126,12 @@ class CicloDAO:
     async def eliminar(self, ciclo_id: str) -> Salida:
         salida = Salida(estatus="", mensaje="")
         try:
-            if not self.verificar_ciclo_existente(ciclo_id):
+            if not await self.verificar_ciclo_existente(ciclo_id):
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Ciclo con ID {ciclo_id} no encontrado."
                 return salida
 
-            result = self.db.ciclos.delete_one({"_id": ObjectId(ciclo_id)})
+            result = await self.db.ciclos.delete_one({"_id": ObjectId(ciclo_id)})
             if result.deleted_count > 0:
                 salida.estatus = "OK"
                 salida.mensaje = "Ciclo eliminado correctamente."
@@ -0,0 +1,135 @@
+from collections import defaultdict
+from typing import Iterable, Optional
+from models.asistenciasModel import EstadisticaAlumno, EstadisticasAlumnoSalida
+from bson import ObjectId
+from pymongo import UpdateOne
+
+
+class ContadorDAO:
+    """Sesiones asistidas y esperadas por (alumno, actividad, ciclo) en la colección contadores_asistencia.
+
+    Las claves se guardan como texto, igual que llegan los ids a la API. Las asistencias canceladas no
+    cuentan; los cambios en la lista de alumnos de un grupo no se reflejan hasta reconciliar.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    @staticmethod
+    def cambios() -> dict:
+        """Acumulador (alumno, actividad, ciclo) -> [esperadas, asistidas]"""
+        return defaultdict(lambda: [0, 0])
+
+    @staticmethod
+    def sumar_asistencia(cambios: dict, documento: dict, grupo: Optional[dict], signo: int = 1) -> dict:
+        """Suma (o resta con signo=-1) lo que aporta una asistencia: una sesión esperada por alumno del grupo
+        y una asistida por alumno registrado"""
+        if grupo is None or documento.get("estatus") == "Cancelada":
+            return cambios
+        actividad, ciclo = str(documento["actividad"]), str(grupo.get("ciclo"))
+        for alumno in grupo.get("alumnos", []):
+            cambios[(str(alumno), actividad, ciclo)][0] += signo
+        for registro in documento.get("listaAsistencia", []):
+            cambios[(str(registro["_id"]), actividad, ciclo)][1] += signo
+        return cambios
+
+    async def aplicar(self, cambios: dict):
+        """Un $inc con upsert por clave en un solo bulk_write; un fallo se registra y lo corrige la reconciliación"""
+        operaciones = [
+            UpdateOne(
+                {"alumno": alumno, "actividad": actividad, "ciclo": ciclo},
+                {"$inc": {"esperadas": esperadas, "asistidas": asistidas}},
+                upsert=True
+            )
+            for (alumno, actividad, ciclo), (esperadas, asistidas) in cambios.items()
+            if esperadas or asistidas
+        ]
+        if not operaciones:
+            return
+        try:
+            await self.db.contadores_asistencia.bulk_write(operaciones, ordered=False)
+        except Exception as ex:
+            print(f"Error al actualizar contadores_asistencia: {ex}")
+
+    async def registrar_asistencia(self, documento: dict, grupo: Optional[dict], signo: int = 1):
+        await self.aplicar(self.sumar_asistencia(self.cambios(), documento, grupo, signo))
+
+    async def registrar_alumnos(self, documento: dict, agregados: Iterable = (), quitados: Iterable = (),
+                                grupo: Optional[dict] = None):
+        """Altas y bajas de alumnos en la lista de una asistencia (documento con actividad, grupo y estatus)"""
+        if documento.get("estatus") == "Cancelada":
+            return
+        if grupo is None:
+            try:
+                grupo = await self.db.grupos.find_one({"_id": documento.get("grupo")}, {"ciclo": 1})
+            except Exception as ex:
+                print(f"Error al consultar el ciclo del grupo {documento.get('grupo')}: {ex}")
+                return
+        if grupo is None:
+            return
+        actividad, ciclo = str(documento["actividad"]), str(grupo.get("ciclo"))
+        cambios = self.cambios()
+        for alumno in agregados:
+            cambios[(str(alumno), actividad, ciclo)][1] += 1
+        for alumno in quitados:
+            cambios[(str(alumno), actividad, ciclo)][1] -= 1
+        await self.aplicar(cambios)
+
+    async def recalcular(self) -> dict:
+        """Contadores calculados desde asistencias y grupos (lo que usa la reconciliación)"""
+        activas = {"$match": {"estatus": {"$ne": "Cancelada"}}}
+        grupo = [
+            {"$lookup": {"from": "grupos", "localField": "grupo", "foreignField": "_id", "as": "grupoDoc"}},
+            {"$unwind": "$grupoDoc"},
+        ]
+        esperadas = [activas, *grupo, {"$unwind": "$grupoDoc.alumnos"}, {"$group": {
+            "_id": {"alumno": "$grupoDoc.alumnos", "actividad": "$actividad", "ciclo": "$grupoDoc.ciclo"},
+            "total": {"$sum": 1},
+        }}]
+        asistidas = [activas, {"$unwind": "$listaAsistencia"}, *grupo, {"$group": {
+            "_id": {"alumno": "$listaAsistencia._id", "actividad": "$actividad", "ciclo": "$grupoDoc.ciclo"},
+            "total": {"$sum": 1},
+        }}]
+
+        conteos = self.cambios()
+        for posicion, etapas in ((0, esperadas), (1, asistidas)):
+            cursor = await self.db.asistencias.aggregate(etapas)
+            async for documento in cursor:
+                clave = documento["_id"]
+                # Un mismo id guardado como ObjectId y como texto cae en la misma clave
+                conteos[(str(clave["alumno"]), str(clave["actividad"]), str(clave["ciclo"]))][posicion] += documento["total"]
+        return conteos
+
+    @staticmethod
+    def _porcentaje(asistidas: int, esperadas: int) -> float:
+        return round(asistidas * 100 / esperadas, 2) if esperadas else 0.0
+
+    async def consultarAlumno(self, alumno_id: str) -> EstadisticasAlumnoSalida:
+        """Estadísticas de un alumno leídas directamente de sus contadores"""
+        salida = EstadisticasAlumnoSalida(estatus="", mensaje="", alumno=alumno_id)
+        try:
+            if not ObjectId.is_valid(alumno_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = "El id del alumno no es válido"
+                return salida
+
+            documentos = await self.db.contadores_asistencia.find(
+                {"alumno": alumno_id}, {"_id": 0}
+            ).sort([("actividad", 1), ("ciclo", 1)]).to_list()
+            salida.estadisticas = [
+                EstadisticaAlumno(
+                    actividad=documento["actividad"],
+                    ciclo=documento["ciclo"],
+                    asistidas=documento.get("asistidas", 0),
+                    esperadas=documento.get("esperadas", 0),
+                    porcentajeAsistencia=self._porcentaje(documento.get("asistidas", 0), documento.get("esperadas", 0)),
+                )
+                for documento in documentos
+            ]
+            salida.estatus = "OK"
+            salida.mensaje = f"Se encontraron {len(salida.estadisticas)} registros de asistencia del alumno"
+        except Exception as ex:
+            print(f"Error al consultar estadísticas del alumno {alumno_id}: {ex}")
+            salida.estatus = "ERROR"
+            salida.mensaje = "Error interno al consultar las estadísticas del alumno"
+        return salida
@@ -1,5 +1,50 @@
-from fastapi import Request
+from fastapi import Request, Depends
 from dao.usuariosDAO import UsuarioDAO
+from dao.asistenciasDAO import AsistenciaDAO
+from dao.contadoresDAO import ContadorDAO
+from dao.actividadesDAO import ActividadDAO
+from dao.carrerasDao import CarreraDAO
+from dao.ciclosDAO import CicloDAO
+from dao.gruposDAO import GrupoDAO
+from dao.ubicacionesDAO import UbicacionesDAO
 
-def get_usuario_dao(request: Request) -> UsuarioDAO:
-    return UsuarioDAO(request.app.db)
+
+# Base de datos compartida: la conexión (y su pool) se crea una sola vez en main.startup
+def get_db(request: Request):
+    return request.app.db
+
+
+def get_conexion(request: Request):
+    return request.app.conexion
+
+
+def get_usuario_dao(db=Depends(get_db)) -> UsuarioDAO:
+    return UsuarioDAO(db)
+
+
+def get_asistencia_dao(db=Depends(get_db)) -> AsistenciaDAO:
+    return AsistenciaDAO(db)
+
+
+def get_contador_dao(db=Depends(get_db)) -> ContadorDAO:
+    return ContadorDAO(db)
+
+
+def get_actividad_dao(db=Depends(get_db)) -> ActividadDAO:
+    return ActividadDAO(db)
+
+
+def get_carrera_dao(db=Depends(get_db)) -> CarreraDAO:
+    return CarreraDAO(db)
+
+
+def get_ciclo_dao(db=Depends(get_db)) -> CicloDAO:
+    return CicloDAO(db)
+
+
+def get_grupo_dao(db=Depends(get_db)) -> GrupoDAO:
+    return GrupoDAO(db)
+
+
+def get_ubicacion_dao(db=Depends(get_db)) -> UbicacionesDAO:
+    return UbicacionesDAO(db)
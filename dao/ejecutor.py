@@ -0,0 +1,179 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+# Tamaño máximo del pool de hilos para las llamadas bloqueantes de pymongo
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "16"))
+DB_EXECUTOR_BATCH = int(os.getenv("DB_EXECUTOR_BATCH", "100"))
+
+
+class EjecutorBD:
+    """Pool de hilos acotado para las llamadas bloqueantes a MongoDB, con métricas de ocupación"""
+
+    def __init__(self, max_workers: int = DB_EXECUTOR_WORKERS):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dao")
+        self._lock = threading.Lock()
+        self._en_cola = 0
+        self._activas = 0
+        self._completadas = 0
+        self._max_en_cola = 0
+
+    def _ejecutar_contando(self, fn, args, kwargs):
+        with self._lock:
+            self._en_cola -= 1
+            self._activas += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._activas -= 1
+                self._completadas += 1
+
+    async def ejecutar(self, fn, *args, **kwargs):
+        """Ejecuta fn en el pool sin bloquear el event loop"""
+        with self._lock:
+            self._en_cola += 1
+            self._max_en_cola = max(self._max_en_cola, self._en_cola)
+        futuro = self._pool.submit(self._ejecutar_contando, fn, args, kwargs)
+        try:
+            return await asyncio.wrap_future(futuro)
+        except asyncio.CancelledError:
+            # Si la tarea nunca llegó a ejecutarse, sale de la cola sin pasar por _ejecutar_contando
+            if futuro.cancel():
+                with self._lock:
+                    self._en_cola -= 1
+            raise
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                "modo": "executor",
+                "maxWorkers": self.max_workers,
+                "enCola": self._en_cola,
+                "activas": self._activas,
+                "completadas": self._completadas,
+                "maxEnCola": self._max_en_cola,
+                "saturacion": round(self._activas / self.max_workers, 3),
+            }
+
+    def cerrar(self):
+        self._pool.shutdown(wait=True)
+
+
+class CursorEnEjecutor:
+    """Cursor de pymongo iterable con async for; cada lote se obtiene dentro del pool"""
+
+    def __init__(self, cursor, ejecutor: EjecutorBD):
+        self._cursor = cursor
+        self._ejecutor = ejecutor
+        self._buffer = []
+
+    _METODOS_ENCADENABLES = {"sort", "limit", "skip", "batch_size", "hint", "max_time_ms", "collation", "comment"}
+
+    def __getattr__(self, nombre):
+        # sort, limit, skip, batch_size... no hacen I/O y devuelven el mismo cursor
+        metodo = getattr(self._cursor, nombre)
+        if nombre not in self._METODOS_ENCADENABLES:
+            return metodo
+
+        def encadenar(*args, **kwargs):
+            metodo(*args, **kwargs)
+            return self
+
+        return encadenar
+
+    def _siguiente_lote(self):
+        return list(islice(self._cursor, DB_EXECUTOR_BATCH))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._buffer:
+            self._buffer = await self._ejecutor.ejecutar(self._siguiente_lote)
+            if not self._buffer:
+                raise StopAsyncIteration
+            self._buffer.reverse()
+        return self._buffer.pop()
+
+    async def to_list(self, length: int | None = None) -> list:
+        documentos = []
+        async for documento in self:
+            documentos.append(documento)
+            if length is not None and len(documentos) >= length:
+                break
+        return documentos
+
+    async def close(self):
+        await self._ejecutor.ejecutar(self._cursor.close)
+
+
+class ColeccionEnEjecutor:
+    """Colección síncrona de pymongo expuesta con la misma interfaz awaitable que AsyncCollection"""
+
+    _METODOS_ASINCRONOS = {
+        "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+        "delete_one", "delete_many", "count_documents", "estimated_document_count", "distinct",
+        "find_one_and_update", "find_one_and_replace", "find_one_and_delete", "bulk_write",
+        "create_index", "create_indexes", "drop_index", "index_information", "drop",
+    }
+
+    def __init__(self, coleccion, ejecutor: EjecutorBD):
+        self._coleccion = coleccion
+        self._ejecutor = ejecutor
+        self.name = coleccion.name
+
+    def __getattr__(self, nombre):
+        atributo = getattr(self._coleccion, nombre)
+        if nombre not in self._METODOS_ASINCRONOS:
+            return atributo
+
+        async def llamar(*args, **kwargs):
+            return await self._ejecutor.ejecutar(atributo, *args, **kwargs)
+
+        return llamar
+
+    def find(self, *args, **kwargs) -> CursorEnEjecutor:
+        # Crear el cursor no consulta la base; la consulta ocurre al iterar
+        return CursorEnEjecutor(self._coleccion.find(*args, **kwargs), self._ejecutor)
+
+    async def aggregate(self, *args, **kwargs) -> CursorEnEjecutor:
+        cursor = await self._ejecutor.ejecutar(self._coleccion.aggregate, *args, **kwargs)
+        return CursorEnEjecutor(cursor, self._ejecutor)
+
+    async def list_indexes(self) -> CursorEnEjecutor:
+        cursor = await self._ejecutor.ejecutar(self._coleccion.list_indexes)
+        return CursorEnEjecutor(cursor, self._ejecutor)
+
+
+class BaseDatosEnEjecutor:
+    """Base de datos síncrona de pymongo expuesta con la interfaz de AsyncDatabase"""
+
+    def __init__(self, db, ejecutor: EjecutorBD):
+        self._db = db
+        self._ejecutor = ejecutor
+        self.name = db.name
+
+    def __getattr__(self, nombre) -> ColeccionEnEjecutor:
+        if nombre.startswith("_"):
+            raise AttributeError(nombre)
+        return ColeccionEnEjecutor(self._db[nombre], self._ejecutor)
+
+    def __getitem__(self, nombre) -> ColeccionEnEjecutor:
+        return ColeccionEnEjecutor(self._db[nombre], self._ejecutor)
+
+    async def list_collection_names(self, *args, **kwargs) -> list:
+        return await self._ejecutor.ejecutar(self._db.list_collection_names, *args, **kwargs)
+
+    async def command(self, *args, **kwargs):
+        return await self._ejecutor.ejecutar(self._db.command, *args, **kwargs)
+
+    async def create_collection(self, nombre, **kwargs) -> ColeccionEnEjecutor:
+        coleccion = await self._ejecutor.ejecutar(self._db.create_collection, nombre, **kwargs)
+        return ColeccionEnEjecutor(coleccion, self._ejecutor)
+
+    async def drop_collection(self, nombre):
+        return await self._ejecutor.ejecutar(self._db.drop_collection, nombre)
@@ -6,27 +6,27 @@ class GrupoDAO:
     def __init__(self, db):
         self.db = db
         
-    def verificar_grupo_existente(self, grupo_id: str) -> bool:
-        return self.db.grupos.find_one({"_id": ObjectId(grupo_id)}) is not None
+    async def verificar_grupo_existente(self, grupo_id: str) -> bool:
+        return await self.db.grupos.find_one({"_id": ObjectId(grupo_id)}) is not None
         
     async def agregar(self, grupo: GrupoInsert) -> Salida:
         """Agregar un nuevo grupo"""
         salida = Salida(estatus="", mensaje="")
         try:
             # Validar existencia de ciclo, carrera y tutor
-            ciclo = self.db.ciclos.find_one({"_id": ObjectId(grupo.ciclo)})
+            ciclo = await self.db.ciclos.find_one({"_id": ObjectId(grupo.ciclo)})
             if not ciclo:
                 salida.estatus = "ERROR"
                 salida.mensaje = "El ciclo especificado no existe"
                 return salida
                 
-            carrera = self.db.carreras.find_one({"_id": grupo.carrera})
+            carrera = await self.db.carreras.find_one({"_id": grupo.carrera})
             if not carrera:
                 salida.estatus = "ERROR"
                 salida.mensaje = "La carrera especificada no existe"
                 return salida
                 
-            tutor = self.db.usuarios.find_one({"_id": ObjectId(grupo.tutor), "tipo": "tutor"})
+            tutor = await self.db.usuarios.find_one({"_id": ObjectId(grupo.tutor), "tipo": "tutor"})
             if not tutor:
                 salida.estatus = "ERROR"
                 salida.mensaje = "El tutor especificado no existe o no es de tipo tutor"
@@ -34,7 +34,7 @@ class GrupoDAO:
                 
             # Validar existencia de alumnos
             alumnos_ids = [ObjectId(alumno_id) for alumno_id in grupo.alumnos]
-            alumnos_count = self.db.usuarios.count_documents(
+            alumnos_count = await self.db.usuarios.count_documents(
                 {"_id": {"$in": alumnos_ids}, "tipo": "alumno"}
             )
             if alumnos_count != len(grupo.alumnos):
@@ -52,10 +52,10 @@ class GrupoDAO:
             grupo_dict["alumnos"] = alumnos_ids  # Ya convertidos a ObjectId arriba
             grupo_dict["estatus"] = "activo"
             
-            resultado = self.db.grupos.insert_one(grupo_dict)
+            resultado = await self.db.grupos.insert_one(grupo_dict)
             
             if resultado.inserted_id:
-                grupo_creado = self.db.viewGruposGeneral.find_one({"_id": resultado.inserted_id})
+                grupo_creado = await self.db.viewGruposGeneral.find_one({"_id": resultado.inserted_id})
                 grupo_select = GrupoSelect(
                     id=str(grupo_creado["_id"]),
                     nombre=grupo_creado["nombre"],
@@ -93,7 +93,7 @@ class GrupoDAO:
             grupos_list = self.db.viewGruposGeneral.find({"estatus": "activo"})
             
             grupos = []
-            for grupo in grupos_list:
+            async for grupo in grupos_list:
                 grupos.append(
                     GrupoSelect(
                         id=grupo["id"],
@@ -129,7 +129,7 @@ class GrupoDAO:
             })
             
             grupos = []
-            for grupo in grupos_list:
+            async for grupo in grupos_list:
                 grupos.append(
                     GrupoSelect(
                         id=grupo["id"],
@@ -158,12 +158,8 @@ class GrupoDAO:
         """Consultar grupo por ID (incluye inactivos para permitir consulta completa)"""
         salida = GrupoSalida(estatus="", mensaje="", grupo=None)
         try:
-            grupo = self.db.viewGruposGeneral.find_one({
-                "$or": [
-                    {"id": grupo_id},
-                    {"_id": ObjectId(grupo_id)}
-                ]
-            })
+            # Coincidencia exacta por _id (referencias normalizadas con herramientas.normalizar_ids)
+            grupo = await self.db.viewGruposGeneral.find_one({"_id": ObjectId(grupo_id)})
             
             if not grupo:
                 salida.estatus = "ERROR"
@@ -196,7 +192,7 @@ class GrupoDAO:
         salida = GrupoSalida(estatus="", mensaje="", grupo=None)
         try:
             # Verificar si el grupo existe
-            if not self.verificar_grupo_existente(grupo_id):
+            if not await self.verificar_grupo_existente(grupo_id):
                 salida.estatus = "ERROR"
                 salida.mensaje = f"Grupo con ID {grupo_id} no encontrado."
                 return salida
@@ -207,20 +203,20 @@ class GrupoDAO:
                 if value is not None:
                     if field == "ciclo":
                         ciclo_id = ObjectId(value)  # Convertir a ObjectId
-                        if not self.db.ciclos.find_one({"_id": ciclo_id}):
+                        if not await self.db.ciclos.find_one({"_id": ciclo_id}):
                             salida.estatus = "ERROR"
                             salida.mensaje = "El ciclo especificado no existe"
                             return salida
                         update_data[field] = ciclo_id
                     elif field == "carrera":
-                        if not self.db.carreras.find_one({"_id": value}):
+                        if not await self.db.carreras.find_one({"_id": value}):
                             salida.estatus = "ERROR"
                             salida.mensaje = "La carrera especificada no existe"
                             return salida
                         update_data[field] = value
                     elif field == "tutor":
                         tutor_id = ObjectId(value)
-                        tutor = self.db.usuarios.find_one({"_id": tutor_id, "tipo": "tutor"})
+                        tutor = await self.db.usuarios.find_one({"_id": tutor_id, "tipo": "tutor"})
                         if not tutor:
                             salida.estatus = "ERROR"
                             salida.mensaje = "El tutor especificado no existe o no es de tipo tutor"
@@ -228,7 +224,7 @@ class GrupoDAO:
                         update_data[field] = tutor_id
                     elif field == "alumnos":
                         alumnos_ids = [ObjectId(alumno_id) for alumno_id in value]  # Convertir a ObjectId
-                        if self.db.usuarios.count_documents({"_id": {"$in": alumnos_ids}, "tipo": "alumno"}) != len(value):
+                        if await self.db.usuarios.count_documents({"_id": {"$in": alumnos_ids}, "tipo": "alumno"}) != len(value):
                             salida.estatus = "ERROR"
                             salida.mensaje = "Uno o más alumnos especificados no existen o no son de tipo alumno"
                             return salida
@@ -243,14 +239,14 @@ class GrupoDAO:
                 return salida
             
             # Realizar la actualización
-            resultado = self.db.grupos.update_one(
+            resultado = await self.db.grupos.update_one(
                 {"_id": ObjectId(grupo_id)},
                 {"$set": update_data}
             )
             
             # Verificar si se realizaron cambios
             if resultado.modified_count > 0:
-                grupo_actualizado = self.db.viewGruposGeneral.find_one({"_id": ObjectId(grupo_id)})
+                grupo_actualizado = await self.db.viewGruposGeneral.find_one({"_id": ObjectId(grupo_id)})
                 print(f"Grupo actualizado: {grupo_actualizado}")
                 grupo_select = GrupoSelect(
                     id=grupo_actualizado["id"],
@@ -281,7 +277,7 @@ class GrupoDAO:
         salida = Salida(estatus="", mensaje="")
         try:
             # Verificar si el grupo existe y está activo
-            grupo_existente = self.db.grupos.find_one({
+            grupo_existente = await self.db.grupos.find_one({
                 "_id": ObjectId(grupo_id),
                 "estatus": "activo"
             })
@@ -292,7 +288,7 @@ class GrupoDAO:
                 return salida
             
             # Cambiar estatus a inactivo (eliminación lógica)
-            resultado = self.db.grupos.update_one(
+            resultado = await self.db.grupos.update_one(
                 {"_id": ObjectId(grupo_id)},
                 {"$set": {"estatus": "inactivo"}}
             )
@@ -315,7 +311,7 @@ class GrupoDAO:
         """Agregar un alumno a un grupo existente"""
         try:
             # Validar que el grupo existe
-            if not self.verificar_grupo_existente(grupo_id):
+            if not await self.verificar_grupo_existente(grupo_id):
                 return GrupoSalida(
                     estatus="ERROR",
                     mensaje=f"Grupo con ID {grupo_id} no encontrado",
@@ -323,7 +319,7 @@ class GrupoDAO:
                 )
 
             # Validar que el alumno existe y es de tipo alumno
-            alumno = self.db.usuarios.find_one({"_id": ObjectId(alumno_id), "tipo": "alumno"})
+            alumno = await self.db.usuarios.find_one({"_id": ObjectId(alumno_id), "tipo": "alumno"})
             if not alumno:
                 return GrupoSalida(
                     estatus="ERROR",
@@ -332,7 +328,7 @@ class GrupoDAO:
                 )
 
             # Verificar si el alumno ya está en el grupo
-            grupo_actual = self.db.grupos.find_one({"_id": ObjectId(grupo_id)})
+            grupo_actual = await self.db.grupos.find_one({"_id": ObjectId(grupo_id)})
             
             # Convertir ObjectId a string para comparación consistente
             alumnos_en_grupo = [str(id) for id in grupo_actual.get("alumnos", [])]
@@ -345,7 +341,7 @@ class GrupoDAO:
                 )
 
             # Agregar el alumno al array como ObjectId
-            resultado = self.db.grupos.update_one(
+            resultado = await self.db.grupos.update_one(
                 {"_id": ObjectId(grupo_id)},
                 {"$addToSet": {"alumnos": ObjectId(alumno_id)}}
             )
@@ -372,7 +368,7 @@ class GrupoDAO:
         """Eliminar un alumno de un grupo existente"""
         try:
             # Validar que el grupo existe
-            if not self.verificar_grupo_existente(grupo_id):
+            if not await self.verificar_grupo_existente(grupo_id):
                 return GrupoSalida(
                     estatus="ERROR",
                     mensaje=f"Grupo con ID {grupo_id} no encontrado",
@@ -380,7 +376,7 @@ class GrupoDAO:
                 )
 
             # Validar que el alumno existe
-            alumno = self.db.usuarios.find_one({"_id": ObjectId(alumno_id), "tipo": "alumno"})
+            alumno = await self.db.usuarios.find_one({"_id": ObjectId(alumno_id), "tipo": "alumno"})
             if not alumno:
                 return GrupoSalida(
                     estatus="ERROR",
@@ -389,7 +385,7 @@ class GrupoDAO:
                 )
 
             # Verificar si el alumno está en el grupo
-            grupo_actual = self.db.grupos.find_one({"_id": ObjectId(grupo_id)})
+            grupo_actual = await self.db.grupos.find_one({"_id": ObjectId(grupo_id)})
             
             # Convertir ObjectId a string para comparación consistente
             alumnos_en_grupo = [str(id) for id in grupo_actual.get("alumnos", [])]
@@ -402,7 +398,7 @@ class GrupoDAO:
                 )
 
             # Eliminar el alumno del array usando ObjectId
-            resultado = self.db.grupos.update_one(
+            resultado = await self.db.grupos.update_one(
                 {"_id": ObjectId(grupo_id)},
                 {"$pull": {"alumnos": ObjectId(alumno_id)}}
             )
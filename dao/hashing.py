@@ -0,0 +1,51 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+
+# bcrypt es CPU pura (~250 ms por llamada): se reparte en procesos para no serializarse detrás del GIL
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 2)))
+BCRYPT_MAX_CONCURRENCY = int(os.getenv("BCRYPT_MAX_CONCURRENCY", str(BCRYPT_WORKERS * 4)))
+
+_pool: ProcessPoolExecutor | None = None
+_semaforo: asyncio.Semaphore | None = None
+
+
+def _hashear(password: bytes) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt())
+
+
+def _verificar(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+def iniciar():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=BCRYPT_WORKERS)
+
+
+def cerrar():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+
+async def _ejecutar(fn, *args):
+    global _semaforo
+    if _semaforo is None:
+        _semaforo = asyncio.Semaphore(BCRYPT_MAX_CONCURRENCY)
+    iniciar()
+    # El semáforo limita cuántas operaciones esperan en el pool a la vez
+    async with _semaforo:
+        return await asyncio.get_running_loop().run_in_executor(_pool, fn, *args)
+
+
+async def hash_password(password: str) -> str:
+    hashed = await _ejecutar(_hashear, password.encode("utf-8"))
+    return hashed.decode("utf-8")
+
+
+async def verificar_password(password: str, hashed: str) -> bool:
+    return await _ejecutar(_verificar, password.encode("utf-8"), hashed.encode("utf-8"))
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from fastapi import Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
+
+# Tiempo durante el que un reintento con la misma Idempotency-Key recibe la respuesta original
+IDEMPOTENCY_TTL_MINUTES = int(os.getenv("IDEMPOTENCY_TTL_MINUTES", "1440"))
+# Si el proceso que reservó la clave muere, otro reintento puede tomarla pasado este tiempo
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+
+def clave_idempotencia(idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)) -> Optional[str]:
+    return idempotency_key
+
+
+def _huella(cuerpo) -> str:
+    contenido = json.dumps(jsonable_encoder(cuerpo), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+async def _reservar(db, _id: str, huella: str) -> Optional[dict]:
+    """None si la clave quedó reservada para esta solicitud; si no, el documento que ya la ocupa"""
+    ahora = datetime.utcnow()
+    try:
+        await db.idempotencia.insert_one({
+            "_id": _id, "estado": "en_proceso", "huella": huella,
+            "expiraEn": ahora + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+        })
+        return None
+    except DuplicateKeyError:
+        pass
+    # Reserva abandonada (el proceso terminó sin completar ni liberar): se toma si sigue vencida
+    tomada = await db.idempotencia.update_one(
+        {"_id": _id, "estado": "en_proceso", "expiraEn": {"$lt": ahora}},
+        {"$set": {"huella": huella, "expiraEn": ahora + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)}}
+    )
+    if tomada.modified_count:
+        return None
+    return await db.idempotencia.find_one({"_id": _id}) or {"estado": "en_proceso", "huella": huella}
+
+
+async def ejecutar(db, clave: Optional[str], alcance: str, cuerpo,
+                   operacion: Callable[[], Awaitable[BaseModel]], status_code: int = 200):
+    """Ejecuta la operación una sola vez por (alcance, clave) y repite su respuesta en los reintentos.
+
+    Sólo se guardan las respuestas con estatus "OK"; un error o una excepción libera la clave para que
+    el reintento vuelva a validarse.
+    """
+    if not clave:
+        return await operacion()
+
+    _id = f"{alcance}:{clave}"
+    huella = _huella(cuerpo)
+    existente = await _reservar(db, _id, huella)
+    if existente is not None:
+        if existente["huella"] != huella:
+            raise HTTPException(status_code=422, detail="La Idempotency-Key ya se usó con una solicitud distinta")
+        if existente["estado"] != "completado":
+            raise HTTPException(status_code=409, detail="Hay una solicitud con la misma Idempotency-Key en proceso")
+        return JSONResponse(content=existente["respuesta"], status_code=existente["statusCode"],
+                            headers={"Idempotent-Replayed": "true"})
+
+    try:
+        resultado = await operacion()
+    except BaseException:
+        await db.idempotencia.delete_one({"_id": _id, "estado": "en_proceso"})
+        raise
+
+    if getattr(resultado, "estatus", None) == "OK":
+        await db.idempotencia.update_one({"_id": _id}, {"$set": {
+            "estado": "completado",
+            "respuesta": jsonable_encoder(resultado),
+            "statusCode": status_code,
+            "expiraEn": datetime.utcnow() + timedelta(minutes=IDEMPOTENCY_TTL_MINUTES),
+        }})
+    else:
+        await db.idempotencia.delete_one({"_id": _id, "estado": "en_proceso"})
+    return resultado
@@ -0,0 +1,126 @@
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+# Registro declarativo de índices por colección; se aplica en cada arranque (create_indexes es idempotente)
+INDICES = {
+    "usuarios": [
+        IndexModel([("email", ASCENDING)], name="email_unico", unique=True),
+        IndexModel([("alumno.noControl", ASCENDING)], name="alumno_noControl_unico", unique=True,
+                   partialFilterExpression={"alumno.noControl": {"$type": "string"}}),
+        IndexModel([("tutor.noDocente", ASCENDING)], name="tutor_noDocente_unico", unique=True,
+                   partialFilterExpression={"tutor.noDocente": {"$type": "string"}}),
+        IndexModel([("coordinador.noEmpleado", ASCENDING)], name="coordinador_noEmpleado_unico", unique=True,
+                   partialFilterExpression={"coordinador.noEmpleado": {"$type": "string"}}),
+        IndexModel([("tutorId", ASCENDING)], name="tutorId"),
+    ],
+    "asistencias": [
+        # Una asistencia por actividad, grupo y día de fechaInicio; los documentos sin dia (previos) no participan
+        IndexModel([("actividad", ASCENDING), ("grupo", ASCENDING), ("dia", ASCENDING)],
+                   name="actividad_grupo_dia_unico", unique=True, partialFilterExpression={"dia": {"$type": "date"}}),
+        IndexModel([("ubicacion", ASCENDING)], name="ubicacion"),
+        IndexModel([("grupo", ASCENDING), ("estatus", ASCENDING)], name="grupo_estatus"),
+    ],
+    # Modelo de lectura: los filtros de igualdad de consultaGeneral terminan en _id para que la paginación por llave
+    # no ordene en memoria
+    "asistencias_read": [
+        IndexModel([("actividad.id", ASCENDING), ("_id", ASCENDING)], name="actividad_id"),
+        IndexModel([("grupo.id", ASCENDING), ("_id", ASCENDING)], name="grupo_id"),
+        IndexModel([("ubicacion.id", ASCENDING), ("_id", ASCENDING)], name="ubicacion_id"),
+        IndexModel([("estatus", ASCENDING), ("_id", ASCENDING)], name="estatus_id"),
+        # El rango de fechaInicio va primero, así que aquí el orden por _id sí se resuelve en memoria, sobre los
+        # documentos del rango; poner _id al frente equivaldría a recorrer el índice _id completo
+        IndexModel([("fechaInicio", ASCENDING), ("_id", ASCENDING)], name="fechaInicio_id"),
+        # Multikey: historial de un alumno paginado por _id
+        IndexModel([("listaAsistencia.id", ASCENDING), ("_id", ASCENDING)], name="listaAsistencia_id"),
+        IndexModel([("actualizadoEn", ASCENDING)], name="actualizadoEn"),
+    ],
+    # Un documento por (alumno, actividad, ciclo); también resuelve las estadísticas de un alumno
+    "contadores_asistencia": [
+        IndexModel([("alumno", ASCENDING), ("actividad", ASCENDING), ("ciclo", ASCENDING)],
+                   name="alumno_actividad_ciclo_unico", unique=True),
+    ],
+    # TTL: las reservas y respuestas guardadas por Idempotency-Key se borran al vencer expiraEn
+    "idempotencia": [
+        IndexModel([("expiraEn", ASCENDING)], name="expiraEn_ttl", expireAfterSeconds=0),
+    ],
+    "grupos": [
+        IndexModel([("semestre", ASCENDING), ("estatus", ASCENDING)], name="semestre_estatus"),
+        IndexModel([("tutor", ASCENDING)], name="tutor"),
+        # Multikey: grupos de un alumno al registrarlo en una asistencia
+        IndexModel([("alumnos", ASCENDING)], name="alumnos"),
+    ],
+    "actividades": [
+        IndexModel([("nombre", ASCENDING)], name="nombre_unico", unique=True),
+    ],
+    # Puede haber ubicaciones canceladas con el mismo nombre, por eso no es único
+    "ubicaciones": [
+        IndexModel([("nombre", ASCENDING)], name="nombre"),
+    ],
+}
+
+
+def _como_disperso(indice: IndexModel) -> IndexModel:
+    """Equivalente sparse de un índice parcial, para backends sin partialFilterExpression (mongomock)"""
+    opciones = dict(indice.document)
+    if "partialFilterExpression" not in opciones:
+        return indice
+    del opciones["partialFilterExpression"]
+    llaves = opciones.pop("key")
+    return IndexModel(list(llaves.items()), sparse=True, **opciones)
+
+
+async def asegurar_indices(db, parciales: bool = True) -> dict:
+    """Crea los índices declarados que falten; un fallo en una colección no detiene el arranque.
+
+    parciales=False crea los índices parciales como sparse (aplican a los documentos que tienen el campo).
+    """
+    resultado = {}
+    for coleccion, indices in INDICES.items():
+        if not parciales:
+            indices = [_como_disperso(indice) for indice in indices]
+        try:
+            resultado[coleccion] = await db[coleccion].create_indexes(indices)
+        except OperationFailure as ex:
+            # Típicamente datos duplicados previos que impiden crear un índice único
+            print(f"Error al crear índices de {coleccion}: {ex}")
+            resultado[coleccion] = []
+    return resultado
+
+
+async def reporte_indices(db) -> dict:
+    """Índices declarados que no existen y existentes sin uso desde el último reinicio de mongod
+    (sinUso es None si el backend no reporta $indexStats)"""
+    reporte = {}
+    for coleccion, indices in INDICES.items():
+        declarados = {indice.document["name"] for indice in indices}
+        existentes = {}
+        con_estadisticas = True
+        try:
+            cursor = await db[coleccion].aggregate([{"$indexStats": {}}])
+            async for estadistica in cursor:
+                existentes[estadistica["name"]] = estadistica["accesses"]["ops"]
+        except NotImplementedError:
+            # El backend en memoria (mongomock) no tiene $indexStats: se listan los índices sin contadores de uso
+            con_estadisticas = False
+            cursor = await db[coleccion].list_indexes()
+            async for indice in cursor:
+                existentes[indice["name"]] = None
+        except OperationFailure as ex:
+            print(f"Error al consultar $indexStats de {coleccion}: {ex}")
+        reporte[coleccion] = {
+            "faltantes": sorted(declarados - existentes.keys()),
+            # None: uso no disponible en este backend
+            "sinUso": sorted(nombre for nombre, ops in existentes.items() if ops == 0 and nombre != "_id_")
+            if con_estadisticas else None,
+            "noDeclarados": sorted(existentes.keys() - declarados - {"_id_"}),
+        }
+    return reporte
+
+
+def mensaje_duplicado(ex: DuplicateKeyError, mensajes: dict, por_defecto: str) -> str:
+    """Mensaje para el campo que violó un índice único (mensajes: campo -> texto)"""
+    campos = (ex.details or {}).get("keyPattern", {})
+    for campo in campos:
+        if campo in mensajes:
+            return mensajes[campo]
+    return por_defecto
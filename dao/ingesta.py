@@ -0,0 +1,116 @@
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from dao.asistenciasDAO import AsistenciaDAO
+
+# Cada cuánto se vacía hacia MongoDB la cola de registros diferidos de alumnos
+CHECKIN_FLUSH_MS = int(os.getenv("CHECKIN_FLUSH_MS", "200"))
+# Registros pendientes aceptados como máximo; por encima se responde 503
+CHECKIN_COLA_MAX = int(os.getenv("CHECKIN_COLA_MAX", "10000"))
+# Tickets ya procesados que se conservan para consulta (los más antiguos se descartan)
+CHECKIN_TICKETS_MAX = int(os.getenv("CHECKIN_TICKETS_MAX", "50000"))
+
+
+class ColaRegistros:
+    """Registros de alumnos en asistencias aceptados al momento y escritos en lote por asistencia.
+
+    Vive en el proceso: cada worker tiene su propia cola y sus tickets sólo se consultan en ese worker.
+    """
+
+    def __init__(self):
+        self._pendientes: dict[str, dict[str, str]] = {}  # asistencia_id -> {alumno_id: ticket}
+        self._total_pendientes = 0
+        self._tickets: OrderedDict[str, dict] = OrderedDict()
+        self._tarea: asyncio.Task | None = None
+        self._parar: asyncio.Event | None = None
+        self._db = None
+
+    def encolar(self, asistencia_id: str, alumno_id: str, usuario_id: str) -> str | None:
+        """Ticket del registro, o None si la cola está llena; el mismo alumno pendiente conserva su ticket (y quien
+        lo vuelve a enviar también puede consultarlo)"""
+        alumnos = self._pendientes.setdefault(asistencia_id, {})
+        if alumno_id in alumnos:
+            self._tickets[alumnos[alumno_id]]["usuarios"].add(usuario_id)
+            return alumnos[alumno_id]
+        if self._total_pendientes >= CHECKIN_COLA_MAX:
+            if not alumnos:
+                del self._pendientes[asistencia_id]
+            return None
+        ticket = uuid.uuid4().hex
+        alumnos[alumno_id] = ticket
+        self._total_pendientes += 1
+        self._tickets[ticket] = {"asistencia": asistencia_id, "alumno": alumno_id, "estado": "pendiente",
+                                 "mensaje": "Registro en cola", "usuarios": {usuario_id}}
+        return ticket
+
+    def estado(self, ticket: str, usuario_id: str) -> dict | None:
+        """Estado del ticket sólo para quien lo encoló; para cualquier otro usuario no existe"""
+        registro = self._tickets.get(ticket)
+        if registro is None or usuario_id not in registro["usuarios"]:
+            return None
+        return {campo: valor for campo, valor in registro.items() if campo != "usuarios"}
+
+    def _resolver(self, ticket: str, estado: str, mensaje: str):
+        registro = self._tickets.get(ticket)
+        if registro is not None:
+            registro["estado"] = estado
+            registro["mensaje"] = mensaje
+
+    def _depurar(self):
+        while len(self._tickets) > CHECKIN_TICKETS_MAX:
+            if next(iter(self._tickets.values()))["estado"] == "pendiente":
+                break
+            self._tickets.popitem(last=False)
+
+    async def _escribir(self, dao: AsistenciaDAO, asistencia_id: str, alumnos: dict[str, str]):
+        """Un solo actualizarAlumnosLote por asistencia con todos sus registros acumulados; cada ticket toma el
+        resultado de su alumno, que sale de la propia escritura (un alumno ya registrado se rechaza)"""
+        try:
+            salida = await dao.actualizarAlumnosLote(asistencia_id, list(alumnos), [])
+        except Exception as ex:
+            print(f"Error al vaciar registros de la asistencia {asistencia_id}: {ex}")
+            salida = None
+        resultados = {resultado.id: resultado for resultado in (salida.resultados if salida else [])}
+        for alumno_id, ticket in alumnos.items():
+            resultado = resultados.get(alumno_id)
+            if resultado is None:
+                self._resolver(ticket, "rechazado", salida.mensaje if salida else "Error interno al registrar al alumno")
+            else:
+                self._resolver(ticket, "aplicado" if resultado.estatus == "OK" else "rechazado", resultado.mensaje)
+
+    async def vaciar(self, db):
+        """Escribe lo acumulado hasta ahora; lo que llegue mientras tanto espera al siguiente ciclo"""
+        if not self._pendientes:
+            return
+        pendientes, self._pendientes, self._total_pendientes = self._pendientes, {}, 0
+        dao = AsistenciaDAO(db)
+        await asyncio.gather(*(self._escribir(dao, asistencia_id, alumnos) for asistencia_id, alumnos in pendientes.items()))
+        self._depurar()
+
+    async def _ciclo(self):
+        # Sin cancelar la tarea: un vaciado a medias perdería los registros ya retirados de la cola
+        while not self._parar.is_set():
+            try:
+                await asyncio.wait_for(self._parar.wait(), CHECKIN_FLUSH_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.vaciar(self._db)
+            except Exception as ex:
+                print(f"Error al vaciar la cola de registros: {ex}")
+
+    def iniciar(self, db):
+        self._db = db
+        self._parar = asyncio.Event()
+        self._tarea = asyncio.create_task(self._ciclo())
+
+    async def detener(self):
+        """Termina el ciclo con un último vaciado antes de cerrar la conexión"""
+        if self._tarea is not None:
+            self._parar.set()
+            await self._tarea
+            self._tarea = None
+
+
+cola_registros = ColaRegistros()
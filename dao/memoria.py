@@ -0,0 +1,119 @@
+"""Backend en memoria (MONGO_BACKEND="memoria") para pruebas y mediciones sin red.
+
+Usa mongomock, que no se instala con requirements.txt: pip install -r requirements-dev.txt. Los documentos de
+database/*.json se cargan al crear la conexión; nada de lo escrito se conserva al cerrar.
+"""
+import glob
+import os
+from bson import json_util
+from dao.referencias import REFERENCIAS, convertir_campo
+
+# Carpeta con los fixtures en extended JSON (<base>.<coleccion>.json)
+MONGO_FIXTURES_DIR = os.getenv(
+    "MONGO_FIXTURES_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database")
+)
+
+
+def crear_cliente():
+    try:
+        import mongomock
+    except ImportError as ex:
+        raise RuntimeError('MONGO_BACKEND="memoria" requiere mongomock (pip install -r requirements-dev.txt)') from ex
+    return mongomock.MongoClient()
+
+
+def base_datos(cliente, nombre_bd: str) -> "BaseDatosMemoria":
+    return BaseDatosMemoria(cliente[nombre_bd])
+
+
+class _BulkSinSort:
+    """pymongo 4.13 pasa sort a add_update/add_replace dentro de bulk_write y mongomock no lo acepta"""
+
+    def __init__(self, bulk):
+        self._bulk = bulk
+
+    def add_update(self, *args, sort=None, **kwargs):
+        return self._bulk.add_update(*args, **kwargs)
+
+    def add_replace(self, *args, sort=None, **kwargs):
+        return self._bulk.add_replace(*args, **kwargs)
+
+    def __getattr__(self, nombre):
+        return getattr(self._bulk, nombre)
+
+
+class _OperacionSinSort:
+    def __init__(self, operacion):
+        self._operacion = operacion
+
+    def _add_to_bulk(self, bulk):
+        self._operacion._add_to_bulk(_BulkSinSort(bulk))
+
+
+class ColeccionMemoria:
+    """Colección de mongomock cuyo bulk_write acepta las operaciones de pymongo 4.13"""
+
+    def __init__(self, coleccion):
+        self._coleccion = coleccion
+        self.name = coleccion.name
+
+    def __getattr__(self, nombre):
+        return getattr(self._coleccion, nombre)
+
+    def bulk_write(self, requests, *args, **kwargs):
+        return self._coleccion.bulk_write([_OperacionSinSort(operacion) for operacion in requests], *args, **kwargs)
+
+
+class BaseDatosMemoria:
+    """Base de datos de mongomock que entrega ColeccionMemoria"""
+
+    def __init__(self, db):
+        self._db = db
+        self.name = db.name
+
+    def __getattr__(self, nombre):
+        atributo = getattr(self._db, nombre)
+        # db.<coleccion> también entrega la colección envuelta
+        return ColeccionMemoria(atributo) if hasattr(atributo, "bulk_write") else atributo
+
+    def __getitem__(self, nombre) -> ColeccionMemoria:
+        return ColeccionMemoria(self._db[nombre])
+
+    def create_collection(self, nombre, **kwargs) -> ColeccionMemoria:
+        return ColeccionMemoria(self._db.create_collection(nombre, **kwargs))
+
+
+def _normalizar(coleccion: str, documento: dict) -> dict:
+    """_id y referencias como ObjectId, igual que tras herramientas.normalizar_ids (algunas exportaciones
+    guardan el _id como texto)"""
+    for campo in ["_id", *REFERENCIAS.get(coleccion, [])]:
+        raiz = campo.partition(".")[0]
+        if raiz in documento:
+            documento[raiz], _ = convertir_campo(documento, campo)
+    return documento
+
+
+def _archivos_por_coleccion(directorio: str, nombre_bd: str) -> dict:
+    """Un archivo por colección: el de la misma base que MONGO_DB si existe (hay exportaciones de varias
+    bases de la misma colección), si no el primero en orden alfabético"""
+    archivos = {}
+    for ruta in sorted(glob.glob(os.path.join(directorio, "*.json"))):
+        base, _, coleccion = os.path.basename(ruta)[:-len(".json")].rpartition(".")
+        if coleccion not in archivos or base == nombre_bd:
+            archivos[coleccion] = ruta
+    return archivos
+
+
+def cargar_fixtures(db, directorio: str = MONGO_FIXTURES_DIR) -> dict:
+    """Inserta los fixtures en extended JSON en la base de base_datos(); regresa documentos por colección"""
+    cargados = {}
+    for coleccion, ruta in _archivos_por_coleccion(directorio, db.name).items():
+        with open(ruta, encoding="utf-8") as archivo:
+            documentos = json_util.loads(archivo.read())
+        if isinstance(documentos, dict):
+            documentos = [documentos]
+        if documentos:
+            db[coleccion].insert_many([_normalizar(coleccion, documento) for documento in documentos])
+        cargados[coleccion] = len(documentos)
+    print(f"Fixtures cargados en memoria: {cargados}")
+    return cargados
@@ -0,0 +1,41 @@
+"""Campos que guardan ids y su conversión de texto a ObjectId (herramientas.normalizar_ids y el backend en memoria)"""
+from bson import ObjectId
+
+# Colecciones cuyos _id se consultan como ObjectId
+COLECCIONES = ["actividades", "asistencias", "ciclos", "grupos", "ubicaciones", "usuarios"]
+
+# Colección -> campos de referencia (escalares, arreglos de ids o "arreglo.campo" dentro de subdocumentos)
+REFERENCIAS = {
+    "grupos": ["ciclo", "tutor", "alumnos"],
+    "usuarios": ["tutorId"],
+    "actividades": ["tutor_id"],
+    "asistencias": ["actividad", "ubicacion", "grupo", "listaAsistencia._id"],
+}
+
+
+def convertir(valor):
+    """(valor normalizado, hay inválidos)"""
+    if isinstance(valor, list):
+        convertidos = [convertir(elemento) for elemento in valor]
+        return [v for v, _ in convertidos], any(invalido for _, invalido in convertidos)
+    if isinstance(valor, str):
+        return (ObjectId(valor), False) if ObjectId.is_valid(valor) else (valor, True)
+    return valor, False
+
+
+def convertir_campo(documento: dict, campo: str):
+    """(valor normalizado del campo raíz, hay inválidos); con "arreglo.campo" convierte ese campo en cada subdocumento"""
+    raiz, _, subcampo = campo.partition(".")
+    valor = documento[raiz]
+    if not subcampo:
+        return convertir(valor)
+    if not isinstance(valor, list):
+        return valor, False
+    elementos, invalido = [], False
+    for elemento in valor:
+        if isinstance(elemento, dict) and subcampo in elemento:
+            convertido, invalido_elemento = convertir(elemento[subcampo])
+            elemento = {**elemento, subcampo: convertido}
+            invalido = invalido or invalido_elemento
+        elementos.append(elemento)
+    return elementos, invalido
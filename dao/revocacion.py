@@ -0,0 +1,130 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+# Tiempo que se conserva una revocación: debe cubrir la vida máxima de los tokens emitidos
+REVOCATION_TTL_MINUTES = int(os.getenv("REVOCATION_TTL_MINUTES", "10080"))
+REVOCATION_POLL_SECONDS = float(os.getenv("REVOCATION_POLL_SECONDS", "5"))
+REVOCATION_BLOOM_BITS = int(os.getenv("REVOCATION_BLOOM_BITS", str(1 << 20)))
+REVOCATION_BLOOM_HASHES = 4
+# Margen para no perder revocaciones escritas por otros workers con el reloj ligeramente desfasado
+_MARGEN_SINCRONIZACION = timedelta(seconds=10)
+
+
+class FiltroBloom:
+    """Filtro de Bloom sobre un bytearray; usa el hash nativo de str (cacheado en el propio objeto)"""
+
+    def __init__(self, bits: int = REVOCATION_BLOOM_BITS, hashes: int = REVOCATION_BLOOM_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self._arreglo = bytearray((bits + 7) // 8)
+
+    def agregar(self, clave: str):
+        h = hash(clave)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        for i in range(self.hashes):
+            posicion = (h1 + i * h2) % self.bits
+            self._arreglo[posicion >> 3] |= 1 << (posicion & 7)
+
+    def __contains__(self, clave: str) -> bool:
+        h = hash(clave)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        for i in range(self.hashes):
+            posicion = (h1 + i * h2) % self.bits
+            if not self._arreglo[posicion >> 3] & (1 << (posicion & 7)):
+                return False
+        return True
+
+
+class ListaRevocacion:
+    """Usuarios y tokens (jti) revocados, replicados entre workers a través de la colección revocaciones"""
+
+    def __init__(self):
+        self._usuarios: dict[str, tuple[int, datetime]] = {}  # user_id -> (segundo de revocación, expira)
+        self._tokens: dict[str, datetime] = {}  # jti -> expira
+        self._filtro = FiltroBloom()
+        self._ultima_sincronizacion: datetime | None = None
+        self._tarea: asyncio.Task | None = None
+
+    def esta_revocado(self, user_id: str, jti: str | None, iat: float | None) -> bool:
+        # Camino común: el filtro responde "no" sin tocar los diccionarios ni la base de datos
+        if user_id in self._filtro:
+            revocado = self._usuarios.get(user_id)
+            # iat viene en segundos enteros: sólo se revocan los tokens de segundos anteriores, para que un
+            # inicio de sesión en el mismo segundo que "cerrar en todos los dispositivos" siga siendo válido
+            if revocado is not None and (iat or 0) < revocado[0]:
+                return True
+        if jti is not None and jti in self._filtro and jti in self._tokens:
+            return True
+        return False
+
+    def _aplicar(self, documento: dict):
+        valor = documento["valor"]
+        if documento["tipo"] == "usuario":
+            revocado_en = int(documento["creadoEn"].replace(tzinfo=timezone.utc).timestamp())
+            actual = self._usuarios.get(valor)
+            if actual is None or actual[0] < revocado_en:
+                self._usuarios[valor] = (revocado_en, documento["expiraEn"])
+        else:
+            self._tokens[valor] = documento["expiraEn"]
+        self._filtro.agregar(valor)
+
+    def _depurar(self):
+        """Quita las entradas vencidas y reconstruye el filtro (un filtro de Bloom no admite borrados)"""
+        ahora = datetime.utcnow()
+        self._usuarios = {k: v for k, v in self._usuarios.items() if v[1] > ahora}
+        self._tokens = {k: v for k, v in self._tokens.items() if v > ahora}
+        filtro = FiltroBloom()
+        for clave in list(self._usuarios) + list(self._tokens):
+            filtro.agregar(clave)
+        self._filtro = filtro
+
+    async def _registrar(self, db, tipo: str, valor: str, expira: datetime):
+        documento = {"tipo": tipo, "valor": valor, "creadoEn": datetime.utcnow(), "expiraEn": expira}
+        await db.revocaciones.insert_one(documento)
+        self._aplicar(documento)
+
+    async def revocar_usuario(self, db, user_id: str):
+        await self._registrar(db, "usuario", user_id, datetime.utcnow() + timedelta(minutes=REVOCATION_TTL_MINUTES))
+
+    async def revocar_token(self, db, jti: str, expira: datetime):
+        await self._registrar(db, "token", jti, expira)
+
+    async def sincronizar(self, db):
+        filtro = {"expiraEn": {"$gt": datetime.utcnow()}}
+        if self._ultima_sincronizacion is not None:
+            filtro["creadoEn"] = {"$gte": self._ultima_sincronizacion - _MARGEN_SINCRONIZACION}
+        inicio = datetime.utcnow()
+        async for documento in db.revocaciones.find(filtro):
+            self._aplicar(documento)
+        self._ultima_sincronizacion = inicio
+
+    async def _sondear(self, db):
+        ciclos = 0
+        while True:
+            await asyncio.sleep(REVOCATION_POLL_SECONDS)
+            try:
+                await self.sincronizar(db)
+                ciclos += 1
+                if ciclos % 60 == 0:
+                    self._depurar()
+            except Exception as ex:
+                print(f"Error al sincronizar revocaciones: {ex}")
+
+    async def iniciar(self, db):
+        await db.revocaciones.create_index("expiraEn", expireAfterSeconds=0)
+        await db.revocaciones.create_index("creadoEn")
+        await self.sincronizar(db)
+        self._tarea = asyncio.create_task(self._sondear(db))
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+
+lista_revocacion = ListaRevocacion()
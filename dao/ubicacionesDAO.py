@@ -6,13 +6,13 @@ class UbicacionesDAO:
     def __init__(self, db):
         self.db = db
 
-    def crear_ubicacion(self, ubicacion: UbicacionInsert):
+    async def crear_ubicacion(self, ubicacion: UbicacionInsert):
         """
         Crea una nueva ubicación verificando que el nombre no esté duplicado
         """
         try:
             # Verificar si ya existe una ubicación con el mismo nombre
-            ubicacion_existente = self.db.ubicaciones.find_one({
+            ubicacion_existente = await self.db.ubicaciones.find_one({
                 "nombre": ubicacion.nombre,
                 "estatus": {"$ne": "Cancelada"}
             })
@@ -25,10 +25,10 @@ class UbicacionesDAO:
                 }
 
             nueva_ubicacion = jsonable_encoder(ubicacion)
-            resultado = self.db.ubicaciones.insert_one(nueva_ubicacion)
+            resultado = await self.db.ubicaciones.insert_one(nueva_ubicacion)
             
             if resultado.inserted_id:
-                ubicacion_creada = self.db.ubicaciones.find_one(
+                ubicacion_creada = await self.db.ubicaciones.find_one(
                     {"_id": resultado.inserted_id}
                 )
                 ubicacion_select = UbicacionSelect(
@@ -58,7 +58,7 @@ class UbicacionesDAO:
                 "ubicacion": None
             }
 
-    def obtener_ubicaciones(self) -> UbicacionesSalida:
+    async def obtener_ubicaciones(self) -> UbicacionesSalida:
         """
         Obtiene todas las ubicaciones activas
         """
@@ -69,7 +69,7 @@ class UbicacionesDAO:
             }).sort("nombre", 1)
             
             ubicaciones = []
-            for ubicacion in ubicaciones_list:
+            async for ubicacion in ubicaciones_list:
                 ubicaciones.append(
                     UbicacionSelect(
                         id=str(ubicacion["_id"]),
@@ -92,14 +92,18 @@ class UbicacionesDAO:
             
         return salida
 
-    def obtener_ubicacion_por_id(self, ubicacion_id: str) -> UbicacionSalida:
+    async def obtener_ubicacion_por_id(self, ubicacion_id: str) -> UbicacionSalida:
         """
         Obtiene una ubicación específica por su ID
         """
         salida = UbicacionSalida(estatus="", mensaje="", ubicacion=None)
         try:
-            _id_obj = ObjectId(ubicacion_id) if ObjectId.is_valid(ubicacion_id) else ubicacion_id
-            ubicacion = self.db.ubicaciones.find_one({
+            if not ObjectId.is_valid(ubicacion_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Ubicación con ID {ubicacion_id} no encontrada"
+                return salida
+            _id_obj = ObjectId(ubicacion_id)
+            ubicacion = await self.db.ubicaciones.find_one({
                 "_id": _id_obj,
                 "estatus": {"$ne": "Cancelada"}
             })
@@ -129,16 +133,20 @@ class UbicacionesDAO:
             
         return salida
 
-    def editar_ubicacion(self, ubicacion_id: str, ubicacion_update: UbicacionInsert) -> UbicacionSalida:
+    async def editar_ubicacion(self, ubicacion_id: str, ubicacion_update: UbicacionInsert) -> UbicacionSalida:
         """
         Edita una ubicación verificando que el nombre no esté duplicado
         """
         salida = UbicacionSalida(estatus="", mensaje="", ubicacion=None)
         try:
-            _id_obj = ObjectId(ubicacion_id) if ObjectId.is_valid(ubicacion_id) else ubicacion_id
+            if not ObjectId.is_valid(ubicacion_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Ubicación con ID {ubicacion_id} no encontrada"
+                return salida
+            _id_obj = ObjectId(ubicacion_id)
             
             # Verificar si existe otra ubicación con el mismo nombre
-            ubicacion_existente_mismo_nombre = self.db.ubicaciones.find_one({
+            ubicacion_existente_mismo_nombre = await self.db.ubicaciones.find_one({
                 "nombre": ubicacion_update.nombre,
                 "_id": {"$ne": _id_obj},
                 "estatus": {"$ne": "Cancelada"}
@@ -150,7 +158,7 @@ class UbicacionesDAO:
                 return salida
 
             # Verificar si la ubicación a actualizar existe
-            ubicacion_existente = self.db.ubicaciones.find_one({
+            ubicacion_existente = await self.db.ubicaciones.find_one({
                 "_id": _id_obj,
                 "estatus": {"$ne": "Cancelada"}
             })
@@ -169,13 +177,13 @@ class UbicacionesDAO:
                 "estatus": ubicacion_dict["estatus"]
             }
 
-            resultado = self.db.ubicaciones.update_one(
+            resultado = await self.db.ubicaciones.update_one(
                 {"_id": _id_obj},
                 {"$set": update_data}
             )
             
             if resultado.modified_count > 0:
-                ubicacion_actualizada = self.db.ubicaciones.find_one({"_id": _id_obj})
+                ubicacion_actualizada = await self.db.ubicaciones.find_one({"_id": _id_obj})
                 ubicacion_select = UbicacionSelect(
                     id=str(ubicacion_actualizada["_id"]),
                     nombre=ubicacion_actualizada["nombre"],
@@ -191,7 +199,7 @@ class UbicacionesDAO:
                 # Si no se modificó nada, devolver la ubicación actual
                 salida.estatus = "OK"
                 salida.mensaje = "No se realizaron cambios en la ubicación (posiblemente los datos ya eran los mismos)"
-                ubicacion_actual = self.db.ubicaciones.find_one({"_id": _id_obj})
+                ubicacion_actual = await self.db.ubicaciones.find_one({"_id": _id_obj})
                 if ubicacion_actual:
                     salida.ubicacion = UbicacionSelect(
                         id=str(ubicacion_actual["_id"]),
@@ -209,16 +217,20 @@ class UbicacionesDAO:
             
         return salida
 
-    def cancelar_ubicacion(self, ubicacion_id: str) -> Salida:
+    async def cancelar_ubicacion(self, ubicacion_id: str) -> Salida:
         """
         Cancela una ubicación (cambio lógico de estatus)
         """
         salida = Salida(estatus="", mensaje="")
         try:
-            _id_obj = ObjectId(ubicacion_id) if ObjectId.is_valid(ubicacion_id) else ubicacion_id
+            if not ObjectId.is_valid(ubicacion_id):
+                salida.estatus = "ERROR"
+                salida.mensaje = f"Ubicación con ID {ubicacion_id} no encontrada"
+                return salida
+            _id_obj = ObjectId(ubicacion_id)
             
             # Verificar si la ubicación existe
-            ubicacion_existente = self.db.ubicaciones.find_one({"_id": _id_obj})
+            ubicacion_existente = await self.db.ubicaciones.find_one({"_id": _id_obj})
 
             if not ubicacion_existente:
                 salida.estatus = "ERROR"
@@ -231,7 +243,7 @@ class UbicacionesDAO:
                 return salida
 
             # Verificar si la ubicación está siendo utilizada en asistencias
-            asistencias_asociadas = self.db.asistencias.count_documents({
+            asistencias_asociadas = await self.db.asistencias.count_documents({
                 "ubicacion_id": str(ubicacion_id),
                 "estatus": {"$ne": "Cancelada"}
             })
@@ -242,7 +254,7 @@ class UbicacionesDAO:
                 return salida
 
             # Cancelar ubicación
-            resultado = self.db.ubicaciones.update_one(
+            resultado = await self.db.ubicaciones.update_one(
                 {"_id": _id_obj},
                 {"$set": {"estatus": "Cancelada"}}
             )
@@ -3,23 +3,35 @@ from models.usuariosModel import (UsuarioAlumnoInsert, UsuarioTutorInsert, Usuar
                                   UsuarioSalidaID, UsuarioSalidaLista,
                                   )
 from fastapi.encoders import jsonable_encoder
-import bcrypt
+from dao.hashing import hash_password
+from dao.cache import cache_usuarios
+from dao.revocacion import lista_revocacion
+from dao.indices import mensaje_duplicado
+from pymongo.errors import DuplicateKeyError
 import re
 from datetime import datetime
 from typing import Union, Dict, Any
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient
 from bson import ObjectId
 
+# Mensajes para las violaciones de los índices únicos de usuarios (ver dao/indices.py)
+_MENSAJES_DUPLICADO = {
+    "email": "El correo electrónico ya está registrado",
+    "alumno.noControl": "El número de control ya está registrado",
+    "tutor.noDocente": "El número de docente ya está registrado",
+    "coordinador.noEmpleado": "El número de empleado ya está registrado",
+}
+
 
 class UsuarioDAO:
-    def __init__(self, db: MongoClient):
+    def __init__(self, db: AsyncMongoClient):
         self.db = db
         self.usuarios = db.usuarios
         self.carreras = db.carreras
 
     # Valicación de campos y parámetros generales
-    def _validar_carrera(self, carrera_id: int) -> bool:
-        return self.carreras.find_one({"_id": carrera_id}) is not None
+    async def _validar_carrera(self, carrera_id: int) -> bool:
+        return await self.carreras.find_one({"_id": carrera_id}) is not None
 
     def _validar_password(self, password: str) -> str | None:
         if len(password) < 8:
@@ -43,11 +55,11 @@ class UsuarioDAO:
             return "Los apellidos solo pueden contener letras y espacios"
         return None
 
-    def _validar_nombre_carrera(self, carrera_id: int, nombre: str) -> bool:
-        doc = self.carreras.find_one({"_id": carrera_id})
+    async def _validar_nombre_carrera(self, carrera_id: int, nombre: str) -> bool:
+        doc = await self.carreras.find_one({"_id": carrera_id})
         return doc is not None and doc.get("nombre", "").strip().lower() == nombre.strip().lower()
 
-    def agregarUsuario(self, usuario: Union[UsuarioAlumnoInsert, UsuarioTutorInsert, UsuarioCoordInsert]) -> Salida:
+    async def agregarUsuario(self, usuario: Union[UsuarioAlumnoInsert, UsuarioTutorInsert, UsuarioCoordInsert]) -> Salida:
         try:
             error_nombre = self._validar_nombre_apellidos(usuario.nombre, usuario.apellidos)
             if error_nombre:
@@ -57,7 +69,7 @@ class UsuarioDAO:
             if error_password:
                 return Salida(estatus="ERROR", mensaje=error_password)
 
-            if self.usuarios.find_one({"email": usuario.email}):
+            if await self.usuarios.find_one({"email": usuario.email}):
                 return Salida(estatus="ERROR", mensaje="El correo electrónico ya está registrado")
 
             if isinstance(usuario, UsuarioAlumnoInsert):
@@ -67,14 +79,14 @@ class UsuarioDAO:
                 if usuario.alumno.semestre < 1 or usuario.alumno.semestre > 12:
                     return Salida(estatus="ERROR", mensaje="El semestre debe estar entre 1 y 12")
 
-                if not self._validar_carrera(usuario.alumno.carrera):
+                if not await self._validar_carrera(usuario.alumno.carrera):
                     return Salida(estatus="ERROR", mensaje="La carrera especificada no existe")
 
-                if not self._validar_nombre_carrera(usuario.alumno.carrera, usuario.alumno.nombreCarrera):
+                if not await self._validar_nombre_carrera(usuario.alumno.carrera, usuario.alumno.nombreCarrera):
                     return Salida(estatus="ERROR",
                                   mensaje="El nombre de la carrera del alumno no coincide con el ID proporcionado")
 
-                if self.usuarios.find_one({"alumno.noControl": usuario.alumno.noControl}):
+                if await self.usuarios.find_one({"alumno.noControl": usuario.alumno.noControl}):
                     return Salida(estatus="ERROR", mensaje="El número de control ya está registrado")
 
                 if not usuario.tutorId:
@@ -85,7 +97,7 @@ class UsuarioDAO:
                 except Exception:
                     return Salida(estatus="ERROR", mensaje="El ID del tutor no tiene un formato válido")
 
-                tutor_doc = self.usuarios.find_one({
+                tutor_doc = await self.usuarios.find_one({
                     "_id": tutor_oid,
                     "tipo": "tutor",
                     "status": "activo"
@@ -110,7 +122,7 @@ class UsuarioDAO:
                         or t.horasTutoria != tutor_doc["tutor"]["horasTutoria"]
                         or t.carrera != tutor_doc["tutor"]["carrera"]
                         or t.nombreCarrera != tutor_doc["tutor"]["nombreCarrera"]
-                        or not self._validar_nombre_carrera(t.carrera, t.nombreCarrera)
+                        or not await self._validar_nombre_carrera(t.carrera, t.nombreCarrera)
                 ):
                     return Salida(
                         estatus="ERROR",
@@ -127,7 +139,7 @@ class UsuarioDAO:
                             mensaje="El ID del tutor no tiene un formato válido"
                         )
 
-                    tutor_doc = self.usuarios.find_one({
+                    tutor_doc = await self.usuarios.find_one({
                         "_id": tutor_oid,
                         "tipo": "tutor"
                     })
@@ -145,14 +157,14 @@ class UsuarioDAO:
                 if usuario.tutor.horasTutoria < 1 or usuario.tutor.horasTutoria > 40:
                     return Salida(estatus="ERROR", mensaje="Las horas de tutoría deben estar entre 1 y 40")
 
-                if not self._validar_carrera(usuario.tutor.carrera):
+                if not await self._validar_carrera(usuario.tutor.carrera):
                     return Salida(estatus="ERROR", mensaje="La carrera especificada no existe")
 
-                if not self._validar_nombre_carrera(usuario.tutor.carrera, usuario.tutor.nombreCarrera):
+                if not await self._validar_nombre_carrera(usuario.tutor.carrera, usuario.tutor.nombreCarrera):
                     return Salida(estatus="ERROR",
                                   mensaje="El nombre de la carrera no coincide con el ID proporcionado")
 
-                if self.usuarios.find_one({"tutor.noDocente": usuario.tutor.noDocente}):
+                if await self.usuarios.find_one({"tutor.noDocente": usuario.tutor.noDocente}):
                     return Salida(estatus="ERROR", mensaje="El número de docente ya está registrado")
 
             elif isinstance(usuario, UsuarioCoordInsert):
@@ -163,25 +175,24 @@ class UsuarioDAO:
                 if len(usuario.coordinador.departamento) < 3 or len(usuario.coordinador.departamento) > 50:
                     return Salida(estatus="ERROR", mensaje="El departamento debe tener entre 3 y 50 caracteres")
 
-                if not self._validar_carrera(usuario.coordinador.carrera):
+                if not await self._validar_carrera(usuario.coordinador.carrera):
                     return Salida(estatus="ERROR", mensaje="La carrera especificada no existe")
 
-                if not self._validar_nombre_carrera(usuario.coordinador.carrera, usuario.coordinador.nombreCarrera):
+                if not await self._validar_nombre_carrera(usuario.coordinador.carrera, usuario.coordinador.nombreCarrera):
                     return Salida(estatus="ERROR",
                                   mensaje="El nombre de la carrera no coincide con el ID proporcionado")
 
-                if self.usuarios.find_one({"coordinador.noEmpleado": usuario.coordinador.noEmpleado}):
+                if await self.usuarios.find_one({"coordinador.noEmpleado": usuario.coordinador.noEmpleado}):
                     return Salida(estatus="ERROR", mensaje="El número de empleado ya está registrado")
 
-            hashed_password = bcrypt.hashpw(usuario.password.encode('utf-8'), bcrypt.gensalt())
             usuario_dict = usuario.model_dump(exclude={"password"})
-            usuario_dict["password"] = hashed_password.decode("utf-8")
+            usuario_dict["password"] = await hash_password(usuario.password)
             usuario_dict["status"] = usuario.status
 
             if hasattr(usuario, "tutorId") and usuario.tutorId:
                 usuario_dict["tutorId"] = ObjectId(usuario.tutorId)
 
-            result = self.usuarios.insert_one(usuario_dict)
+            result = await self.usuarios.insert_one(usuario_dict)
 
             return Salida(
                 estatus="OK",
@@ -189,13 +200,16 @@ class UsuarioDAO:
                 id_usuario=str(result.inserted_id)
             )
 
+        except DuplicateKeyError as ex:
+            # Otro registro concurrente ganó la carrera entre la verificación y la inserción
+            return Salida(estatus="ERROR", mensaje=mensaje_duplicado(ex, _MENSAJES_DUPLICADO, "El usuario ya está registrado"))
         except Exception as ex:
             print(f"Error al registrar usuario: {str(ex)}")
             return Salida(estatus="ERROR", mensaje="Ocurrió un error interno al procesar el registro")
 
     # Componente DAO para la consulta individual (ID) de usuarios
 
-    def consultarUsuarioPorID(self, id_usuario: str) -> UsuarioSalidaID:
+    async def consultarUsuarioPorID(self, id_usuario: str) -> UsuarioSalidaID:
         try:
             if not ObjectId.is_valid(id_usuario):
                 return UsuarioSalidaID(
@@ -204,12 +218,7 @@ class UsuarioDAO:
                     id_usuario=id_usuario
                 )
 
-            usuario_data = self.db.viewUsuariosID.find_one({
-                "$or": [
-                    {"id": id_usuario},
-                    {"_id": ObjectId(id_usuario)}
-                ]
-            })
+            usuario_data = await self.db.viewUsuariosID.find_one({"_id": ObjectId(id_usuario)})
 
             if not usuario_data:
                 return UsuarioSalidaID(
@@ -235,13 +244,13 @@ class UsuarioDAO:
 
     # Componente DAO para la consulta general de usuarios
 
-    def consultaGeneralUsuarios(self) -> UsuarioSalidaLista:
+    async def consultaGeneralUsuarios(self) -> UsuarioSalidaLista:
         salida = UsuarioSalidaLista(estatus="OK", mensaje="", usuarios=[])
         try:
             cursor = self.db.viewUsuariosGeneral.find()
             usuarios = []
 
-            for usuario_data in cursor:
+            async for usuario_data in cursor:
                 tipo = usuario_data["tipo"]
                 base_fields = {
                     "id": usuario_data["id"],
@@ -285,8 +294,8 @@ class UsuarioDAO:
         return salida
 
     # Componente para la modificación de usuarios
-    def actualizar_alumno(self, id_usuario: str, datos_actualizacion: dict, usuario_actual: dict) -> dict:
-        usuario_existente = self.usuarios.find_one({"_id": ObjectId(id_usuario), "tipo": "alumno"})
+    async def actualizar_alumno(self, id_usuario: str, datos_actualizacion: dict, usuario_actual: dict) -> dict:
+        usuario_existente = await self.usuarios.find_one({"_id": ObjectId(id_usuario), "tipo": "alumno"})
         if not usuario_existente:
             return {
                 "estatus": "ERROR",
@@ -312,10 +321,10 @@ class UsuarioDAO:
             if usuario.alumno.semestre < 1 or usuario.alumno.semestre > 12:
                 return {"estatus": "ERROR", "mensaje": "El semestre debe estar entre 1 y 12", "status_code": 400}
 
-            if not self._validar_carrera(usuario.alumno.carrera):
+            if not await self._validar_carrera(usuario.alumno.carrera):
                 return {"estatus": "ERROR", "mensaje": "La carrera especificada no existe", "status_code": 400}
 
-            if not self._validar_nombre_carrera(usuario.alumno.carrera, usuario.alumno.nombreCarrera):
+            if not await self._validar_nombre_carrera(usuario.alumno.carrera, usuario.alumno.nombreCarrera):
                 return {"estatus": "ERROR", "mensaje": "El nombre de la carrera no coincide con el ID",
                         "status_code": 400}
 
@@ -326,7 +335,7 @@ class UsuarioDAO:
                     return {"estatus": "ERROR", "mensaje": "El ID del tutor no tiene un formato válido",
                             "status_code": 400}
 
-                tutor_doc = self.usuarios.find_one({"_id": tutor_oid, "tipo": "tutor"})
+                tutor_doc = await self.usuarios.find_one({"_id": tutor_oid, "tipo": "tutor"})
 
                 if not tutor_doc:
                     return {"estatus": "ERROR",
@@ -350,18 +359,18 @@ class UsuarioDAO:
                             "status_code": 400
                         }
 
-            hashed_password = bcrypt.hashpw(usuario.password.encode('utf-8'), bcrypt.gensalt())
             usuario_dict = usuario.model_dump(exclude={"password"})
-            usuario_dict["password"] = hashed_password.decode("utf-8")
+            usuario_dict["password"] = await hash_password(usuario.password)
             usuario_dict["fechaRegistro"] = datetime.now()
             if usuario.tutorId:
                 usuario_dict["tutorId"] = ObjectId(usuario.tutorId)
 
-            self.usuarios.update_one({"_id": ObjectId(id_usuario)}, {"$set": usuario_dict})
+            await self.usuarios.update_one({"_id": ObjectId(id_usuario)}, {"$set": usuario_dict})
+            cache_usuarios.invalidar(id_usuario)
 
             # Actualizar status del tutor embebido si existe
             if usuario.tutorId:
-                self.usuarios.update_many(
+                await self.usuarios.update_many(
                     {
                         "tipo": "alumno",
                         "tutorId": ObjectId(usuario.tutorId),
@@ -380,6 +389,9 @@ class UsuarioDAO:
                 "status_code": 200
             }
 
+        except DuplicateKeyError as ex:
+            return {"estatus": "ERROR", "status_code": 400,
+                    "mensaje": mensaje_duplicado(ex, _MENSAJES_DUPLICADO, "El usuario ya está registrado")}
         except Exception as ex:
             print(f"Error al actualizar alumno: {ex}")
             return {
@@ -390,9 +402,9 @@ class UsuarioDAO:
 
     # Se repite la lógica para TUTOR y COORDINADOR
 
-    def actualizar_tutor(self, id_usuario: str, datos_actualizacion: dict, current_user: dict) -> dict:
+    async def actualizar_tutor(self, id_usuario: str, datos_actualizacion: dict, current_user: dict) -> dict:
         try:
-            usuario = self.usuarios.find_one({"_id": ObjectId(id_usuario), "tipo": "tutor"})
+            usuario = await self.usuarios.find_one({"_id": ObjectId(id_usuario), "tipo": "tutor"})
             if not usuario:
                 return {
                     "estatus": "ERROR",
@@ -408,7 +420,7 @@ class UsuarioDAO:
                 return {"estatus": "ERROR", "mensaje": error, "status_code": 400}
 
             if "email" in datos_actualizacion:
-                if self.usuarios.find_one(
+                if await self.usuarios.find_one(
                         {"email": datos_actualizacion["email"], "_id": {"$ne": ObjectId(id_usuario)}}):
                     return {"estatus": "ERROR", "mensaje": "El correo electrónico ya está registrado",
                             "status_code": 400}
@@ -426,19 +438,19 @@ class UsuarioDAO:
                 return {"estatus": "ERROR", "mensaje": "Las horas de tutoría deben estar entre 1 y 40",
                         "status_code": 400}
 
-            if not self._validar_carrera(tutor_data.get("carrera")):
+            if not await self._validar_carrera(tutor_data.get("carrera")):
                 return {"estatus": "ERROR", "mensaje": "La carrera especificada no existe", "status_code": 400}
 
-            if self.usuarios.find_one(
+            if await self.usuarios.find_one(
                     {"tutor.noDocente": tutor_data.get("noDocente"), "_id": {"$ne": ObjectId(id_usuario)}}):
                 return {"estatus": "ERROR", "mensaje": "El número de docente ya está registrado", "status_code": 400}
 
             datos_actualizacion["fechaRegistro"] = datetime.now()
             if "password" in datos_actualizacion:
-                datos_actualizacion["password"] = bcrypt.hashpw(datos_actualizacion["password"].encode("utf-8"),
-                                                                bcrypt.gensalt()).decode("utf-8")
+                datos_actualizacion["password"] = await hash_password(datos_actualizacion["password"])
 
-            self.usuarios.update_one({"_id": ObjectId(id_usuario)}, {"$set": datos_actualizacion})
+            await self.usuarios.update_one({"_id": ObjectId(id_usuario)}, {"$set": datos_actualizacion})
+            cache_usuarios.invalidar(id_usuario)
 
             return {
                 "estatus": "OK",
@@ -446,6 +458,9 @@ class UsuarioDAO:
                 "status_code": 200
             }
 
+        except DuplicateKeyError as ex:
+            return {"estatus": "ERROR", "status_code": 400,
+                    "mensaje": mensaje_duplicado(ex, _MENSAJES_DUPLICADO, "El usuario ya está registrado")}
         except Exception as ex:
             print(f"Error al actualizar tutor {id_usuario}: {ex}")
             return {
@@ -454,9 +469,9 @@ class UsuarioDAO:
                 "status_code": 500
             }
 
-    def actualizar_coordinador(self, id_usuario: str, datos_actualizacion: dict, current_user: dict) -> dict:
+    async def actualizar_coordinador(self, id_usuario: str, datos_actualizacion: dict, current_user: dict) -> dict:
         try:
-            usuario = self.usuarios.find_one({"_id": ObjectId(id_usuario), "tipo": "coordinador"})
+            usuario = await self.usuarios.find_one({"_id": ObjectId(id_usuario), "tipo": "coordinador"})
             if not usuario:
                 return {
                     "estatus": "ERROR",
@@ -472,7 +487,7 @@ class UsuarioDAO:
                 return {"estatus": "ERROR", "mensaje": error, "status_code": 400}
 
             if "email" in datos_actualizacion:
-                if self.usuarios.find_one(
+                if await self.usuarios.find_one(
                         {"email": datos_actualizacion["email"], "_id": {"$ne": ObjectId(id_usuario)}}):
                     return {"estatus": "ERROR", "mensaje": "El correo electrónico ya está registrado",
                             "status_code": 400}
@@ -490,19 +505,19 @@ class UsuarioDAO:
                 return {"estatus": "ERROR", "mensaje": "El departamento debe tener entre 3 y 50 caracteres",
                         "status_code": 400}
 
-            if not self._validar_carrera(coord_data.get("carrera")):
+            if not await self._validar_carrera(coord_data.get("carrera")):
                 return {"estatus": "ERROR", "mensaje": "La carrera especificada no existe", "status_code": 400}
 
-            if self.usuarios.find_one(
+            if await self.usuarios.find_one(
                     {"coordinador.noEmpleado": coord_data.get("noEmpleado"), "_id": {"$ne": ObjectId(id_usuario)}}):
                 return {"estatus": "ERROR", "mensaje": "El número de empleado ya está registrado", "status_code": 400}
 
             datos_actualizacion["fechaRegistro"] = datetime.now()
             if "password" in datos_actualizacion:
-                datos_actualizacion["password"] = bcrypt.hashpw(datos_actualizacion["password"].encode("utf-8"),
-                                                                bcrypt.gensalt()).decode("utf-8")
+                datos_actualizacion["password"] = await hash_password(datos_actualizacion["password"])
 
-            self.usuarios.update_one({"_id": ObjectId(id_usuario)}, {"$set": datos_actualizacion})
+            await self.usuarios.update_one({"_id": ObjectId(id_usuario)}, {"$set": datos_actualizacion})
+            cache_usuarios.invalidar(id_usuario)
 
             return {
                 "estatus": "OK",
@@ -510,6 +525,9 @@ class UsuarioDAO:
                 "status_code": 200
             }
 
+        except DuplicateKeyError as ex:
+            return {"estatus": "ERROR", "status_code": 400,
+                    "mensaje": mensaje_duplicado(ex, _MENSAJES_DUPLICADO, "El usuario ya está registrado")}
         except Exception as ex:
             print(f"Error al actualizar coordinador {id_usuario}: {ex}")
             return {
@@ -520,7 +538,7 @@ class UsuarioDAO:
 
     # Componente para la eliminación de usuarios
 
-    def eliminar_usuario_logico(self, id_usuario: str) -> Dict[str, Any]:
+    async def eliminar_usuario_logico(self, id_usuario: str) -> Dict[str, Any]:
         try:
             if not ObjectId.is_valid(id_usuario):
                 return {
@@ -529,7 +547,7 @@ class UsuarioDAO:
                     "status_code": 400
                 }
 
-            usuario = self.usuarios.find_one({"_id": ObjectId(id_usuario)})
+            usuario = await self.usuarios.find_one({"_id": ObjectId(id_usuario)})
             if not usuario:
                 return {
                     "estatus": "ERROR",
@@ -546,15 +564,18 @@ class UsuarioDAO:
                 }
 
             # Cambio de status del usuario raíz
-            self.usuarios.update_one(
+            await self.usuarios.update_one(
                 {"_id": ObjectId(id_usuario)},
                 {"$set": {"status": "inactivo"}}
             )
+            cache_usuarios.invalidar(id_usuario)
+            # Los tokens ya emitidos dejan de ser válidos aunque la autorización no consulte MongoDB
+            await lista_revocacion.revocar_usuario(self.db, id_usuario)
 
             # Si el usuario eliminado es un tutor, actualizar el status en todos los alumnos relacionados
             if usuario["tipo"] == "tutor":
                 tutor_id = ObjectId(id_usuario)
-                resultado = self.usuarios.update_many(
+                resultado = await self.usuarios.update_many(
                     {
                         "tipo": "alumno",
                         "tutorId": tutor_id,
@@ -0,0 +1,123 @@
+"""Convierte fechaInicio/fechaFin guardadas como texto ISO a fechas nativas y horaInicio/horaFin "HH:mm" a
+minutos del día; también completa dia (llave del índice único actividad_grupo_dia_unico).
+
+Uso: python -m herramientas.migrar_fechas [--lote 500] [--reiniciar]
+
+Avanza por _id y guarda el último procesado en la colección migraciones: si se interrumpe, la siguiente
+ejecución continúa donde quedó. Se puede ejecutar con la API en marcha (cada documento se actualiza sólo
+si sigue con los valores leídos). Las asistencias que chocarían con otra del mismo día se migran sin dia y
+se listan al final para revisarlas a mano.
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from dao.database import Conexion
+from dao.asistenciasDAO import AsistenciaDAO
+
+MIGRACION = "asistencias_fechas"
+
+
+def _fecha(valor: str) -> datetime:
+    return datetime.fromisoformat(valor.replace("Z", "+00:00"))
+
+
+def cambios_documento(documento: dict) -> dict:
+    """Campos a convertir de un documento; vacío si ya está migrado"""
+    cambios = {}
+    for campo in ("fechaInicio", "fechaFin"):
+        if isinstance(documento.get(campo), str):
+            cambios[campo] = _fecha(documento[campo])
+    for campo in ("horaInicio", "horaFin"):
+        if isinstance(documento.get(campo), str):
+            cambios[campo] = AsistenciaDAO._minutos(documento[campo])
+    inicio = cambios.get("fechaInicio", documento.get("fechaInicio"))
+    if isinstance(inicio, datetime) and documento.get("dia") != AsistenciaDAO._dia(inicio):
+        cambios["dia"] = AsistenciaDAO._dia(inicio)
+    return cambios
+
+
+async def _aplicar(db, operaciones: list[tuple]) -> tuple[int, list]:
+    """Aplica (filtro, cambios) en un bulk_write; los que violan el índice único se reintentan sin dia"""
+    try:
+        resultado = await db.asistencias.bulk_write(
+            [UpdateOne(filtro, {"$set": cambios}) for filtro, cambios in operaciones], ordered=False
+        )
+        return resultado.modified_count, []
+    except BulkWriteError as ex:
+        modificados = ex.details.get("nModified", 0)
+        duplicados = [operaciones[error["index"]] for error in ex.details.get("writeErrors", []) if error.get("code") == 11000]
+        otros = [error for error in ex.details.get("writeErrors", []) if error.get("code") != 11000]
+        if otros:
+            raise
+    sin_dia = [(filtro, {k: v for k, v in cambios.items() if k != "dia"}) for filtro, cambios in duplicados]
+    sin_dia = [(filtro, cambios) for filtro, cambios in sin_dia if cambios]
+    if sin_dia:
+        resultado = await db.asistencias.bulk_write(
+            [UpdateOne(filtro, {"$set": cambios}) for filtro, cambios in sin_dia], ordered=False
+        )
+        modificados += resultado.modified_count
+    return modificados, [filtro["_id"] for filtro, _ in duplicados]
+
+
+async def migrar(db, lote: int, reiniciar: bool = False) -> dict:
+    if reiniciar:
+        await db.migraciones.delete_one({"_id": MIGRACION})
+    estado = await db.migraciones.find_one({"_id": MIGRACION}) or {
+        "_id": MIGRACION, "ultimoId": None, "procesados": 0, "modificados": 0, "duplicados": [], "terminado": False
+    }
+    if estado["terminado"]:
+        print("La migración ya se completó (use --reiniciar para volver a revisar todo)")
+        return estado
+
+    while True:
+        filtro = {"_id": {"$gt": estado["ultimoId"]}} if estado["ultimoId"] is not None else {}
+        documentos = await db.asistencias.find(
+            filtro, {"fechaInicio": 1, "fechaFin": 1, "horaInicio": 1, "horaFin": 1, "dia": 1}
+        ).sort("_id", 1).limit(lote).to_list()
+        if not documentos:
+            break
+
+        operaciones = []
+        for documento in documentos:
+            cambios = cambios_documento(documento)
+            if cambios:
+                # Sólo si los campos siguen como se leyeron: una escritura concurrente de la API ya los deja nativos
+                condicion = {campo: documento.get(campo) for campo in cambios if campo != "dia"}
+                operaciones.append(({"_id": documento["_id"], **condicion}, cambios))
+        if operaciones:
+            modificados, duplicados = await _aplicar(db, operaciones)
+            estado["modificados"] += modificados
+            estado["duplicados"] += duplicados
+
+        estado["ultimoId"] = documentos[-1]["_id"]
+        estado["procesados"] += len(documentos)
+        estado["actualizadoEn"] = datetime.now()
+        await db.migraciones.replace_one({"_id": MIGRACION}, estado, upsert=True)
+        print(f"Asistencias revisadas: {estado['procesados']} (modificadas: {estado['modificados']})")
+
+    estado["terminado"] = True
+    await db.migraciones.replace_one({"_id": MIGRACION}, estado, upsert=True)
+    if estado["duplicados"]:
+        print(f"Asistencias sin dia por duplicar actividad, grupo y fecha: {[str(_id) for _id in estado['duplicados']]}")
+    return estado
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Migra las fechas y horas de asistencias a tipos nativos")
+    parser.add_argument("--lote", type=int, default=500, help="Asistencias por bulk_write")
+    parser.add_argument("--reiniciar", action="store_true", help="Descarta el avance guardado y empieza desde el inicio")
+    args = parser.parse_args()
+
+    conexion = Conexion()
+    try:
+        estado = await migrar(conexion.getDB(), args.lote, args.reiniciar)
+        print(f"Migración terminada: {estado['procesados']} revisadas, {estado['modificados']} modificadas, "
+              f"{len(estado['duplicados'])} sin dia")
+    finally:
+        await conexion.cerrar()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""Convierte a ObjectId los _id y las referencias guardadas como texto (p. ej. documentos importados de database/*.json).
+
+Uso: python -m herramientas.normalizar_ids [--lote 500]
+
+Sólo recorre los documentos con algún _id o referencia de tipo string, así que volver a ejecutarlo continúa
+donde quedó. Un _id no se puede modificar: el documento se vuelve a insertar con el ObjectId y luego se borra
+el original. Cada referencia se actualiza sólo si sigue como se leyó; los valores que no son un ObjectId
+válido se dejan como están y se reportan.
+"""
+import argparse
+import asyncio
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from dao.database import Conexion
+from dao.referencias import COLECCIONES, REFERENCIAS, convertir_campo
+
+async def normalizar_ids_coleccion(db, coleccion: str, lote: int) -> dict:
+    pendientes = {"_id": {"$type": "string"}}
+    total = await db[coleccion].count_documents(pendientes)
+    resumen = {"pendientes": total, "modificados": 0, "invalidos": []}
+    ultimo_id = None
+
+    while True:
+        filtro = pendientes if ultimo_id is None else {"_id": {"$type": "string", "$gt": ultimo_id}}
+        documentos = await db[coleccion].find(filtro).sort("_id", 1).limit(lote).to_list()
+        if not documentos:
+            break
+
+        for documento in documentos:
+            anterior = documento["_id"]
+            if not ObjectId.is_valid(anterior):
+                resumen["invalidos"].append((anterior, "_id"))
+                continue
+            try:
+                await db[coleccion].insert_one({**documento, "_id": ObjectId(anterior)})
+            except DuplicateKeyError:
+                # Una ejecución interrumpida ya insertó la copia; si no existe, chocó con otro índice único
+                if not await db[coleccion].find_one({"_id": ObjectId(anterior)}, {"_id": 1}):
+                    resumen["invalidos"].append((anterior, "_id"))
+                    continue
+            await db[coleccion].delete_one({"_id": anterior})
+            resumen["modificados"] += 1
+
+        ultimo_id = documentos[-1]["_id"]
+        print(f"{coleccion}._id: {resumen['modificados']} de {total} documentos normalizados")
+
+    return resumen
+
+
+async def normalizar_coleccion(db, coleccion: str, campos: list[str], lote: int) -> dict:
+    # $type sobre un arreglo (o un campo de sus subdocumentos) coincide si algún elemento es string
+    pendientes = {"$or": [{campo: {"$type": "string"}} for campo in campos]}
+    raices = {campo.partition(".")[0] for campo in campos}
+    total = await db[coleccion].count_documents(pendientes)
+    resumen = {"pendientes": total, "modificados": 0, "invalidos": []}
+    ultimo_id = None
+
+    while True:
+        filtro = pendientes if ultimo_id is None else {**pendientes, "_id": {"$gt": ultimo_id}}
+        documentos = await db[coleccion].find(filtro, {raiz: 1 for raiz in raices}).sort("_id", 1).limit(lote).to_list()
+        if not documentos:
+            break
+
+        operaciones = []
+        for documento in documentos:
+            cambios = {}
+            for campo in campos:
+                raiz = campo.partition(".")[0]
+                if raiz not in documento:
+                    continue
+                valor, invalido = convertir_campo(documento, campo)
+                if invalido:
+                    resumen["invalidos"].append((str(documento["_id"]), campo))
+                if valor != documento[raiz]:
+                    cambios[raiz] = valor
+            if cambios:
+                condicion = {raiz: documento[raiz] for raiz in cambios}
+                operaciones.append(UpdateOne({"_id": documento["_id"], **condicion}, {"$set": cambios}))
+        if operaciones:
+            resultado = await db[coleccion].bulk_write(operaciones, ordered=False)
+            resumen["modificados"] += resultado.modified_count
+
+        ultimo_id = documentos[-1]["_id"]
+        print(f"{coleccion}: {resumen['modificados']} de {total} documentos normalizados")
+
+    return resumen
+
+
+async def normalizar(db, lote: int) -> dict:
+    resumen = {f"{coleccion}._id": await normalizar_ids_coleccion(db, coleccion, lote) for coleccion in COLECCIONES}
+    for coleccion, campos in REFERENCIAS.items():
+        resumen[coleccion] = await normalizar_coleccion(db, coleccion, campos, lote)
+    return resumen
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Normaliza a ObjectId los _id y las referencias guardadas como texto")
+    parser.add_argument("--lote", type=int, default=500, help="Documentos por bulk_write")
+    args = parser.parse_args()
+
+    conexion = Conexion()
+    try:
+        resumen = await normalizar(conexion.getDB(), args.lote)
+        for coleccion, datos in resumen.items():
+            print(f"{coleccion}: {datos['modificados']} normalizados de {datos['pendientes']} pendientes")
+            for documento_id, campo in datos["invalidos"]:
+                print(f"  {coleccion} {documento_id}: '{campo}' no se pudo convertir a ObjectId")
+    finally:
+        await conexion.cerrar()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
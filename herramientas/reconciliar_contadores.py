@@ -0,0 +1,76 @@
+"""Verifica contadores_asistencia contra las asistencias y, con --corregir, los reescribe.
+
+Uso: python -m herramientas.reconciliar_contadores [--corregir] [--lote 500]
+
+Conviene ejecutarlo después de editar la lista de alumnos de un grupo (los contadores no se recalculan
+solos) y con poca carga: un $inc de la API entre el cálculo y la corrección se perdería.
+"""
+import argparse
+import asyncio
+from pymongo import DeleteOne, UpdateOne
+from dao.database import Conexion
+from dao.contadoresDAO import ContadorDAO
+
+
+async def reconciliar(db, corregir: bool, lote: int) -> dict:
+    esperados = await ContadorDAO(db).recalcular()
+    diferencias = 0
+    revisados = 0
+    operaciones = []
+    escritos = 0
+
+    async def escribir():
+        nonlocal operaciones, escritos
+        if corregir and operaciones:
+            await db.contadores_asistencia.bulk_write(operaciones, ordered=False)
+            escritos += len(operaciones)
+        operaciones = []
+
+    async for documento in db.contadores_asistencia.find():
+        revisados += 1
+        clave = (documento["alumno"], documento["actividad"], documento["ciclo"])
+        real = esperados.pop(clave, [0, 0])
+        guardado = [documento.get("esperadas", 0), documento.get("asistidas", 0)]
+        if real == guardado:
+            continue
+        diferencias += 1
+        print(f"Diferencia en {clave}: guardado {guardado}, real {real}")
+        if real == [0, 0]:
+            operaciones.append(DeleteOne({"_id": documento["_id"]}))
+        else:
+            operaciones.append(UpdateOne({"_id": documento["_id"]}, {"$set": {"esperadas": real[0], "asistidas": real[1]}}))
+        if len(operaciones) >= lote:
+            await escribir()
+
+    # Claves con asistencias que no tienen contador
+    for (alumno, actividad, ciclo), (esperadas, asistidas) in esperados.items():
+        diferencias += 1
+        print(f"Falta el contador {(alumno, actividad, ciclo)}: real {[esperadas, asistidas]}")
+        operaciones.append(UpdateOne(
+            {"alumno": alumno, "actividad": actividad, "ciclo": ciclo},
+            {"$set": {"esperadas": esperadas, "asistidas": asistidas}},
+            upsert=True
+        ))
+        if len(operaciones) >= lote:
+            await escribir()
+    await escribir()
+
+    return {"revisados": revisados, "diferencias": diferencias, "corregidos": escritos}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Reconcilia contadores_asistencia con las asistencias registradas")
+    parser.add_argument("--corregir", action="store_true", help="Reescribe los contadores que no coinciden")
+    parser.add_argument("--lote", type=int, default=500, help="Operaciones por bulk_write")
+    args = parser.parse_args()
+
+    conexion = Conexion()
+    try:
+        resumen = await reconciliar(conexion.getDB(), args.corregir, args.lote)
+        print(f"Reconciliación terminada: {resumen}")
+    finally:
+        await conexion.cerrar()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+"""Reconstruye asistencias_read a partir de la colección asistencias.
+
+Uso: python -m herramientas.reconstruir_lectura [--lote 500]
+
+Se puede ejecutar con la API en marcha: las proyecciones que la API escriba durante la
+reconstrucción quedan con actualizadoEn posterior al inicio y no se eliminan al final.
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from dao.database import Conexion
+from dao.asistenciasDAO import AsistenciaDAO
+
+
+async def reconstruir(db, lote: int) -> dict:
+    dao = AsistenciaDAO(db)
+    inicio = datetime.now()
+    leidas = 0
+    proyectadas = 0
+    documentos = []
+
+    async for documento in db.asistencias.find().sort("_id", 1).batch_size(lote):
+        documentos.append(documento)
+        if len(documentos) >= lote:
+            proyectadas += await dao.proyectar_lote(documentos)
+            leidas += len(documentos)
+            documentos = []
+            print(f"Asistencias procesadas: {leidas}")
+    if documentos:
+        proyectadas += await dao.proyectar_lote(documentos)
+        leidas += len(documentos)
+
+    # Lo que no se tocó en esta pasada ya no existe en asistencias (o perdió sus referencias)
+    resultado = await db.asistencias_read.delete_many({"actualizadoEn": {"$lt": inicio}})
+    return {"leidas": leidas, "proyectadas": proyectadas, "eliminadas": resultado.deleted_count}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Reconstruye el modelo de lectura asistencias_read")
+    parser.add_argument("--lote", type=int, default=500, help="Asistencias por bulk_write")
+    args = parser.parse_args()
+
+    conexion = Conexion()
+    try:
+        resumen = await reconstruir(conexion.getDB(), args.lote)
+        print(f"Reconstrucción terminada: {resumen}")
+    finally:
+        await conexion.cerrar()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
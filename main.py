@@ -1,7 +1,11 @@
 import uvicorn
 from fastapi import FastAPI
 from dao.database import Conexion
-from routers import usuariosRouter, actividadesRouter,ciclosRouters,carrerasRouter, gruposRouter, ubicacionesRouter, asistenciasRouter
+from dao import hashing
+from dao.revocacion import lista_revocacion
+from dao.ingesta import cola_registros
+from dao import indices
+from routers import usuariosRouter, actividadesRouter,ciclosRouters,carrerasRouter, gruposRouter, ubicacionesRouter, asistenciasRouter, metricasRouter
 
 app = FastAPI()
 
@@ -13,6 +17,7 @@ app.include_router(carrerasRouter.router)
 app.include_router(gruposRouter.router)
 app.include_router(ubicacionesRouter.router)
 app.include_router(asistenciasRouter.router)
+app.include_router(metricasRouter.router)
 
 @app.get("/")
 async def root():
@@ -24,11 +29,18 @@ async def startup():
     conexion = Conexion()
     app.conexion = conexion
     app.db = conexion.getDB()
+    hashing.iniciar()
+    await indices.asegurar_indices(app.db, parciales=conexion.backend != "memoria")
+    await lista_revocacion.iniciar(app.db)
+    cola_registros.iniciar(app.db)
 
 @app.on_event("shutdown")
 async def shutdown():
     print("Cerrando la conexión con MongoDB")
-    app.conexion.cerrar()
+    await lista_revocacion.detener()
+    await cola_registros.detener()
+    await app.conexion.cerrar()
+    hashing.cerrar()
 
 #python -m main uvicorn main:app --reload
 if __name__ == '__main__':
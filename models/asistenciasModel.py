@@ -103,6 +103,65 @@ class AsistenciaDetalladaSalida(Salida):
 
 class AsistenciasSalida(Salida):
     asistencias: List[AsistenciaSelect]
+    siguiente: Optional[str] = Field(None, description="Valor de 'after' para la página siguiente")
+
+# Resultado por elemento del registro masivo (POST /asistencias/bulk)
+class AsistenciaLoteResultado(BaseModel):
+    indice: int = Field(..., description="Posición de la asistencia en la lista enviada")
+    estatus: str
+    mensaje: str
+    id: Optional[str] = None
+
+class AsistenciasLoteSalida(Salida):
+    registradas: int = 0
+    resultados: List[AsistenciaLoteResultado] = []
+
+# Altas y bajas de varios alumnos en una asistencia (PATCH /asistencias/{id}/alumnos)
+class AsistenciaAlumnosLote(BaseModel):
+    agregar: List[str] = Field(default_factory=list, description="IDs de alumnos a registrar")
+    eliminar: List[str] = Field(default_factory=list, description="IDs de alumnos a quitar")
+
+class AlumnoLoteResultado(BaseModel):
+    id: str
+    operacion: Literal["agregar", "eliminar"]
+    estatus: str
+    mensaje: str
+
+class AsistenciaAlumnosLoteSalida(AsistenciaSalida):
+    resultados: List[AlumnoLoteResultado] = []
+
+# Resumen de asistencia por grupo o por actividad (asistencias canceladas excluidas)
+class ResumenAsistencia(BaseModel):
+    id: str = Field(..., description="ID del grupo o de la actividad")
+    totalAsistencias: int = Field(..., description="Asistencias registradas")
+    totalEsperados: int = Field(..., description="Suma de alumnos del grupo en cada asistencia")
+    totalPresentes: int = Field(..., description="Suma de alumnos registrados en cada asistencia")
+    porcentajeAsistencia: float = Field(..., description="Porcentaje de asistencia")
+
+class ResumenAsistenciaSalida(Salida):
+    resumen: Optional[ResumenAsistencia] = None
+
+# Registro diferido de un alumno (cola de ingesta): se acepta con un ticket y se escribe en lote
+class RegistroEncoladoSalida(Salida):
+    ticket: Optional[str] = None
+
+class EstadoRegistroSalida(Salida):
+    ticket: str
+    asistencia: Optional[str] = None
+    alumno: Optional[str] = None
+    estado: Optional[Literal["pendiente", "aplicado", "rechazado"]] = None
+
+# Contadores de un alumno por actividad y ciclo (colección contadores_asistencia)
+class EstadisticaAlumno(BaseModel):
+    actividad: str = Field(..., description="ID de la actividad")
+    ciclo: str = Field(..., description="ID del ciclo del grupo")
+    asistidas: int = Field(..., description="Sesiones a las que asistió")
+    esperadas: int = Field(..., description="Sesiones registradas para sus grupos")
+    porcentajeAsistencia: float = Field(..., description="Porcentaje de asistencia")
+
+class EstadisticasAlumnoSalida(Salida):
+    alumno: Optional[str] = None
+    estadisticas: List[EstadisticaAlumno] = []
 
 # NUEVO: Modelo para respuesta de eliminación
 class AsistenciaEliminada(BaseModel):
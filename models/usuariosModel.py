@@ -80,6 +80,11 @@ class Salida(BaseModel):
     mensaje: str
 
 
+# Modelo de entrada para renovar el token de acceso
+class TokenRefresh(BaseModel):
+    refresh_token: str
+
+
 # Modelo de entrada para la consulta Individual de usuarios
 class UsuarioBaseResponse(BaseModel):
     id: str
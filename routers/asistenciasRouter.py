@@ -1,7 +1,18 @@
-from fastapi import APIRouter, Request, Depends
-from models.asistenciasModel import AsistenciaInsert, AsistenciaSalida, AsistenciasSalida, Salida
-from dao.asistenciasDAO import AsistenciaDAO
-from dao.auth import require_roles, require_rol
+from fastapi import APIRouter, Depends, Query, Body, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Annotated, List, Literal, Optional
+from models.asistenciasModel import (AsistenciaInsert, AsistenciaUpdate, AsistenciaSalida, AsistenciasSalida, AsistenciaFiltros, AsistenciasLoteSalida,
+                                     AsistenciaAlumnosLote, AsistenciaAlumnosLoteSalida, AsistenciaDetalladaSalida,
+                                     ResumenAsistenciaSalida, EstadisticasAlumnoSalida, RegistroEncoladoSalida,
+                                     EstadoRegistroSalida, Salida)
+from dao.asistenciasDAO import AsistenciaDAO, ASISTENCIAS_BULK_MAX
+from dao.contadoresDAO import ContadorDAO
+from dao.ingesta import cola_registros
+from dao import idempotencia
+from dao.idempotencia import clave_idempotencia
+from bson import ObjectId
+from dao.dependencies import get_asistencia_dao, get_contador_dao
+from dao.auth import require_roles, require_rol, validar_acceso_consulta
 
 router = APIRouter(
     prefix="/asistencias",
@@ -11,85 +22,240 @@ router = APIRouter(
 @router.post("/", response_model=AsistenciaSalida, status_code=201, summary="Registrar una nueva asistencia")
 async def registrarAsistencia(
     asistencia: AsistenciaInsert, 
-    request: Request,
-    current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
+    current_user: dict = Depends(require_roles(["coordinador", "tutor"])),
+    idempotency_key: Optional[str] = Depends(clave_idempotencia)
 ) -> AsistenciaSalida:
     """
-    Registrar una nueva asistencia - Coordinadores y Tutores
+    Registrar una nueva asistencia - Coordinadores y Tutores.
+    Con el encabezado Idempotency-Key un reintento recibe la respuesta original sin volver a registrar
+    """
+    return await idempotencia.ejecutar(
+        asistenciaDAO.db, idempotency_key, f"{current_user['_id']}:POST /asistencias", asistencia,
+        lambda: asistenciaDAO.agregar(asistencia), status_code=201
+    )
+
+@router.post("/bulk", response_model=AsistenciasLoteSalida, status_code=201, summary="Registrar varias asistencias")
+async def registrarAsistenciasLote(
+    asistencias: Annotated[List[AsistenciaInsert], Body(min_length=1, max_length=ASISTENCIAS_BULK_MAX)],
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
+    current_user: dict = Depends(require_roles(["coordinador", "tutor"])),
+    idempotency_key: Optional[str] = Depends(clave_idempotencia)
+) -> AsistenciasLoteSalida:
+    """
+    Registrar varias asistencias con resultado por elemento - Coordinadores y Tutores (admite Idempotency-Key)
     """
-    asistenciaDAO = AsistenciaDAO(request.app.db)
-    return asistenciaDAO.agregar(asistencia)
+    return await idempotencia.ejecutar(
+        asistenciaDAO.db, idempotency_key, f"{current_user['_id']}:POST /asistencias/bulk", asistencias,
+        lambda: asistenciaDAO.agregarLote(asistencias), status_code=201
+    )
 
 @router.get("/", response_model=AsistenciasSalida, summary="Consultar todas las asistencias")
 async def consultarAsistencias(
-    request: Request,
+    filtros: AsistenciaFiltros = Depends(),
+    after: Optional[str] = Query(None, description="ID de la última asistencia de la página anterior"),
+    limit: int = Query(50, ge=1, le=200, description="Máximo de asistencias por página"),
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
     current_user: dict = Depends(require_roles(["coordinador", "tutor", "alumno"]))
 ) -> AsistenciasSalida:
     """
-    Consultar todas las asistencias - Coordinadores, Tutores y Alumnos
+    Consultar asistencias con filtros y paginación - Coordinadores, Tutores y Alumnos
+    """
+    return await asistenciaDAO.consultaGeneral(filtros, after, limit)
+
+# Debe declararse antes de /{idAsistencia} para que "export" no se tome como ID
+@router.get("/export", summary="Exportar asistencias en NDJSON")
+async def exportarAsistencias(
+    filtros: AsistenciaFiltros = Depends(),
+    format: Literal["ndjson"] = Query("ndjson", description="Formato de exportación"),
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
+    current_user: dict = Depends(require_rol("coordinador"))
+) -> StreamingResponse:
+    """
+    Exportar todas las asistencias filtradas, una por línea, sin cargarlas en memoria - Solo Coordinadores
+    """
+    try:
+        lineas = asistenciaDAO.exportar(filtros)
+    except ValueError as ex:
+        raise HTTPException(status_code=400, detail=str(ex))
+    return StreamingResponse(
+        lineas,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="asistencias.ndjson"'}
+    )
+
+@router.get("/resumen/grupo/{idGrupo}", response_model=ResumenAsistenciaSalida, summary="Resumen de asistencia de un grupo")
+async def resumenPorGrupo(
+    idGrupo: str,
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
+    current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
+) -> ResumenAsistenciaSalida:
+    """
+    Alumnos esperados, presentes y porcentaje de asistencia de un grupo - Coordinadores y Tutores
     """
-    asistenciaDAO = AsistenciaDAO(request.app.db)
-    return asistenciaDAO.consultaGeneral()
+    return await asistenciaDAO.consultarResumen("grupo", idGrupo)
+
+@router.get("/resumen/actividad/{idActividad}", response_model=ResumenAsistenciaSalida, summary="Resumen de asistencia de una actividad")
+async def resumenPorActividad(
+    idActividad: str,
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
+    current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
+) -> ResumenAsistenciaSalida:
+    """
+    Alumnos esperados, presentes y porcentaje de asistencia de una actividad - Coordinadores y Tutores
+    """
+    return await asistenciaDAO.consultarResumen("actividad", idActividad)
+
+@router.get("/alumno/{idAlumno}", response_model=AsistenciasSalida, summary="Historial de asistencias de un alumno")
+async def consultarAsistenciasAlumno(
+    idAlumno: str,
+    after: Optional[str] = Query(None, description="ID de la última asistencia de la página anterior"),
+    limit: int = Query(50, ge=1, le=200, description="Máximo de asistencias por página"),
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
+    current_user: dict = Depends(require_roles(["coordinador", "tutor", "alumno"]))
+) -> AsistenciasSalida:
+    """
+    Asistencias de un alumno - el propio Alumno, sus Tutores y Coordinadores
+    """
+    validar_acceso_consulta(current_user, "alumno", idAlumno)
+    if current_user["tipo"] == "tutor" and not await asistenciaDAO.es_alumno_de_tutor(current_user["_id"], idAlumno):
+        raise HTTPException(status_code=403, detail="Como tutor, sólo puedes consultar las asistencias de tus alumnos")
+    return await asistenciaDAO.consultarPorAlumno(idAlumno, after, limit)
+
+@router.get("/estadisticas/alumno/{idAlumno}", response_model=EstadisticasAlumnoSalida, summary="Estadísticas de asistencia de un alumno")
+async def estadisticasAlumno(
+    idAlumno: str,
+    contadorDAO: ContadorDAO = Depends(get_contador_dao),
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
+    current_user: dict = Depends(require_roles(["coordinador", "tutor", "alumno"]))
+) -> EstadisticasAlumnoSalida:
+    """
+    Sesiones asistidas y esperadas por actividad y ciclo - Coordinadores, sus Tutores y el propio Alumno
+    """
+    validar_acceso_consulta(current_user, "alumno", idAlumno)
+    if current_user["tipo"] == "tutor" and not await asistenciaDAO.es_alumno_de_tutor(current_user["_id"], idAlumno):
+        raise HTTPException(status_code=403, detail="Como tutor, sólo puedes consultar las estadísticas de tus alumnos")
+    return await contadorDAO.consultarAlumno(idAlumno)
+
+@router.get("/registros/{ticket}", response_model=EstadoRegistroSalida, summary="Estado de un registro diferido")
+async def estadoRegistro(
+    ticket: str,
+    current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
+) -> EstadoRegistroSalida:
+    """
+    Estado de un registro aceptado por POST /asistencias/{id}/registros/{idAlumno} - Sólo quien lo envió
+    """
+    registro = cola_registros.estado(ticket, str(current_user["_id"]))
+    if registro is None:
+        raise HTTPException(status_code=404, detail="Ticket no encontrado (expiró, pertenece a otro proceso o a otro usuario)")
+    return EstadoRegistroSalida(estatus="OK", ticket=ticket, **registro)
+
+@router.get("/{idAsistencia}/detalle", response_model=AsistenciaDetalladaSalida, summary="Consultar una asistencia con sus totales")
+async def consultarDetalleAsistencia(
+    idAsistencia: str,
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
+    current_user: dict = Depends(require_roles(["coordinador", "tutor", "alumno"]))
+) -> AsistenciaDetalladaSalida:
+    """
+    Consultar una asistencia con total de alumnos, presentes y porcentaje - Coordinadores, Tutores y Alumnos
+    """
+    return await asistenciaDAO.consultarDetalle(idAsistencia)
 
 @router.get("/{idAsistencia}", response_model=AsistenciaSalida, summary="Consultar una asistencia por su ID")
 async def consultarAsistenciaPorID(
     idAsistencia: str, 
-    request: Request,
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
     current_user: dict = Depends(require_roles(["coordinador", "tutor", "alumno"]))
 ) -> AsistenciaSalida:
     """
     Consultar una asistencia específica - Coordinadores, Tutores y Alumnos
     """
-    asistenciaDAO = AsistenciaDAO(request.app.db)
-    return asistenciaDAO.consultarAsistenciaPorID(idAsistencia)
+    return await asistenciaDAO.consultarAsistenciaPorID(idAsistencia)
 
 @router.put("/{idAsistencia}", response_model=AsistenciaSalida, summary="Actualizar una asistencia")
 async def actualizarAsistencia(
     idAsistencia: str, 
     asistencia: AsistenciaInsert, 
-    request: Request,
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
     current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
 ) -> AsistenciaSalida:
     """
     Actualizar una asistencia - Coordinadores y Tutores
     """
-    asistenciaDAO = AsistenciaDAO(request.app.db)
-    return asistenciaDAO.actualizar(idAsistencia, asistencia)
+    return await asistenciaDAO.actualizar(idAsistencia, asistencia)
+
+@router.patch("/{idAsistencia}", response_model=AsistenciaSalida, summary="Actualizar parcialmente una asistencia")
+async def actualizarAsistenciaParcial(
+    idAsistencia: str,
+    cambios: AsistenciaUpdate,
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
+    current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
+) -> AsistenciaSalida:
+    """
+    Actualizar sólo los campos enviados; los alumnos que siguen en la lista conservan su hora de registro - Coordinadores y Tutores
+    """
+    return await asistenciaDAO.actualizarParcial(idAsistencia, cambios)
+
+@router.patch("/{idAsistencia}/alumnos", response_model=AsistenciaAlumnosLoteSalida, summary="Agregar y quitar varios alumnos de la lista de asistencia")
+async def actualizarAlumnosDeAsistencia(
+    idAsistencia: str,
+    cambios: AsistenciaAlumnosLote,
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
+    current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
+) -> AsistenciaAlumnosLoteSalida:
+    """
+    Agregar y/o quitar varios alumnos en una sola operación - Coordinadores y Tutores
+    """
+    return await asistenciaDAO.actualizarAlumnosLote(idAsistencia, cambios.agregar, cambios.eliminar)
 
 @router.patch("/{idAsistencia}/alumnos/{idAlumno}", response_model=AsistenciaSalida, summary="Agregar un alumno a la lista de asistencia")
 async def agregarAlumnoAAsistencia(
     idAsistencia: str, 
     idAlumno: str, 
-    request: Request,
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
     current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
 ) -> AsistenciaSalida:
     """
     Agregar un alumno a la lista de asistencia - Coordinadores y Tutores
     """
-    asistenciaDAO = AsistenciaDAO(request.app.db)
-    return asistenciaDAO.agregarAlumnoAsistencia(idAsistencia, idAlumno)
+    return await asistenciaDAO.agregarAlumnoAsistencia(idAsistencia, idAlumno)
+
+@router.post("/{idAsistencia}/registros/{idAlumno}", response_model=RegistroEncoladoSalida, status_code=202,
+             summary="Registrar un alumno de forma diferida")
+async def encolarRegistroAlumno(
+    idAsistencia: str,
+    idAlumno: str,
+    current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
+) -> RegistroEncoladoSalida:
+    """
+    Acepta el registro al momento y lo escribe junto con los demás de la misma asistencia - Coordinadores y Tutores
+    """
+    if not ObjectId.is_valid(idAsistencia) or not ObjectId.is_valid(idAlumno):
+        raise HTTPException(status_code=400, detail="El id de la asistencia o del alumno no es válido")
+    ticket = cola_registros.encolar(idAsistencia, idAlumno, str(current_user["_id"]))
+    if ticket is None:
+        raise HTTPException(status_code=503, detail="La cola de registros está llena, intente de nuevo en unos segundos")
+    return RegistroEncoladoSalida(estatus="OK", mensaje="Registro aceptado; consulte su estado con el ticket", ticket=ticket)
 
 @router.delete("/{idAsistencia}/alumnos/{idAlumno}", response_model=AsistenciaSalida, summary="Eliminar un alumno de la lista de asistencia")
 async def eliminarAlumnoDeAsistencia(
     idAsistencia: str, 
     idAlumno: str, 
-    request: Request,
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
     current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
 ) -> AsistenciaSalida:
     """
     Eliminar un alumno de la lista de asistencia - Coordinadores y Tutores
     """
-    asistenciaDAO = AsistenciaDAO(request.app.db)
-    return asistenciaDAO.eliminarAlumnoAsistencia(idAsistencia, idAlumno)
+    return await asistenciaDAO.eliminarAlumnoAsistencia(idAsistencia, idAlumno)
 
 @router.delete("/{idAsistencia}", response_model=Salida, summary="Cancelar una asistencia")
 async def cancelarAsistencia(
     idAsistencia: str, 
-    request: Request,
+    asistenciaDAO: AsistenciaDAO = Depends(get_asistencia_dao),
     current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
 ) -> Salida:
     """
     Cancelar una asistencia - Coordinadores y Tutores
     """
-    asistenciaDAO = AsistenciaDAO(request.app.db)
-    return asistenciaDAO.cancelar(idAsistencia)
\ No newline at end of file
+    return await asistenciaDAO.cancelar(idAsistencia)
\ No newline at end of file
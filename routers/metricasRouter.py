@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends
+from dao.dependencies import get_conexion, get_db
+from dao.indices import reporte_indices
+from dao.cache import cache_usuarios
+from dao.auth import require_coordinador
+
+router = APIRouter(
+    prefix="/metricas",
+    tags=["Métricas"]
+)
+
+@router.get("/ejecutor", summary="Ocupación del pool de ejecución de la base de datos")
+async def metricasEjecutor(
+    conexion = Depends(get_conexion),
+    current_user: dict = Depends(require_coordinador)
+) -> dict:
+    """
+    Profundidad de cola y saturación del pool de hilos (modo executor) - Solo Coordinadores
+    """
+    return conexion.metricas()
+
+@router.get("/cache", summary="Aciertos de la caché de usuarios autenticados")
+async def metricasCache(
+    current_user: dict = Depends(require_coordinador)
+) -> dict:
+    """
+    Entradas y tasa de aciertos de la caché de get_current_user - Solo Coordinadores
+    """
+    return cache_usuarios.metricas()
+
+@router.get("/indices", summary="Índices faltantes o sin uso")
+async def metricasIndices(
+    db = Depends(get_db),
+    current_user: dict = Depends(require_coordinador)
+) -> dict:
+    """
+    Compara el registro de dao/indices.py con $indexStats de cada colección - Solo Coordinadores
+    """
+    return await reporte_indices(db)
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Request, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends
 from models.ubicacionesModel import UbicacionInsert, UbicacionUpdate, Salida, UbicacionesSalida, UbicacionSelect, UbicacionSalida
 from dao.ubicacionesDAO import UbicacionesDAO
+from dao.dependencies import get_ubicacion_dao
 from dao.auth import require_rol, require_roles
 
 router = APIRouter(
@@ -11,14 +12,13 @@ router = APIRouter(
 @router.post("/", response_model=UbicacionSalida, summary="Crear una nueva ubicación")
 async def crear_ubicacion(
     ubicacion: UbicacionInsert, 
-    request: Request,
+    ubicacionDAO: UbicacionesDAO = Depends(get_ubicacion_dao),
     current_user: dict = Depends(require_rol("coordinador"))
 ) -> UbicacionSalida:
     """
     Crear una nueva ubicación - Solo Coordinadores
     """
-    ubicacionDAO = UbicacionesDAO(request.app.db)
-    resultado = ubicacionDAO.crear_ubicacion(ubicacion)
+    resultado = await ubicacionDAO.crear_ubicacion(ubicacion)
     
     # Convertir el diccionario resultado a UbicacionSalida
     return UbicacionSalida(
@@ -29,48 +29,44 @@ async def crear_ubicacion(
 
 @router.get("/", response_model=UbicacionesSalida, summary="Consultar todas las ubicaciones")
 async def consultar_ubicaciones(
-    request: Request,
+    ubicacionDAO: UbicacionesDAO = Depends(get_ubicacion_dao),
     current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
 ) -> UbicacionesSalida:
     """
     Consultar todas las ubicaciones - Coordinadores y Tutores
     """
-    ubicacionDAO = UbicacionesDAO(request.app.db)
-    return ubicacionDAO.obtener_ubicaciones()
+    return await ubicacionDAO.obtener_ubicaciones()
 
 @router.get("/{ubicacion_id}", response_model=UbicacionSalida, summary="Consultar una ubicación por su ID")
 async def consultar_ubicacion_por_id(
     ubicacion_id: str, 
-    request: Request,
+    ubicacionDAO: UbicacionesDAO = Depends(get_ubicacion_dao),
     current_user: dict = Depends(require_roles(["coordinador", "tutor"]))
 ) -> UbicacionSalida:
     """
     Consultar una ubicación específica - Coordinadores y Tutores
     """
-    ubicacionDAO = UbicacionesDAO(request.app.db)
-    return ubicacionDAO.obtener_ubicacion_por_id(ubicacion_id)
+    return await ubicacionDAO.obtener_ubicacion_por_id(ubicacion_id)
 
 @router.put("/{ubicacion_id}", response_model=UbicacionSalida, summary="Actualizar una ubicación")
 async def editar_ubicacion(
     ubicacion_id: str, 
     ubicacion: UbicacionInsert, 
-    request: Request,
+    ubicacionDAO: UbicacionesDAO = Depends(get_ubicacion_dao),
     current_user: dict = Depends(require_rol("coordinador"))
 ) -> UbicacionSalida:
     """
     Actualizar una ubicación - Solo Coordinadores
     """
-    ubicacionDAO = UbicacionesDAO(request.app.db)
-    return ubicacionDAO.editar_ubicacion(ubicacion_id, ubicacion)
+    return await ubicacionDAO.editar_ubicacion(ubicacion_id, ubicacion)
 
 @router.delete("/{ubicacion_id}", response_model=Salida, summary="Cancelar una ubicación")
 async def cancelar_ubicacion(
     ubicacion_id: str, 
-    request: Request,
+    ubicacionDAO: UbicacionesDAO = Depends(get_ubicacion_dao),
     current_user: dict = Depends(require_rol("coordinador"))
 ) -> Salida:
     """
     Cancelar una ubicación - Solo Coordinadores
     """
-    ubicacionDAO = UbicacionesDAO(request.app.db)
-    return ubicacionDAO.cancelar_ubicacion(ubicacion_id)
\ No newline at end of file
+    return await ubicacionDAO.cancelar_ubicacion(ubicacion_id)
\ No newline at end of file
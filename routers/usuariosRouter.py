@@ -3,17 +3,22 @@ from fastapi import APIRouter, Request, HTTPException, status, Depends, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from models.usuariosModel import (
     UsuarioAlumnoInsert, UsuarioTutorInsert, UsuarioCoordInsert, Salida,
-    UsuarioSalidaID, UsuarioSalidaLista, UsuarioEliminadoResponse
+    UsuarioSalidaID, UsuarioSalidaLista, UsuarioEliminadoResponse, TokenRefresh
     # , ActualizarTutorRequest,
     # ActualizarCoordinadorRequest, ActualizarAlumnoRequest
 )
-from dao.dependencies import get_usuario_dao
-from dao.auth import create_access_token, require_coordinador, require_roles, require_rol, validar_acceso_actualizacion
+from dao.dependencies import get_usuario_dao, get_db
+from dao.auth import (create_access_token, create_refresh_token, claims_de_usuario, decodificar_token, oauth2_scheme,
+                      require_coordinador, require_roles, require_rol, validar_acceso_actualizacion)
 from dao.usuariosDAO import UsuarioDAO
-from typing import Annotated
+from typing import Annotated, Optional
+from bson import ObjectId
 from fastapi.security import OAuth2PasswordRequestForm
-import bcrypt
-from dao.database import Conexion
+from dao.hashing import verificar_password
+from dao.revocacion import lista_revocacion
+from dao import idempotencia
+from dao.idempotencia import clave_idempotencia
+from datetime import datetime
 
 # Configuración básica del router
 router = APIRouter(
@@ -41,18 +46,65 @@ def get_current_user():
 
 # LogIn
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    db = Conexion().getDB()
-    user = db["usuarios"].find_one({"email": form_data.username})
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db=Depends(get_db)):
+    user = await db["usuarios"].find_one({"email": form_data.username})
 
-    if not user or not bcrypt.checkpw(form_data.password.encode("utf-8"), user["password"].encode("utf-8")):
+    if not user or not await verificar_password(form_data.password, user["password"]):
         raise HTTPException(status_code=401, detail="Credenciales incorrectas")
 
     if user["status"] != "activo":
         raise HTTPException(status_code=403, detail="Usuario inactivo")
 
-    token = create_access_token(data={"user_id": str(user["_id"]), "tipo": user["tipo"]})
-    return {"access_token": token, "token_type": "bearer"}
+    token = create_access_token(data=claims_de_usuario(user))
+    refresh_token = create_refresh_token(str(user["_id"]))
+    return {"access_token": token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
+# Renovación del token de acceso con el refresh token
+@router.post("/refresh")
+async def refresh(datos: TokenRefresh, db=Depends(get_db)):
+    payload = decodificar_token(datos.refresh_token, tipo="refresh")
+    user = await db["usuarios"].find_one({"_id": ObjectId(payload["user_id"]), "status": "activo"}, {"password": 0})
+    if not user:
+        raise HTTPException(status_code=401, detail="Token inválido o expirado")
+
+    # Rotación: el refresh token usado deja de servir aunque se haya filtrado
+    if payload.get("jti") is not None:
+        await lista_revocacion.revocar_token(db, payload["jti"], datetime.utcfromtimestamp(payload["exp"]))
+    token = create_access_token(data=claims_de_usuario(user))
+    refresh_token = create_refresh_token(str(user["_id"]))
+    return {"access_token": token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
+# Cierre de sesión: revoca el token de acceso actual y el refresh token de la sesión hasta su expiración.
+# Sin refresh token (o uno anterior sin jti) no se puede identificar la sesión, así que se revocan todos los tokens emitidos al usuario.
+@router.post("/logout", response_model=Salida)
+async def logout(datos: Optional[TokenRefresh] = None, token: str = Depends(oauth2_scheme), db=Depends(get_db)):
+    payload = decodificar_token(token)
+    if payload.get("jti") is None:
+        raise HTTPException(status_code=400, detail="El token no admite revocación, inicie sesión nuevamente")
+    refresh = decodificar_token(datos.refresh_token, tipo="refresh") if datos else None
+    if refresh is not None and refresh["user_id"] != payload["user_id"]:
+        raise HTTPException(status_code=400, detail="El refresh token no pertenece al usuario de la sesión")
+    if refresh is None or refresh.get("jti") is None:
+        # La revocación por usuario no alcanza a los tokens emitidos en el mismo segundo: el actual se revoca aparte
+        await lista_revocacion.revocar_usuario(db, payload["user_id"])
+        await lista_revocacion.revocar_token(db, payload["jti"], datetime.utcfromtimestamp(payload["exp"]))
+        return Salida(estatus="OK", mensaje="Sesión cerrada en todos los dispositivos")
+
+    await lista_revocacion.revocar_token(db, payload["jti"], datetime.utcfromtimestamp(payload["exp"]))
+    await lista_revocacion.revocar_token(db, refresh["jti"], datetime.utcfromtimestamp(refresh["exp"]))
+    return Salida(estatus="OK", mensaje="Sesión cerrada correctamente")
+
+
+async def _registrar(usuario_dao: UsuarioDAO, usuario) -> Salida:
+    resultado = await usuario_dao.agregarUsuario(usuario)
+    if resultado.estatus == "ERROR":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=resultado.mensaje
+        )
+    return resultado
 
 
 # Registro público para alumnos
@@ -63,18 +115,16 @@ def login(form_data: OAuth2PasswordRequestForm = Depends()):
     summary="Registro privado para alumnos",
     response_description="Resultado del registro"
 )
-def registro_alumno(
+async def registro_alumno(
         usuario: UsuarioAlumnoInsert,
         usuario_dao: Annotated[UsuarioDAO, Depends(get_usuario_dao)],
-        current_user: dict = Depends(require_roles(["alumno", "coordinador"]))  # 🔒 solo alumnos y coordinadores
+        current_user: dict = Depends(require_roles(["alumno", "coordinador"])),  # 🔒 solo alumnos y coordinadores
+        idempotency_key: Optional[str] = Depends(clave_idempotencia)
 ):
-    resultado = usuario_dao.agregarUsuario(usuario)
-    if resultado.estatus == "ERROR":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=resultado.mensaje
-        )
-    return resultado
+    return await idempotencia.ejecutar(
+        usuario_dao.db, idempotency_key, f"{current_user['_id']}:POST /usuarios/privado/alumno", usuario,
+        lambda: _registrar(usuario_dao, usuario), status_code=status.HTTP_201_CREATED
+    )
 
 
 # Registro para tutores (requiere autenticación)
@@ -85,18 +135,16 @@ def registro_alumno(
     summary="Registro para tutores",
     response_description="Resultado del registro"
 )
-def registro_tutor(
+async def registro_tutor(
         usuario: UsuarioTutorInsert,
         usuario_dao: Annotated[UsuarioDAO, Depends(get_usuario_dao)],
-        current_user: dict = Depends(require_roles(["tutor", "coordinador"]))  # ✅ permite ambos
+        current_user: dict = Depends(require_roles(["tutor", "coordinador"])),  # ✅ permite ambos
+        idempotency_key: Optional[str] = Depends(clave_idempotencia)
 ):
-    resultado = usuario_dao.agregarUsuario(usuario)
-    if resultado.estatus == "ERROR":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=resultado.mensaje
-        )
-    return resultado
+    return await idempotencia.ejecutar(
+        usuario_dao.db, idempotency_key, f"{current_user['_id']}:POST /usuarios/privado/tutor", usuario,
+        lambda: _registrar(usuario_dao, usuario), status_code=status.HTTP_201_CREATED
+    )
 
 
 # Registro para coordinadores (requiere autenticación)
@@ -107,18 +155,16 @@ def registro_tutor(
     summary="Registro para coordinadores",
     response_description="Resultado del registro"
 )
-def registro_coordinador(
+async def registro_coordinador(
         usuario: UsuarioCoordInsert,
         usuario_dao: Annotated[UsuarioDAO, Depends(get_usuario_dao)],
-        current_user: dict = Depends(require_rol("coordinador"))  # 🔒 sólo coordinadores
+        current_user: dict = Depends(require_rol("coordinador")),  # 🔒 sólo coordinadores
+        idempotency_key: Optional[str] = Depends(clave_idempotencia)
 ):
-    resultado = usuario_dao.agregarUsuario(usuario)
-    if resultado.estatus == "ERROR":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=resultado.mensaje
-        )
-    return resultado
+    return await idempotencia.ejecutar(
+        usuario_dao.db, idempotency_key, f"{current_user['_id']}:POST /usuarios/privado/coordinador", usuario,
+        lambda: _registrar(usuario_dao, usuario), status_code=status.HTTP_201_CREATED
+    )
 
 
 # Consultar usuario por ID
@@ -131,12 +177,12 @@ from dao.auth import get_current_user, validar_acceso_consulta
                 404: {"model": UsuarioSalidaID, "description": "Usuario no encontrado"},
                 500: {"model": UsuarioSalidaID, "description": "Error interno del servidor"}
             })
-def consultar_usuario_por_id(
+async def consultar_usuario_por_id(
         id_usuario: str,
         usuario_dao: Annotated[UsuarioDAO, Depends(get_usuario_dao)],
         current_user: dict = Depends(get_current_user)
 ):
-    resultado = usuario_dao.consultarUsuarioPorID(id_usuario)
+    resultado = await usuario_dao.consultarUsuarioPorID(id_usuario)
 
     if resultado.estatus == "ERROR":
         raise HTTPException(
@@ -157,23 +203,23 @@ def consultar_usuario_por_id(
             responses={
                 403: {"description": "Solo accesible para coordinadores"}
             })
-def consulta_general_usuarios(
+async def consulta_general_usuarios(
         usuario_dao: Annotated[UsuarioDAO, Depends(get_usuario_dao)],
         current_user: dict = Depends(require_rol("coordinador"))  # 🔐 solo coordinadores
 ):
-    return usuario_dao.consultaGeneralUsuarios()
+    return await usuario_dao.consultaGeneralUsuarios()
 
 
 # === ACTUALIZAR ALUMNO ===
 
 @router.put("/alumno/{id_usuario}", response_model=Salida)
-def actualizar_alumno(
+async def actualizar_alumno(
     id_usuario: str,
     datos: UsuarioAlumnoInsert,
     usuario_dao: Annotated[UsuarioDAO, Depends(get_usuario_dao)],
     current_user: dict = Depends(get_current_user)
 ):
-    resultado_previo = usuario_dao.consultarUsuarioPorID(id_usuario)
+    resultado_previo = await usuario_dao.consultarUsuarioPorID(id_usuario)
     if resultado_previo.estatus == "ERROR":
         raise HTTPException(status_code=404, detail="Alumno no encontrado")
 
@@ -181,7 +227,7 @@ def actualizar_alumno(
     validar_acceso_actualizacion(current_user, tipo_objetivo, id_usuario)
 
     datos_dict = datos.model_dump(exclude_unset=True)
-    resultado = usuario_dao.actualizar_alumno(id_usuario, datos_dict, current_user)
+    resultado = await usuario_dao.actualizar_alumno(id_usuario, datos_dict, current_user)
 
     if resultado["estatus"] == "ERROR":
         raise HTTPException(status_code=resultado["status_code"], detail=resultado["mensaje"])
@@ -189,13 +235,13 @@ def actualizar_alumno(
 
 # === ACTUALIZAR TUTOR ===
 @router.put("/tutor/{id_usuario}", response_model=Salida)
-def actualizar_tutor(
+async def actualizar_tutor(
     id_usuario: str,
     datos: UsuarioTutorInsert,
     usuario_dao: Annotated[UsuarioDAO, Depends(get_usuario_dao)],
     current_user: dict = Depends(get_current_user)
 ):
-    resultado_previo = usuario_dao.consultarUsuarioPorID(id_usuario)
+    resultado_previo = await usuario_dao.consultarUsuarioPorID(id_usuario)
     if resultado_previo.estatus == "ERROR":
         raise HTTPException(status_code=404, detail="Tutor no encontrado")
 
@@ -203,7 +249,7 @@ def actualizar_tutor(
     validar_acceso_actualizacion(current_user, tipo_objetivo, id_usuario)
 
     datos_dict = datos.model_dump(exclude_unset=True)
-    resultado = usuario_dao.actualizar_tutor(id_usuario, datos_dict, current_user)
+    resultado = await usuario_dao.actualizar_tutor(id_usuario, datos_dict, current_user)
 
     if resultado["estatus"] == "ERROR":
         raise HTTPException(status_code=resultado["status_code"], detail=resultado["mensaje"])
@@ -211,13 +257,13 @@ def actualizar_tutor(
 
 # === ACTUALIZAR COORDINADOR ===
 @router.put("/coordinador/{id_usuario}", response_model=Salida)
-def actualizar_coordinador(
+async def actualizar_coordinador(
     id_usuario: str,
     datos: UsuarioCoordInsert,
     usuario_dao: Annotated[UsuarioDAO, Depends(get_usuario_dao)],
     current_user: dict = Depends(get_current_user)
 ):
-    resultado_previo = usuario_dao.consultarUsuarioPorID(id_usuario)
+    resultado_previo = await usuario_dao.consultarUsuarioPorID(id_usuario)
     if resultado_previo.estatus == "ERROR":
         raise HTTPException(status_code=404, detail="Coordinador no encontrado")
 
@@ -225,7 +271,7 @@ def actualizar_coordinador(
     validar_acceso_actualizacion(current_user, tipo_objetivo, id_usuario)
 
     datos_dict = datos.model_dump(exclude_unset=True)
-    resultado = usuario_dao.actualizar_coordinador(id_usuario, datos_dict, current_user)
+    resultado = await usuario_dao.actualizar_coordinador(id_usuario, datos_dict, current_user)
 
     if resultado["estatus"] == "ERROR":
         raise HTTPException(status_code=resultado["status_code"], detail=resultado["mensaje"])
@@ -244,13 +290,13 @@ def actualizar_coordinador(
         500: {"description": "Error interno del servidor"}
     }
 )
-def eliminar_usuario_logico(
+async def eliminar_usuario_logico(
         id_usuario: str,
         usuario_dao: Annotated[UsuarioDAO, Depends(get_usuario_dao)],
         current_user: dict = Depends(require_coordinador)
 ):
     try:
-        resultado = usuario_dao.eliminar_usuario_logico(id_usuario)
+        resultado = await usuario_dao.eliminar_usuario_logico(id_usuario)
 
         if resultado["estatus"] == "ERROR":
             raise HTTPException(
@@ -264,7 +310,8 @@ def eliminar_usuario_logico(
                 "usuario": resultado["usuario_eliminado"],
                 "operacion": "eliminacion_logica"
             },
-            coordinador_autorizador=current_user["nombre"] + " " + current_user["apellidos"]
+            # En modo AUTH_STATELESS el usuario sale de los claims y puede no traer nombre o apellidos
+            coordinador_autorizador=" ".join(filter(None, (current_user.get("nombre"), current_user.get("apellidos"))))
         )
 
     except ValueError: